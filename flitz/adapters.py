@@ -0,0 +1,186 @@
+"""Qt adapters for the Qt-free core.
+
+Listing, metadata, file types, folder sizes and transfers are plain
+Python, so that :mod:`flitz.cli` and batch jobs run without loading PyQt.
+This module holds what the GUI needs on top of them: icons, and signals
+reporting the results of background work to the GUI thread.
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtGui import QIcon
+from PyQt6.QtWidgets import QStyle
+
+from .filetypes import (
+    FOLDER,
+    FileType,
+    TypeCache,
+    TypeKey,
+    sniff_batch,
+    type_cache,
+)
+from .sizes import SIZE_WORKERS, SizeJob, compute_sizes
+from .tracing import tracer
+
+# Seconds the sniffer waits for more files before sniffing a batch
+SNIFF_BATCH_DELAY = 0.05
+
+
+class IconCache:
+    """Icons of file types, created once per icon name.
+
+    Icons come from the desktop's icon theme, falling back to the
+    style's generic file and folder icons.
+    """
+
+    def __init__(self) -> None:
+        self._icons: Dict[str, QIcon] = {}
+
+    def icon(self, file_type: FileType, style: QStyle) -> QIcon:
+        """Icon for ``file_type``."""
+        icon = self._icons.get(file_type.icon)
+        if icon is None:
+            with tracer.span("icon lookup", icon=file_type.icon):
+                icon = self._create(file_type, style)
+            self._icons[file_type.icon] = icon
+        return icon
+
+    @staticmethod
+    def _create(file_type: FileType, style: QStyle) -> QIcon:
+        if QIcon.hasThemeIcon(file_type.icon):
+            return QIcon.fromTheme(file_type.icon)
+        if file_type.icon == FOLDER.icon:
+            return style.standardIcon(QStyle.StandardPixmap.SP_DirIcon)
+        return style.standardIcon(QStyle.StandardPixmap.SP_FileIcon)
+
+
+icon_cache = IconCache()
+
+
+class TypeSniffer(QObject):
+    """Sniff the types of files in a background thread.
+
+    :meth:`resolve` answers from the cache right away and queues files
+    that are not in it. The worker thread handles everything queued
+    since it last woke up as one batch and emits the types found per
+    directory as ``{name: FileType}`` dictionaries.
+    """
+
+    types_found = pyqtSignal(object, object)
+
+    def __init__(
+        self, parent: Optional[QObject] = None, cache: TypeCache = type_cache
+    ) -> None:
+        super().__init__(parent)
+        self.cache = cache
+        self._pending: Dict[TypeKey, Tuple[Path, str]] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def resolve(
+        self, directory: Path, name: str, key: TypeKey
+    ) -> Optional[FileType]:
+        """Return the sniffed type of a file, or queue it for sniffing."""
+        file_type = self.cache.get(key)
+        if file_type is not None:
+            return file_type
+        with self._condition:
+            if key not in self._pending:
+                self._pending[key] = (directory, name)
+                self._condition.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="flitz-types", daemon=True
+                )
+                self._thread.start()
+        return None
+
+    def clear(self) -> None:
+        """Forget the files still queued."""
+        with self._condition:
+            self._pending.clear()
+
+    def shutdown(self) -> None:
+        """Stop the worker thread."""
+        with self._condition:
+            self._stopped = True
+            self._pending.clear()
+            self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+            # Let the rows painted at the same time join the batch
+            time.sleep(SNIFF_BATCH_DELAY)
+            with self._condition:
+                batch, self._pending = self._pending, {}
+            with tracer.span("sniff types", files=len(batch)):
+                found = sniff_batch(
+                    (
+                        (key, directory, name)
+                        for key, (directory, name) in batch.items()
+                    ),
+                    self.cache,
+                )
+            for directory, types in found.items():
+                self.types_found.emit(directory, types)
+
+
+class FolderSizer(QObject):
+    """Compute the sizes of folders in a background thread.
+
+    Sizes are emitted as ``{name: bytes}`` dictionaries while the folders
+    are finished, see :func:`~flitz.sizes.compute_sizes`. Only one job
+    runs at a time: starting a new one cancels the previous one, and
+    sizes of a cancelled job are never emitted.
+    """
+
+    sizes_found = pyqtSignal(object, object)
+    sizes_finished = pyqtSignal(object)
+
+    def __init__(
+        self, parent: Optional[QObject] = None, workers: int = SIZE_WORKERS
+    ) -> None:
+        super().__init__(parent)
+        self.workers = workers
+        self.current_job: Optional[SizeJob] = None
+
+    def start(self, path: Path, names: List[str]) -> SizeJob:
+        """Cancel any running job and size the folders ``names``."""
+        self.cancel()
+        job = SizeJob(path, names)
+        self.current_job = job
+        thread = threading.Thread(
+            target=self._run, args=(job,), name="flitz-sizes", daemon=True
+        )
+        thread.start()
+        return job
+
+    def cancel(self) -> None:
+        """Cancel the running job, if any."""
+        if self.current_job is not None:
+            self.current_job.cancel()
+            self.current_job = None
+
+    def is_current(self, job: SizeJob) -> bool:
+        """Check whether ``job`` is still the active job."""
+        return job is self.current_job and not job.cancelled
+
+    def _run(self, job: SizeJob) -> None:
+        def report(sizes: Dict[str, int]) -> None:
+            if not job.cancelled:
+                self.sizes_found.emit(job, sizes)
+
+        with tracer.span("folder sizes", path=job.path):
+            compute_sizes(job, report, workers=self.workers)
+        if not job.cancelled:
+            self.sizes_finished.emit(job)
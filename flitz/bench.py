@@ -0,0 +1,696 @@
+"""Benchmarks for Flitz hot paths.
+
+Run ``python -m flitz.bench --help`` for the available benchmarks. Results
+are printed as JSON. Given the results of an earlier run with
+``--baseline``, every result is compared to the same case of that run and
+the exit status is non-zero if any became slower than allowed by
+``--max-regression``.
+"""
+
+import argparse
+import json
+import os
+import random
+import stat
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import fastcopy
+from .file_operations import DirectorySnapshot, FileOperations
+from .filters import FuzzyFilter
+from .query import compile_query
+from .transfers import DeleteJob, TransferJob
+
+# Words synthetic file names are made of
+NAME_WORDS = [
+    "main",
+    "config",
+    "test",
+    "index",
+    "model",
+    "search",
+    "util",
+    "report",
+    "image",
+    "backup",
+    "Manager",
+    "View",
+]
+NAME_EXTENSIONS = [".py", ".txt", ".log", ".json", ".png", ".md", ""]
+
+# Shapes of synthetic trees: all entries in one folder, or folders of
+# DEEP_FILES files and DEEP_FOLDERS subfolders each
+TREE_SHAPES = ("wide", "deep")
+DEEP_FILES = 8
+DEEP_FOLDERS = 2
+# (entries, shape, file size) of the trees benchmarked by default: many
+# small files, and a few huge ones. Trees of a million entries take
+# minutes to create and copy, so they are only measured when asked for
+# with ``--entries 1M``.
+TREE_CASES: List[Tuple[int, str, int]] = [
+    (1000, "wide", 4096),
+    (1000, "deep", 4096),
+    (100_000, "wide", 0),
+    (100_000, "deep", 0),
+    (4, "wide", 64 * 1024**2),
+]
+# Name filters timed on loaded listings, as (text, fuzzy)
+TREE_FILTERS = [("config", False), ("mcfg", True), ("ext:log", False)]
+# Threads copying or deleting files, as for the headless commands
+TREE_WORKERS = 4
+# Result fields that hold measurements rather than describe the case
+MEASUREMENTS = {"matches", "error", "change"}
+
+
+def _default_dirs() -> List[str]:
+    """tmpfs (if available) and the regular temporary directory."""
+    dirs = []
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        dirs.append("/dev/shm")
+    dirs.append(tempfile.gettempdir())
+    return dirs
+
+
+def _write_file(path: Path, size: int) -> None:
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            f.write(block[: min(remaining, len(block))])
+            remaining -= len(block)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _synthetic_name(rng: random.Random, number: int) -> str:
+    words = rng.sample(NAME_WORDS, rng.randint(1, 3))
+    return f"{'_'.join(words)}{number}{rng.choice(NAME_EXTENSIONS)}"
+
+
+def _timings(
+    results: Dict[str, Any], timings: List[float], count: int, unit: str
+) -> Dict[str, Any]:
+    """Add the best and median of ``timings`` to ``results``."""
+    best = min(timings)
+    results["seconds"] = best
+    results["median_seconds"] = statistics.median(timings)
+    results[f"{unit}_per_second"] = count / best if best else None
+    return results
+
+
+def bench_copy(
+    dirs: List[str], size: int, repeat: int
+) -> List[Dict[str, Any]]:
+    """Time every copy strategy on a file of ``size`` bytes in each dir.
+
+    Point ``dirs`` at a tmpfs, a loop-mounted file system, a btrfs/XFS
+    volume and so on to compare the strategies across file systems.
+    """
+    results = []
+    for directory in dirs:
+        with tempfile.TemporaryDirectory(dir=directory) as tmp:
+            src = Path(tmp) / "source.bin"
+            _write_file(src, size)
+            for strategy in fastcopy.STRATEGIES:
+                dst = Path(tmp) / f"copy-{strategy}.bin"
+                timings: List[float] = []
+                error: Optional[str] = None
+                for _ in range(repeat):
+                    dst.unlink(missing_ok=True)
+                    start = time.perf_counter()
+                    try:
+                        fastcopy.copy_file(src, dst, strategies=[strategy])
+                    except OSError as e:
+                        error = str(e)
+                        break
+                    timings.append(time.perf_counter() - start)
+                result: Dict[str, Any] = {
+                    "benchmark": "copy",
+                    "dir": directory,
+                    "strategy": strategy,
+                    "bytes": size,
+                }
+                if error is not None:
+                    result["error"] = error
+                else:
+                    _timings(result, timings, size, "bytes")
+                results.append(result)
+    return results
+
+
+def synthetic_names(
+    count: int, seed: int = 0, metadata: bool = False
+) -> DirectorySnapshot:
+    """Snapshot of ``count`` made-up file names.
+
+    With ``metadata`` the rows get random sizes, modification times over
+    the last two years and one folder in ten; otherwise they have none.
+    """
+    rng = random.Random(seed)
+    snapshot = DirectorySnapshot(Path("/synthetic"))
+    now = time.time()
+    for number in range(count):
+        name = _synthetic_name(rng, number)
+        st = None
+        if metadata:
+            is_dir = rng.random() < 0.1
+            mode = (stat.S_IFDIR | 0o755) if is_dir else (stat.S_IFREG | 0o644)
+            size = int(rng.lognormvariate(10, 3))
+            mtime = now - rng.random() * 2 * 365 * 86400
+            st = os.stat_result(
+                (mode, number, 1, 1, 0, 0, size, mtime, mtime, mtime)
+            )
+        snapshot.append(name, st)
+    return snapshot
+
+
+def bench_fuzzy(
+    count: int, queries: List[str], repeat: int
+) -> List[Dict[str, Any]]:
+    """Time fuzzy matching and scoring of ``count`` names per query."""
+    snapshot = synthetic_names(count)
+    fuzzy_filter = FuzzyFilter()
+    start = time.perf_counter()
+    fuzzy_filter.prepare(snapshot)
+    prepare_seconds = time.perf_counter() - start
+    results = []
+    for query in queries:
+        timings = []
+        matches = 0
+        for _ in range(repeat):
+            # Forget the previous result, which would be reused
+            fuzzy_filter.match(snapshot, "")
+            start = time.perf_counter()
+            ranked = fuzzy_filter.match(snapshot, query)
+            timings.append(time.perf_counter() - start)
+            matches = len(ranked or ())
+        best = min(timings)
+        results.append(
+            {
+                "benchmark": "fuzzy",
+                "names": count,
+                "query": query,
+                "matches": matches,
+                "prepare_seconds": prepare_seconds,
+                "seconds": best,
+                "median_seconds": statistics.median(timings),
+                "names_per_second": count / best if best else None,
+            }
+        )
+    return results
+
+
+def bench_query(
+    count: int, queries: List[str], repeat: int
+) -> List[Dict[str, Any]]:
+    """Time evaluating attribute queries over ``count`` rows."""
+    snapshot = synthetic_names(count, metadata=True)
+    results = []
+    for text in queries:
+        start = time.perf_counter()
+        query = compile_query(text)
+        compile_seconds = time.perf_counter() - start
+        timings = []
+        matches = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            matches = len(query.rows(snapshot))
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        results.append(
+            {
+                "benchmark": "query",
+                "rows": count,
+                "query": text,
+                "matches": matches,
+                "compile_seconds": compile_seconds,
+                "seconds": best,
+                "median_seconds": statistics.median(timings),
+                "rows_per_second": count / best if best else None,
+            }
+        )
+    return results
+
+
+def make_tree(
+    root: Path, entries: int, shape: str, file_size: int, seed: int = 0
+) -> List[Path]:
+    """Fill the new folder ``root`` with ``entries`` synthetic entries.
+
+    A ``wide`` tree has all of them in ``root``; a ``deep`` one is filled
+    breadth first with folders of :data:`DEEP_FILES` files and
+    :data:`DEEP_FOLDERS` subfolders. Every file has ``file_size`` bytes.
+    Returns the folders of the tree, ``root`` first.
+    """
+    if shape not in TREE_SHAPES:
+        raise ValueError(f"Unknown tree shape: {shape}")
+    rng = random.Random(seed)
+    data = os.urandom(min(file_size, 1024 * 1024))
+    root.mkdir()
+    folders = [root]
+    created = 0
+    for folder in folders:
+        if created >= entries:
+            break
+        files = entries if shape == "wide" else DEEP_FILES
+        for _ in range(min(files, entries - created)):
+            path = folder / _synthetic_name(rng, created)
+            with open(path, "wb") as f:
+                remaining = file_size
+                while remaining > 0:
+                    remaining -= f.write(data[:remaining])
+            created += 1
+        if shape == "deep":
+            for _ in range(min(DEEP_FOLDERS, entries - created)):
+                subfolder = folder / f"folder{created}"
+                subfolder.mkdir()
+                folders.append(subfolder)
+                created += 1
+    return folders
+
+
+def _measure(run: Callable[[], Any], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _bench_listing(
+    case: Dict[str, Any], folders: List[Path], repeat: int
+) -> List[Dict[str, Any]]:
+    """Time scanning and listing every folder of a tree."""
+    results = []
+    for operation, list_folder in (
+        ("scan", FileOperations.scan_directory),
+        ("list_directory", FileOperations.list_directory),
+    ):
+        timings = _measure(
+            lambda: [list_folder(folder) for folder in folders], repeat
+        )
+        results.append(
+            _timings(
+                {**case, "operation": operation},
+                timings,
+                case["entries"],
+                "entries",
+            )
+        )
+    return results
+
+
+def _bench_view(
+    case: Dict[str, Any], root: Path, repeat: int
+) -> List[Dict[str, Any]]:
+    """Time loading, filtering and sorting ``root`` in the file list.
+
+    Rates are per row of ``root``, which for deep trees holds only a few
+    of the entries; the results report the number as ``rows``. Runs with
+    the offscreen Qt platform unless another one is set.
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtCore import QEventLoop, Qt
+    from PyQt6.QtWidgets import QApplication
+
+    from .cache import listing_cache
+    from .file_model import COLUMNS
+    from .main import FileListWidget
+
+    app = QApplication.instance() or QApplication([])
+    widget = FileListWidget()
+    try:
+        widget.set_type_sniffing(False)
+        loop = QEventLoop()
+        widget.load_finished.connect(lambda count: loop.quit())
+        model = widget.file_model
+
+        def load() -> None:
+            listing_cache.clear()
+            widget.load_directory(root)
+            loop.exec()
+
+        load_timings = _measure(load, repeat)
+        count = len(model.snapshot)
+        case = {**case, "rows": count}
+        results = [
+            _timings(
+                {**case, "operation": "load_directory"},
+                load_timings,
+                count,
+                "rows",
+            )
+        ]
+        for text, fuzzy in TREE_FILTERS:
+            timings = []
+            for _ in range(repeat):
+                widget.filter_items("")
+                start = time.perf_counter()
+                widget.filter_items(text, fuzzy)
+                timings.append(time.perf_counter() - start)
+            result = {**case, "operation": "filter_items", "query": text}
+            result["fuzzy"] = fuzzy
+            result["matches"] = model.rowCount()
+            results.append(_timings(result, timings, count, "rows"))
+        widget.filter_items("")
+
+        for column, title in enumerate(COLUMNS):
+
+            def sort() -> None:
+                # Sort keys are kept per listing; time them being built
+                model.sort_keys.reset()
+                model.sort(column, Qt.SortOrder.AscendingOrder)
+
+            results.append(
+                _timings(
+                    {**case, "operation": "sort", "column": title},
+                    _measure(sort, repeat),
+                    count,
+                    "rows",
+                )
+            )
+        return results
+    finally:
+        # The scheduler thread and pools of the list would live on
+        widget.transfers.shutdown()
+        widget.sniffer.shutdown()
+        widget.close()
+        widget.deleteLater()
+        app.processEvents()
+
+
+def _bench_transfers(
+    case: Dict[str, Any], root: Path, repeat: int
+) -> List[Dict[str, Any]]:
+    """Time copying, moving within the file system and deleting a tree."""
+    timings: Dict[str, List[float]] = {"copy": [], "move": [], "delete": []}
+    files = total = 0
+    with ThreadPoolExecutor(
+        max_workers=TREE_WORKERS, thread_name_prefix="flitz-bench"
+    ) as pool:
+        for number in range(repeat):
+            copies = root.parent / f"copy{number}"
+            moved = root.parent / f"moved{number}"
+            copies.mkdir()
+            moved.mkdir()
+            copy = TransferJob("copy", [root], copies)
+            move = TransferJob("move", [copies / root.name], moved)
+            jobs: List[Tuple[str, Callable[[], TransferJob]]] = [
+                ("copy", lambda: copy),
+                ("move", lambda: move),
+                ("delete", lambda: DeleteJob.stage([moved / root.name])),
+            ]
+            for operation, create in jobs:
+                start = time.perf_counter()
+                job = create()
+                job.run(pool)
+                timings[operation].append(time.perf_counter() - start)
+                if job.errors:
+                    raise OSError(f"{operation} failed: {job.errors[0][1]}")
+            progress = copy.progress()
+            files, total = progress.done_files, progress.done_bytes
+            copies.rmdir()
+            moved.rmdir()
+    results = []
+    for operation, operation_timings in timings.items():
+        result = _timings(
+            {**case, "operation": operation},
+            operation_timings,
+            files,
+            "files",
+        )
+        best = result["seconds"]
+        result["bytes_per_second"] = total / best if best else None
+        results.append(result)
+    return results
+
+
+def bench_tree(
+    directory: str,
+    entries: int,
+    shape: str,
+    file_size: int,
+    repeat: int,
+    view: bool = True,
+) -> List[Dict[str, Any]]:
+    """Time the file operations on a synthetic tree in ``directory``.
+
+    The tree is listed folder by folder, its top folder is loaded,
+    filtered and sorted in the file list (unless ``view`` is false) and
+    it is copied, moved and deleted. Put ``directory`` on a tmpfs to time
+    Flitz rather than the disk.
+    """
+    case = {
+        "benchmark": "tree",
+        "dir": directory,
+        "entries": entries,
+        "shape": shape,
+        "file_size": file_size,
+    }
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        start = time.perf_counter()
+        folders = make_tree(Path(tmp) / "tree", entries, shape, file_size)
+        create_seconds = time.perf_counter() - start
+        results = _bench_listing(case, folders, repeat)
+        if view:
+            results.extend(_bench_view(case, folders[0], repeat))
+        results.extend(_bench_transfers(case, folders[0], repeat))
+    for result in results:
+        result["create_seconds"] = create_seconds
+    return results
+
+
+def _case(result: Dict[str, Any]) -> str:
+    """Identity of the case measured by ``result``."""
+    return json.dumps(
+        {
+            key: value
+            for key, value in result.items()
+            if key not in MEASUREMENTS
+            and not key.endswith("seconds")
+            and not key.endswith("per_second")
+        },
+        sort_keys=True,
+    )
+
+
+def compare_results(
+    results: List[Dict[str, Any]],
+    baseline: List[Dict[str, Any]],
+    max_regression: float,
+) -> List[Dict[str, Any]]:
+    """Compare ``results`` to those of the same cases in ``baseline``.
+
+    Results with a counterpart get its time as ``baseline_seconds`` and
+    the relative ``change`` of their time, e.g. 0.1 for 10% slower.
+    Returns those that became slower by more than ``max_regression``.
+    """
+    previous = {
+        _case(result): result["seconds"]
+        for result in baseline
+        if "seconds" in result
+    }
+    regressions = []
+    for result in results:
+        baseline_seconds = previous.get(_case(result))
+        if baseline_seconds is None or "seconds" not in result:
+            continue
+        result["baseline_seconds"] = baseline_seconds
+        if baseline_seconds > 0:
+            result["change"] = result["seconds"] / baseline_seconds - 1
+            if result["change"] > max_regression:
+                regressions.append(result)
+    return regressions
+
+
+def _parse_size(text: str) -> int:
+    units = {"K": 1024, "M": 1024**2, "G": 1024**3}
+    if text and text[-1].upper() in units:
+        return int(float(text[:-1]) * units[text[-1].upper()])
+    return int(text)
+
+
+def _size_list(values: Optional[List[str]]) -> List[int]:
+    return [_parse_size(value) for value in values or ()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point; returns the exit status."""
+    parser = argparse.ArgumentParser(
+        prog="python -m flitz.bench", description=__doc__
+    )
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    output_options = argparse.ArgumentParser(add_help=False)
+    output_options.add_argument(
+        "--output", help="Also write the results as JSON to this file"
+    )
+    output_options.add_argument(
+        "--baseline", help="Compare to the results in this JSON file"
+    )
+    output_options.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.25,
+        help="Largest tolerated slowdown against the baseline "
+        "(default: 0.25, i.e. 25%%)",
+    )
+
+    copy_parser = subparsers.add_parser(
+        "copy",
+        parents=[output_options],
+        help="Compare the fastcopy strategies",
+    )
+    copy_parser.add_argument(
+        "--dir",
+        action="append",
+        dest="dirs",
+        help="Directory to benchmark in; may be repeated "
+        "(default: /dev/shm and the temporary directory)",
+    )
+    copy_parser.add_argument(
+        "--size", default="256M", help="File size, e.g. 64M or 1G"
+    )
+    copy_parser.add_argument("--repeat", type=int, default=3)
+
+    fuzzy_parser = subparsers.add_parser(
+        "fuzzy",
+        parents=[output_options],
+        help="Measure fuzzy matching throughput",
+    )
+    fuzzy_parser.add_argument(
+        "--names", default="1M", help="Number of names, e.g. 100K or 1M"
+    )
+    fuzzy_parser.add_argument(
+        "--query",
+        action="append",
+        dest="queries",
+        help="Query to match; may be repeated (default: a few typical ones)",
+    )
+    fuzzy_parser.add_argument("--repeat", type=int, default=3)
+
+    query_parser = subparsers.add_parser(
+        "query",
+        parents=[output_options],
+        help="Measure attribute query throughput",
+    )
+    query_parser.add_argument(
+        "--rows", default="1M", help="Number of rows, e.g. 100K or 1M"
+    )
+    query_parser.add_argument(
+        "--query",
+        action="append",
+        dest="queries",
+        help="Query to evaluate; may be repeated (default: a few typical ones)",
+    )
+    query_parser.add_argument("--repeat", type=int, default=3)
+
+    tree_parser = subparsers.add_parser(
+        "tree",
+        parents=[output_options],
+        help="Measure listing, loading, filtering, sorting and transfers "
+        "of synthetic trees",
+    )
+    tree_parser.add_argument(
+        "--dir",
+        help="Directory to create the trees in "
+        "(default: /dev/shm, else the temporary directory)",
+    )
+    tree_parser.add_argument(
+        "--entries",
+        action="append",
+        help="Number of entries, e.g. 1K or 1M; may be repeated. "
+        "The default trees have up to 100K entries",
+    )
+    tree_parser.add_argument(
+        "--shape",
+        action="append",
+        choices=TREE_SHAPES,
+        help="Tree shape; may be repeated",
+    )
+    tree_parser.add_argument(
+        "--file-size",
+        action="append",
+        help="Size of every file, e.g. 0 or 64M; may be repeated. "
+        "Without --entries, --shape and --file-size a few typical "
+        "trees are measured; the options given replace those of them",
+    )
+    tree_parser.add_argument(
+        "--no-view",
+        action="store_true",
+        help="Do not load the trees into the file list, which needs Qt",
+    )
+    tree_parser.add_argument("--repeat", type=int, default=3)
+
+    args = parser.parse_args(argv)
+    if args.benchmark == "copy":
+        results = bench_copy(
+            args.dirs or _default_dirs(), _parse_size(args.size), args.repeat
+        )
+    elif args.benchmark == "fuzzy":
+        results = bench_fuzzy(
+            _parse_size(args.names),
+            args.queries or ["mcfg", "srchidx", "testlog", "xyz"],
+            args.repeat,
+        )
+    elif args.benchmark == "query":
+        results = bench_query(
+            _parse_size(args.rows),
+            args.queries
+            or ["size>1M", "mtime<7d", "ext:log", "size>1G mtime<30d ext:log"],
+            args.repeat,
+        )
+    elif args.benchmark == "tree":
+        entries = _size_list(args.entries)
+        file_sizes = _size_list(args.file_size)
+        if entries or args.shape or file_sizes:
+            cases = [
+                (count, shape, file_size)
+                for count in entries or [1000]
+                for shape in args.shape or ["wide"]
+                for file_size in file_sizes or [0]
+            ]
+        else:
+            cases = TREE_CASES
+        directory = args.dir or _default_dirs()[0]
+        results = []
+        for count, shape, file_size in cases:
+            results.extend(
+                bench_tree(
+                    directory,
+                    count,
+                    shape,
+                    file_size,
+                    args.repeat,
+                    view=not args.no_view,
+                )
+            )
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.max_regression)
+        for result in regressions:
+            print(
+                f"Regression: {_case(result)} took {result['seconds']:.6f} s "
+                f"instead of {result['baseline_seconds']:.6f} s",
+                file=sys.stderr,
+            )
+        status = 1 if regressions else 0
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
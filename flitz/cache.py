@@ -0,0 +1,154 @@
+"""Process-wide cache of directory listings."""
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple, Optional, Tuple
+
+from .file_operations import DirectorySnapshot
+
+# (device, inode, path, show_hidden)
+CacheKey = Tuple[int, int, str, bool]
+
+
+class CacheStats(NamedTuple):
+    """Snapshot of the cache counters."""
+
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    bytes: int
+
+
+class _CacheEntry:
+    __slots__ = ("snapshot", "mtime_ns", "nbytes")
+
+    def __init__(
+        self, snapshot: DirectorySnapshot, mtime_ns: int, nbytes: int
+    ) -> None:
+        self.snapshot = snapshot
+        self.mtime_ns = mtime_ns
+        self.nbytes = nbytes
+
+
+class ListingCache:
+    """LRU cache of directory snapshots.
+
+    Entries are keyed by the directory's device, inode and path and are
+    only returned while the directory's mtime is unchanged, so a lookup
+    costs a single ``stat`` of the directory. The cache is bounded both
+    by the number of listings and by their estimated size in bytes.
+    """
+
+    def __init__(
+        self, max_entries: int = 64, max_bytes: int = 256 * 1024 * 1024
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[CacheKey, _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(path: Path, st: os.stat_result, show_hidden: bool) -> CacheKey:
+        return (st.st_dev, st.st_ino, str(path), show_hidden)
+
+    def get(
+        self, path: Path, show_hidden: bool = False
+    ) -> Optional[DirectorySnapshot]:
+        """Return the cached listing of ``path`` if it is still valid."""
+        try:
+            st = os.stat(path)
+        except (OSError, PermissionError):
+            return None
+
+        key = self._key(path, st, show_hidden)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.mtime_ns != st.st_mtime_ns:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.snapshot
+
+    def put(
+        self,
+        path: Path,
+        show_hidden: bool,
+        snapshot: DirectorySnapshot,
+        st: os.stat_result,
+    ) -> None:
+        """Store a listing of ``path``.
+
+        ``st`` must be the directory's stat result from *before* the scan
+        started, so changes made while scanning invalidate the entry.
+        """
+        key = self._key(path, st, show_hidden)
+        entry = _CacheEntry(snapshot, st.st_mtime_ns, snapshot.nbytes)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            self._evict()
+
+    def invalidate(self, path: Path) -> None:
+        """Drop all listings of ``path``."""
+        name = str(path)
+        with self._lock:
+            for key in [key for key in self._entries if key[2] == name]:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Drop all listings and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def resize(self, max_entries: int, max_bytes: int) -> None:
+        """Change the bounds, evicting listings that no longer fit."""
+        with self._lock:
+            self.max_entries = max_entries
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def stats(self) -> CacheStats:
+        """Current hit, miss and size counters."""
+        with self._lock:
+            return CacheStats(
+                self.hits,
+                self.misses,
+                self.evictions,
+                len(self._entries),
+                self._bytes,
+            )
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.nbytes
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or self._bytes > self.max_bytes
+        ):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+
+listing_cache = ListingCache()
@@ -0,0 +1,234 @@
+"""Command line interface.
+
+``flitz [PATH]`` opens the file explorer. The subcommands ``ls``, ``cp``,
+``mv``, ``rm`` and ``du`` run without a display: they only import the
+Qt-free core, so they start quickly and can be called from batch jobs.
+With ``--json`` they print a single JSON document instead of text.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Sequence
+
+if TYPE_CHECKING:
+    from .transfers import TransferJob
+
+COMMANDS = ("ls", "cp", "mv", "rm", "du")
+
+# Threads copying or deleting files for one command
+TRANSFER_WORKERS = 4
+
+
+def _print_json(data: Any) -> None:
+    json.dump(data, sys.stdout)
+    sys.stdout.write("\n")
+
+
+def _error(command: str, message: str) -> None:
+    print(f"flitz {command}: {message}", file=sys.stderr)
+
+
+def _absolute(path: str) -> Path:
+    return Path(os.path.abspath(path))
+
+
+def run_ls(args: argparse.Namespace) -> int:
+    """List a folder, folders first and names in natural order."""
+    from .file_operations import FileOperations
+
+    path = _absolute(args.path)
+    if not path.is_dir():
+        _error("ls", f"not a folder: {args.path}")
+        return 1
+    snapshot = FileOperations.scan_directory(path, args.all)
+    rows = sorted(
+        range(len(snapshot)),
+        key=lambda row: (not snapshot.is_dir(row), snapshot.sort_names[row]),
+    )
+    items = [snapshot.item(row) for row in rows]
+
+    if args.json:
+        _print_json(
+            [
+                {
+                    "name": item.name,
+                    "is_dir": item.is_directory,
+                    "size": None if item.is_directory else item.size,
+                    "mtime": item.mtime,
+                    "type": item.file_type,
+                }
+                for item in items
+            ]
+        )
+    else:
+        for item in items:
+            suffix = "/" if item.is_directory else ""
+            print(
+                f"{item.modified_str:19}  {item.size_str:>10}  "
+                f"{item.name}{suffix}"
+            )
+    return 0
+
+
+def run_du(args: argparse.Namespace) -> int:
+    """Print the total size of each path."""
+    from .file_operations import format_size
+    from .sizes import SizeJob, compute_sizes
+
+    status = 0
+    totals: Dict[str, int] = {}
+    for name in args.paths:
+        path = _absolute(name).resolve()
+        try:
+            st = os.lstat(path)
+        except OSError as e:
+            _error("du", f"{name}: {e.strerror}")
+            status = 1
+            continue
+        if path.is_dir():
+            # "." makes the folder itself the only one summed up
+            sizes = compute_sizes(SizeJob(path, ["."]), lambda sizes: None)
+            totals[name] = sizes.get(".", 0)
+        else:
+            totals[name] = st.st_size
+
+    if args.json:
+        _print_json(totals)
+    else:
+        for name, size in totals.items():
+            print(f"{format_size(size)}\t{name}")
+    return status
+
+
+def _report(command: str, args: argparse.Namespace, job: "TransferJob") -> int:
+    """Print the outcome of a finished transfer job."""
+    progress = job.progress()
+    if args.json:
+        _print_json(
+            {
+                "completed": [str(path) for path in job.completed],
+                "errors": [
+                    {"path": str(path), "error": error}
+                    for path, error in job.errors
+                ],
+                "files": progress.done_files,
+                "bytes": progress.done_bytes,
+                "seconds": round(time.monotonic() - args.started, 3),
+            }
+        )
+    else:
+        for path, error in job.errors:
+            _error(command, f"{path}: {error}")
+    return 1 if job.errors else 0
+
+
+def _run_job(job: "TransferJob") -> None:
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(
+        max_workers=TRANSFER_WORKERS, thread_name_prefix="flitz-transfer"
+    ) as pool:
+        job.run(pool)
+
+
+def run_transfer(args: argparse.Namespace) -> int:
+    """Copy or move paths into a folder."""
+    from .transfers import TransferJob
+
+    command = args.command
+    destination = _absolute(args.destination)
+    if not destination.is_dir():
+        _error(command, f"not a folder: {args.destination}")
+        return 1
+    sources = [_absolute(source) for source in args.sources]
+    job = TransferJob(
+        "copy" if command == "cp" else "move", sources, destination
+    )
+    _run_job(job)
+    return _report(command, args, job)
+
+
+def run_rm(args: argparse.Namespace) -> int:
+    """Delete paths, folders with their contents."""
+    from .transfers import DeleteJob
+
+    missing = [path for path in args.paths if not os.path.lexists(path)]
+    for path in missing:
+        _error("rm", f"{path}: No such file or directory")
+    paths = [_absolute(path) for path in args.paths if path not in missing]
+    if not paths:
+        return 1
+    job = DeleteJob.stage(paths)
+    _run_job(job)
+    return _report("rm", args, job) or (1 if missing else 0)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Parser of the headless subcommands."""
+    parser = argparse.ArgumentParser(
+        prog="flitz", description="Flitz file operations without a window"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    json_option = argparse.ArgumentParser(add_help=False)
+    json_option.add_argument(
+        "--json", action="store_true", help="print the result as JSON"
+    )
+
+    ls = commands.add_parser("ls", parents=[json_option], help="list a folder")
+    ls.add_argument("path", nargs="?", default=".")
+    ls.add_argument(
+        "-a", "--all", action="store_true", help="include hidden entries"
+    )
+    ls.set_defaults(run=run_ls)
+
+    for name, verb in (("cp", "copy"), ("mv", "move")):
+        transfer = commands.add_parser(
+            name,
+            parents=[json_option],
+            help=f"{verb} paths into an existing folder",
+        )
+        transfer.add_argument("sources", nargs="+")
+        transfer.add_argument("destination")
+        transfer.set_defaults(run=run_transfer)
+
+    rm = commands.add_parser(
+        "rm", parents=[json_option], help="delete files and folders"
+    )
+    rm.add_argument("paths", nargs="+")
+    rm.set_defaults(run=run_rm)
+
+    du = commands.add_parser(
+        "du", parents=[json_option], help="total size of files and folders"
+    )
+    du.add_argument("paths", nargs="*", default=["."])
+    du.set_defaults(run=run_du)
+    return parser
+
+
+def run(argv: Sequence[str]) -> int:
+    """Run a headless subcommand and return its exit status."""
+    from .tracing import tracer
+
+    args = build_parser().parse_args(argv)
+    args.started = time.monotonic()
+    with tracer.span(args.command):
+        status: int = args.run(args)
+    return status
+
+
+def main() -> None:
+    """Main entry point: run a subcommand or open the file explorer."""
+    from .tracing import tracer
+
+    tracer.enable_from_environment()
+    arguments = sys.argv[1:]
+    if arguments and arguments[0] in COMMANDS:
+        sys.exit(run(arguments))
+
+    from .startup import launch
+
+    launch(arguments)
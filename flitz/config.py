@@ -1,11 +1,49 @@
 """Configuration management for Flitz."""
 
+import marshal
+import os
+import re
+import stat
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-import yaml
 from pydantic import BaseModel, Field, field_validator
 
+# Changes whenever cached configurations can no longer be read
+CONFIG_CACHE_VERSION = 1
+
+# (path, mtime in ns, size) of a configuration file, or ``None``s for
+# a file that does not exist
+SourceKey = Tuple[str, Optional[int], Optional[int]]
+
+
+def config_file_path() -> Path:
+    """Location of the main configuration file, ~/.flitz.yml."""
+    return Path.home() / ".flitz.yml"
+
+
+def default_config_cache_path() -> Path:
+    """Location of the merged configuration in the user's cache."""
+    cache = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache) / "flitz" / "config.marshal"
+
+
+def source_key(path: Path) -> SourceKey:
+    """Key telling whether the configuration file ``path`` changed."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (str(path), None, None)
+    return (str(path), st.st_mtime_ns, st.st_size)
+
+
+def _read_yaml(path: Path) -> Dict[str, Any]:
+    import yaml
+
+    with open(path, "r", encoding="utf-8") as f:
+        data: Dict[str, Any] = yaml.safe_load(f) or {}
+    return data
+
 
 class Config(BaseModel):
     """Application configuration."""
@@ -13,6 +51,42 @@ class Config(BaseModel):
     font_size: int = Field(
         default=14, description="Font size for the application"
     )
+    listing_cache_entries: int = Field(
+        default=64, description="Number of directory listings to cache"
+    )
+    listing_cache_mb: int = Field(
+        default=256, description="Memory limit for cached listings in MB"
+    )
+    search_exclude: List[str] = Field(
+        default=["node_modules", "__pycache__"],
+        description="Name patterns skipped by recursive search",
+    )
+    content_search_max_mb: int = Field(
+        default=64, description="Largest file searched by content search"
+    )
+    index_roots: List[str] = Field(
+        default=[], description="Folders kept in the file-name index"
+    )
+    index_refresh_minutes: int = Field(
+        default=10, description="Interval between index updates"
+    )
+    folder_sizes: bool = Field(
+        default=False,
+        description="Compute the sizes of folders whenever one is opened",
+    )
+    sniff_file_types: bool = Field(
+        default=True,
+        description="Recognize files without a known extension by content",
+    )
+    trace_file: Optional[str] = Field(
+        default=None,
+        description="File the timing spans are written to at exit",
+    )
+    profile_file: Optional[str] = Field(
+        default=None,
+        description="File a cProfile capture of the next navigation is "
+        "written to",
+    )
     external_config: Optional[Union[str, List[str]]] = Field(
         default=None, description="Path(s) to external configuration files"
     )
@@ -26,15 +100,24 @@ class Config(BaseModel):
         return v
 
     @staticmethod
-    def load() -> "Config":
-        """Load configuration from ~/.flitz.yml and external configs."""
-        config_path = Path.home() / ".flitz.yml"
+    def _cache_tag() -> List[Any]:
+        """Identifies the layout of cached configurations."""
+        return [CONFIG_CACHE_VERSION, sorted(Config.model_fields)]
+
+    @staticmethod
+    def read_files() -> Tuple[Dict[str, Any], List[SourceKey]]:
+        """Merge ~/.flitz.yml and its external configs.
+
+        Returns the merged settings and the keys of all files that were
+        looked at, including missing ones, as of before they were read.
+        """
+        config_path = config_file_path()
+        sources = [source_key(config_path)]
         config_data: Dict[str, Any] = {}
 
         # Load main config if it exists
         if config_path.exists():
-            with open(config_path, "r", encoding="utf-8") as f:
-                config_data = yaml.safe_load(f) or {}
+            config_data = _read_yaml(config_path)
 
         # Load external configs if specified
         external_configs = config_data.get("external_config", [])
@@ -44,10 +127,129 @@ class Config(BaseModel):
 
             for ext_config_path in external_configs:
                 ext_path = Path(ext_config_path).expanduser()
+                sources.append(source_key(ext_path))
                 if ext_path.exists():
-                    with open(ext_path, "r", encoding="utf-8") as f:
-                        ext_data = yaml.safe_load(f) or {}
-                        # External configs can override existing values
-                        config_data.update(ext_data)
+                    # External configs can override existing values
+                    config_data.update(_read_yaml(ext_path))
+
+        return config_data, sources
+
+    @staticmethod
+    def load(cache_path: Optional[Path] = None) -> "Config":
+        """Load configuration from ~/.flitz.yml and external configs.
+
+        The merged and validated configuration is cached in
+        ``cache_path``, by default in the user's cache directory, and
+        reused as long as none of the files it was read from changed.
+        The YAML files are then not parsed at all.
+        """
+        return Config.load_with_sources(cache_path)[0]
+
+    @staticmethod
+    def load_with_sources(
+        cache_path: Optional[Path] = None,
+    ) -> Tuple["Config", List[SourceKey]]:
+        """Like :meth:`load`, also returning the keys of the files read."""
+        if cache_path is None:
+            cache_path = default_config_cache_path()
+        cached = Config._load_cached(cache_path)
+        if cached is not None:
+            return cached
+
+        config_data, sources = Config.read_files()
+        config = Config(**config_data)
+        Config._store_cached(cache_path, config, sources)
+        return config, sources
+
+    @staticmethod
+    def _load_cached(
+        cache_path: Path,
+    ) -> Optional[Tuple["Config", List[SourceKey]]]:
+        try:
+            with open(cache_path, "rb") as f:
+                tag, sources, data = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if tag != Config._cache_tag():
+            return None
+        # Cached for another home folder, e.g. with XDG_CACHE_HOME shared
+        if not sources or sources[0][0] != str(config_file_path()):
+            return None
+        for path, mtime_ns, size in sources:
+            if source_key(Path(path)) != (path, mtime_ns, size):
+                return None
+        # Validated before it was cached
+        return Config.model_construct(**data), [
+            (path, mtime_ns, size) for path, mtime_ns, size in sources
+        ]
+
+    @staticmethod
+    def _store_cached(
+        cache_path: Path, config: "Config", sources: List[SourceKey]
+    ) -> None:
+        content = marshal.dumps(
+            [Config._cache_tag(), sources, config.model_dump()]
+        )
+        temporary = cache_path.with_name(f"{cache_path.name}.{os.getpid()}")
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            temporary.write_bytes(content)
+            os.replace(temporary, cache_path)
+        except OSError:
+            temporary.unlink(missing_ok=True)
+
+    def changed_fields(self, other: "Config") -> Dict[str, Any]:
+        """Fields whose values differ in ``other``, with those values."""
+        return {
+            name: getattr(other, name)
+            for name in type(self).model_fields
+            if getattr(other, name) != getattr(self, name)
+        }
+
+    @staticmethod
+    def save_fields(values: Dict[str, Any]) -> None:
+        """Write ``values`` into ~/.flitz.yml.
+
+        Only the lines of the given top-level keys are replaced or
+        appended, so comments and the other settings are kept. External
+        configs still override what is written here. A symlinked file is
+        written where the link points to and keeps its permissions.
+        """
+        config_path = config_file_path().resolve()
+        try:
+            mode: Optional[int] = stat.S_IMODE(os.stat(config_path).st_mode)
+            text = config_path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            mode = None
+            text = ""
+        text = _set_yaml_keys(text, values)
+        temporary = config_path.with_name(f"{config_path.name}.{os.getpid()}")
+        try:
+            temporary.write_text(text, encoding="utf-8")
+            if mode is not None:
+                os.chmod(temporary, mode)
+            os.replace(temporary, config_path)
+        except OSError:
+            temporary.unlink(missing_ok=True)
+            raise
+
+
+def _set_yaml_keys(text: str, values: Dict[str, Any]) -> str:
+    """Set top-level ``values`` in the YAML document ``text``."""
+    import yaml
 
-        return Config(**config_data)
+    for key, value in values.items():
+        # A one-line flow mapping without its braces
+        line = yaml.safe_dump(
+            {key: value}, default_flow_style=True, width=float("inf")
+        ).strip()[1:-1]
+        # The key's line and the indented or listed lines of its value
+        pattern = re.compile(
+            rf"^{re.escape(key)}[ \t]*:[^\n]*(?:\n[ \t-][^\n]*)*", re.M
+        )
+        text, count = pattern.subn(lambda _match: line, text, count=1)
+        if not count:
+            if text and not text.endswith("\n"):
+                text += "\n"
+            text += line + "\n"
+    return text
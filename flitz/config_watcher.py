@@ -0,0 +1,236 @@
+"""Reloading the configuration when its files change."""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from PyQt6.QtCore import QObject, QSocketNotifier, QTimer, pyqtSignal
+
+from .config import Config, SourceKey, source_key
+from .watcher import (
+    IN_CLOSE_WRITE,
+    IN_CREATE,
+    IN_DELETE,
+    IN_MODIFY,
+    IN_MOVED_FROM,
+    IN_MOVED_TO,
+    IN_Q_OVERFLOW,
+    POLL_INTERVAL_MS,
+    Inotify,
+)
+
+# Events of a folder that may change one of the files in it
+CONFIG_WATCH_MASK = (
+    IN_MODIFY
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+)
+
+# Changes are collected for this long before the files are read again
+RELOAD_DELAY_MS = 200
+# Runtime changes are collected for this long before they are written
+SAVE_DELAY_MS = 1000
+
+
+class ConfigWatcher(QObject):
+    """Reload ~/.flitz.yml and its external configs when they change.
+
+    The files are watched with inotify, or by polling their mtimes where
+    that is unavailable; symlinked files are watched where they point to
+    as well. They are merged and validated again on a worker
+    thread, which also writes runtime changes such as the font size back
+    to ~/.flitz.yml once they stopped changing for a moment.
+
+    ``config_changed`` is emitted with the new configuration and the
+    fields that changed on disk, compared to the configuration that was
+    loaded before. Runtime changes that were not saved yet therefore stay
+    in effect unless the files change the same fields, and saved ones
+    are not reported back as changes.
+    ``reload_failed`` carries an error message for files that could not
+    be read or were invalid; the last good configuration stays in use.
+    """
+
+    config_changed = pyqtSignal(object, object)
+    reload_failed = pyqtSignal(str)
+    # Results of the worker thread
+    _loaded = pyqtSignal(object, object)
+    _saved = pyqtSignal(object)
+
+    def __init__(
+        self,
+        config: Config,
+        parent: Optional[QObject] = None,
+        cache_path: Optional[Path] = None,
+    ) -> None:
+        super().__init__(parent)
+        # Configuration as last loaded from the files
+        self.loaded = config
+        self.cache_path = cache_path
+        self._sources: List[SourceKey] = []
+        # Files watched for changes, including the targets of symlinks
+        self._watched: List[Path] = []
+        # Keys of the files as last seen by polling
+        self._polled: List[SourceKey] = []
+        self._unsaved: Dict[str, Any] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="flitz-config"
+        )
+        self._loaded.connect(self._on_loaded)
+        self._saved.connect(self._on_saved)
+
+        self._inotify: Optional[Inotify] = None
+        self._notifier: Optional[QSocketNotifier] = None
+        # Watch descriptor -> names of the watched files in that folder
+        self._watches: Dict[int, Set[str]] = {}
+
+        self._reload_timer = QTimer(self)
+        self._reload_timer.setSingleShot(True)
+        self._reload_timer.setInterval(RELOAD_DELAY_MS)
+        self._reload_timer.timeout.connect(self.reload)
+
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.setInterval(SAVE_DELAY_MS)
+        self._save_timer.timeout.connect(self.flush)
+
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(POLL_INTERVAL_MS)
+        self._poll_timer.timeout.connect(self._poll)
+
+        if Inotify.available():
+            try:
+                self._inotify = Inotify()
+            except (OSError, AttributeError):
+                self._inotify = None
+        if self._inotify is not None:
+            self._notifier = QSocketNotifier(
+                self._inotify.fd, QSocketNotifier.Type.Read, self
+            )
+            self._notifier.activated.connect(self._read_events)
+
+        # Finds out which files to watch
+        self.reload()
+
+    @property
+    def sources(self) -> List[SourceKey]:
+        """Keys of the configuration files as of the last load."""
+        return self._sources
+
+    @property
+    def uses_inotify(self) -> bool:
+        """Whether changes are reported by inotify rather than polling."""
+        return bool(self._watches)
+
+    def reload(self) -> None:
+        """Read the configuration files again in the background."""
+        self._executor.submit(self._load)
+
+    def save(self, values: Dict[str, Any]) -> None:
+        """Write runtime changes to ~/.flitz.yml after a short delay.
+
+        Changes made in quick succession, such as repeated zooming, are
+        written once.
+        """
+        self._unsaved.update(values)
+        self._save_timer.start()
+
+    def flush(self) -> None:
+        """Write the runtime changes now."""
+        self._save_timer.stop()
+        if self._unsaved:
+            values, self._unsaved = self._unsaved, {}
+            self._executor.submit(self._save, values)
+
+    def close(self) -> None:
+        """Write pending changes and stop watching."""
+        self.flush()
+        self._reload_timer.stop()
+        self._poll_timer.stop()
+        self._unwatch()
+        if self._notifier is not None:
+            self._notifier.setEnabled(False)
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        self._executor.shutdown(wait=True)
+
+    def _load(self) -> None:
+        try:
+            config, sources = Config.load_with_sources(self.cache_path)
+        except Exception as e:
+            self.reload_failed.emit(str(e))
+            return
+        self._loaded.emit(config, sources)
+
+    def _save(self, values: Dict[str, Any]) -> None:
+        try:
+            Config.save_fields(values)
+        except OSError as e:
+            self.reload_failed.emit(f"Could not save settings: {e}")
+            return
+        self._saved.emit(values)
+
+    def _on_saved(self, values: Dict[str, Any]) -> None:
+        # The files now hold these values; reading them back is no change
+        self.loaded = self.loaded.model_copy(update=values)
+
+    def _on_loaded(self, config: Config, sources: List[SourceKey]) -> None:
+        watched = []
+        for key in sources:
+            path = Path(key[0])
+            watched.append(path)
+            # Edits of a symlinked file happen where the link points to
+            target = path.resolve()
+            if target != path:
+                watched.append(target)
+        if watched != self._watched:
+            self._watched = watched
+            self._watch(watched)
+        self._sources = self._polled = sources
+        changed = self.loaded.changed_fields(config)
+        self.loaded = config
+        # Changes about to be saved override the files
+        for name in self._unsaved:
+            changed.pop(name, None)
+        if changed:
+            self.config_changed.emit(config, changed)
+
+    def _watch(self, paths: List[Path]) -> None:
+        self._unwatch()
+        if self._inotify is not None:
+            folders: Dict[Path, Set[str]] = {}
+            for path in paths:
+                folders.setdefault(path.parent, set()).add(path.name)
+            try:
+                for folder, names in folders.items():
+                    wd = self._inotify.add_watch(folder, CONFIG_WATCH_MASK)
+                    self._watches.setdefault(wd, set()).update(names)
+                return
+            except OSError:
+                # E.g. the folder of an external config does not exist
+                self._unwatch()
+        self._poll_timer.start()
+
+    def _unwatch(self) -> None:
+        if self._inotify is not None:
+            for wd in self._watches:
+                self._inotify.rm_watch(wd)
+            self._inotify.read_events()
+        self._watches.clear()
+        self._poll_timer.stop()
+
+    def _read_events(self) -> None:
+        if self._inotify is None:
+            return
+        for wd, mask, name in self._inotify.read_events():
+            if mask & IN_Q_OVERFLOW or name in self._watches.get(wd, ()):
+                self._reload_timer.start()
+
+    def _poll(self) -> None:
+        keys = [source_key(Path(key[0])) for key in self._sources]
+        if keys != self._polled:
+            self._polled = keys
+            self._reload_timer.start()
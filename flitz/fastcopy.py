@@ -0,0 +1,324 @@
+"""Kernel-accelerated file copying."""
+
+import errno
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Strategies in order of preference
+REFLINK = "reflink"
+COPY_FILE_RANGE = "copy_file_range"
+SENDFILE = "sendfile"
+USERSPACE = "userspace"
+STRATEGIES = (REFLINK, COPY_FILE_RANGE, SENDFILE, USERSPACE)
+
+# ioctl(2) request cloning a whole file on CoW file systems (btrfs, XFS)
+FICLONE = 0x40049409
+
+# Bytes moved per system call; progress and cancellation are handled
+# between chunks.
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# Errors meaning "this strategy does not work for these files"
+_UNSUPPORTED = {
+    errno.EBADF,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.ENOTSUP,
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EXDEV,
+    errno.EPERM,
+}
+
+ProgressCallback = Callable[[int], None]
+Checkpoint = Callable[[], None]
+
+
+class _Unsupported(Exception):
+    """The strategy cannot copy between these descriptors."""
+
+
+def _noop(*args: object) -> None:
+    pass
+
+
+def _reflink(src_fd: int, dst_fd: int) -> None:
+    if not sys.platform.startswith("linux"):
+        raise _Unsupported()
+    import fcntl
+
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+    except OSError as e:
+        if e.errno in _UNSUPPORTED:
+            raise _Unsupported() from e
+        raise
+
+
+class CopyResult(NamedTuple):
+    """Outcome of copying one file."""
+
+    # Strategy that copied the (last) data
+    strategy: str
+    # Size of the copy, including holes
+    logical_bytes: int
+    # File data actually read and written; holes are skipped and reflinks
+    # share the source's extents
+    physical_bytes: int
+
+
+def _data_extents(fd: int, size: int) -> List[Tuple[int, int]]:
+    """Return the ``(start, end)`` ranges of ``fd`` holding data.
+
+    Uses ``SEEK_DATA``/``SEEK_HOLE``; without them the whole file counts
+    as data.
+    """
+    if not hasattr(os, "SEEK_DATA"):
+        return [(0, size)]
+    extents = []
+    offset = 0
+    while offset < size:
+        try:
+            start = os.lseek(fd, offset, os.SEEK_DATA)
+        except OSError as e:
+            if e.errno == errno.ENXIO:
+                # Only a hole is left
+                break
+            if e.errno in _UNSUPPORTED:
+                return [(0, size)]
+            raise
+        end = min(os.lseek(fd, start, os.SEEK_HOLE), size)
+        if end <= start:
+            break
+        extents.append((start, end))
+        offset = end
+    return extents
+
+
+def is_sparse(st: os.stat_result) -> bool:
+    """Whether a file occupies fewer blocks than its size needs."""
+    blocks = getattr(st, "st_blocks", None)
+    return blocks is not None and blocks * 512 < st.st_size
+
+
+class _Copier:
+    """Copy byte ranges between two descriptors with explicit offsets.
+
+    The first strategy that works is kept for all following ranges, and
+    since every chunk states its offsets a strategy can also be dropped
+    in the middle of a file.
+    """
+
+    def __init__(
+        self,
+        src_fd: int,
+        dst_fd: int,
+        progress: ProgressCallback,
+        checkpoint: Checkpoint,
+        strategies: Sequence[str],
+    ) -> None:
+        self.src_fd = src_fd
+        self.dst_fd = dst_fd
+        self.progress = progress
+        self.checkpoint = checkpoint
+        self.strategies = [s for s in strategies if s != REFLINK]
+        self.physical = 0
+        self._buffer: Optional[bytearray] = None
+
+    @property
+    def strategy(self) -> str:
+        if not self.strategies:
+            raise OSError(errno.ENOTSUP, "No copy strategy succeeded")
+        return self.strategies[0]
+
+    def copy_range(self, start: int, end: Optional[int], size: int) -> None:
+        """Copy ``start:end``, or up to the end of the source for ``None``.
+
+        ``size`` is the expected size of the source.
+        """
+        position = start
+        while True:
+            strategy = self.strategy
+            if end is not None and position >= end:
+                return
+            self.checkpoint()
+            length = (
+                CHUNK_SIZE if end is None else min(CHUNK_SIZE, end - position)
+            )
+            try:
+                count = self._copy_chunk(strategy, position, length)
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED:
+                    raise
+                self.strategies.pop(0)
+                continue
+            if count == 0:
+                if position == start and (end or size) > start:
+                    # Some kernels report success but copy nothing across
+                    # file systems
+                    self.strategies.pop(0)
+                    continue
+                # End of file, or the source shrank
+                return
+            position += count
+            self.physical += count
+            self.progress(count)
+
+    def _copy_chunk(self, strategy: str, position: int, length: int) -> int:
+        src_fd = self.src_fd
+        dst_fd = self.dst_fd
+        if strategy == COPY_FILE_RANGE:
+            if not hasattr(os, "copy_file_range"):
+                raise OSError(errno.ENOSYS, strategy)
+            return os.copy_file_range(
+                src_fd, dst_fd, length, position, position
+            )
+        if strategy == SENDFILE:
+            if not hasattr(os, "sendfile"):
+                raise OSError(errno.ENOSYS, strategy)
+            os.lseek(dst_fd, position, os.SEEK_SET)
+            return os.sendfile(dst_fd, src_fd, position, length)
+        if strategy == USERSPACE:
+            if self._buffer is None:
+                self._buffer = bytearray(CHUNK_SIZE)
+            view = memoryview(self._buffer)[:length]
+            os.lseek(src_fd, position, os.SEEK_SET)
+            count = os.readv(src_fd, [view])
+            os.lseek(dst_fd, position, os.SEEK_SET)
+            written = 0
+            while written < count:
+                written += os.write(dst_fd, view[written:count])
+            return count
+        raise ValueError(f"Unknown copy strategy: {strategy}")
+
+
+def copy_file_data(
+    src_fd: int,
+    dst_fd: int,
+    size: int = 0,
+    progress: ProgressCallback = _noop,
+    checkpoint: Checkpoint = _noop,
+    strategies: Sequence[str] = STRATEGIES,
+    sparse: bool = False,
+) -> CopyResult:
+    """Copy the contents of ``src_fd`` to ``dst_fd``.
+
+    Tries the given strategies in order and falls back to the next one
+    when the kernel or file system does not support it. ``progress`` is
+    called with the number of bytes advanced after every chunk and
+    ``checkpoint`` before every chunk, so it may block or raise to pause
+    or abort the copy.
+
+    With ``sparse`` only the data extents of the source are copied and
+    its holes are recreated in the copy; ``size`` must then be the
+    source's size.
+    """
+    if REFLINK in strategies:
+        checkpoint()
+        try:
+            _reflink(src_fd, dst_fd)
+        except _Unsupported:
+            pass
+        else:
+            progress(size)
+            return CopyResult(REFLINK, size, 0)
+
+    copier = _Copier(src_fd, dst_fd, progress, checkpoint, strategies)
+    if not sparse:
+        copier.copy_range(0, None, size)
+        return CopyResult(copier.strategy, copier.physical, copier.physical)
+
+    position = 0
+    for start, end in _data_extents(src_fd, size):
+        # Holes count as progress, so totals based on sizes add up
+        if start > position:
+            progress(start - position)
+        copier.copy_range(start, end, size)
+        position = end
+    if size > position:
+        progress(size - position)
+    # Extend the copy over a trailing hole
+    os.ftruncate(dst_fd, size)
+    return CopyResult(copier.strategy, size, copier.physical)
+
+
+def copy_file(
+    src: Path,
+    dst: Path,
+    progress: ProgressCallback = _noop,
+    checkpoint: Checkpoint = _noop,
+    strategies: Sequence[str] = STRATEGIES,
+    exclusive: bool = False,
+    sparse: Optional[bool] = None,
+) -> CopyResult:
+    """Copy a file with its metadata.
+
+    With ``exclusive`` the copy fails if ``dst`` already exists. Holes
+    are preserved if ``sparse`` is true, or by default if the source is
+    sparse.
+    """
+    binary = getattr(os, "O_BINARY", 0)
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | binary
+    if exclusive:
+        flags |= os.O_EXCL
+    src_fd = os.open(src, os.O_RDONLY | binary)
+    try:
+        st = os.fstat(src_fd)
+        if sparse is None:
+            sparse = is_sparse(st)
+        dst_fd = os.open(dst, flags, 0o666)
+        try:
+            result = copy_file_data(
+                src_fd,
+                dst_fd,
+                st.st_size,
+                progress,
+                checkpoint,
+                strategies,
+                sparse,
+            )
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    shutil.copystat(src, dst)
+    return result
+
+
+class HardlinkCopier:
+    """``copy_function`` for :func:`shutil.copytree` keeping hard links.
+
+    Files with several links are copied once; further links to the same
+    inode found during the walk are recreated as links to that copy.
+    """
+
+    def __init__(self) -> None:
+        self.logical_bytes = 0
+        self.physical_bytes = 0
+        self._copies: Dict[Tuple[int, int], str] = {}
+
+    def __call__(self, src: str, dst: str) -> str:
+        if os.path.isdir(dst):
+            dst = os.path.join(dst, os.path.basename(src))
+        st = os.lstat(src)
+        key = (st.st_dev, st.st_ino)
+        if st.st_nlink > 1 and key in self._copies:
+            os.link(self._copies[key], dst)
+            return dst
+        result = copy_file(Path(src), Path(dst))
+        self.logical_bytes += result.logical_bytes
+        self.physical_bytes += result.physical_bytes
+        if st.st_nlink > 1:
+            self._copies[key] = dst
+        return dst
+
+
+def copy2(src: str, dst: str) -> str:
+    """Drop-in for :func:`shutil.copy2` using :func:`copy_file`."""
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    copy_file(Path(src), Path(dst))
+    return dst
@@ -0,0 +1,869 @@
+"""Item model for directory listings."""
+
+import math
+import os
+import stat
+import time
+from array import array
+from itertools import compress
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QObject, Qt
+from PyQt6.QtWidgets import QStyle
+
+from .adapters import TypeSniffer, icon_cache
+from .file_operations import ContentHit, DirectorySnapshot, FileItem
+from .filetypes import (
+    FOLDER,
+    FileType,
+    file_type_of,
+    needs_sniffing,
+    type_of,
+)
+from .filters import FuzzyFilter, NameFilter, QueryFilter, fuzzy_score
+from .query import is_query
+from .tracing import tracer
+
+COLUMNS = ["Name", "Size", "Type", "Date Modified"]
+
+# Filter changes touching more separate runs of rows than this are
+# applied as a single layout change instead of row insertions/removals
+MAX_ROW_RUNS = 1000
+
+# Role under which the model exposes each row's path.
+PathRole = Qt.ItemDataRole.UserRole
+
+
+def _sort_key(
+    snapshot: DirectorySnapshot, column: int
+) -> Callable[[int], Any]:
+    """Sort key of single snapshot rows for a column."""
+    if column == 1:
+        folder_sizes = snapshot.folder_sizes
+        if not folder_sizes:
+            return snapshot.sizes.__getitem__
+        sizes = snapshot.sizes
+        names = snapshot.names
+        # Folders of unknown size sort as empty
+        return lambda row: (
+            folder_sizes.get(names[row], 0)
+            if snapshot.is_dir(row)
+            else sizes[row]
+        )
+    if column == 2:
+        return lambda row: (
+            "folder"
+            if snapshot.is_dir(row)
+            else file_type_of(snapshot.names[row]).lower()
+        )
+    if column == 3:
+        return snapshot.mtimes.__getitem__
+    return snapshot.sort_names.__getitem__
+
+
+class SortKeys:
+    """Sort keys of all rows of a snapshot, by column.
+
+    Keys are typed: sizes in bytes, modification times as seconds since
+    the epoch and names as natural sort keys, which the snapshot computes
+    while scanning. Keys that need computing are kept until
+    :meth:`reset`, as is the natural name order of all rows, from which
+    every other order is derived by a stable sort, so rows with equal
+    keys stay in name order.
+    """
+
+    def __init__(self, snapshot: DirectorySnapshot) -> None:
+        self.snapshot = snapshot
+        self._by_name: Optional["array[int]"] = None
+        self._directories: Optional[bytes] = None
+        self._types: Optional[List[str]] = None
+
+    def reset(self, names: bool = True) -> None:
+        """Forget the keys, or only the metadata ones unless ``names``."""
+        if names:
+            self._by_name = None
+            self._types = None
+        self._directories = None
+
+    def directories(self) -> bytes:
+        """One flag per row, 1 for directories."""
+        if self._directories is None:
+            self._directories = bytes(map(stat.S_ISDIR, self.snapshot.modes))
+        return self._directories
+
+    def by_name(self) -> "array[int]":
+        """All rows in natural name order."""
+        if self._by_name is None:
+            keys = self.snapshot.sort_names
+            self._by_name = array(
+                "L", sorted(range(len(keys)), key=keys.__getitem__)
+            )
+        return self._by_name
+
+    def column(self, column: int) -> Sequence[Any]:
+        """Key of each row for sorting by ``column``."""
+        snapshot = self.snapshot
+        if column == 1:
+            if not snapshot.folder_sizes:
+                return snapshot.sizes
+            sizes = array("q", snapshot.sizes)
+            folder_sizes = snapshot.folder_sizes
+            names = snapshot.names
+            for row in self._directory_rows():
+                # Folders of unknown size sort as empty
+                sizes[row] = folder_sizes.get(names[row], 0)
+            return sizes
+        if column == 2:
+            if self._types is None:
+                types = [file_type_of(name).lower() for name in snapshot.names]
+                for row in self._directory_rows():
+                    types[row] = "folder"
+                self._types = types
+            return self._types
+        if column == 3:
+            mtimes = snapshot.mtimes
+            unknown = list(
+                compress(range(len(mtimes)), map(math.isnan, mtimes))
+            )
+            if not unknown:
+                return mtimes
+            # NaN compares false to everything, which breaks sorting
+            mtimes = array("d", mtimes)
+            for row in unknown:
+                mtimes[row] = -math.inf
+            return mtimes
+        return snapshot.sort_names
+
+    def _directory_rows(self) -> Iterable[int]:
+        return compress(range(len(self.snapshot)), self.directories())
+
+    def sorted(self, column: int, descending: bool) -> "array[int]":
+        """All rows sorted by ``column``, directories first."""
+        by_name = self.by_name()
+        if column == 0:
+            ordered = by_name[::-1] if descending else array("L", by_name)
+        else:
+            keys = self.column(column)
+            ordered = array(
+                "L",
+                sorted(by_name, key=keys.__getitem__, reverse=descending),
+            )
+        # Directories first regardless of the direction
+        directories = self.directories()
+        flags = bytes(map(directories.__getitem__, ordered))
+        if 1 not in flags:
+            return ordered
+        files = flags.translate(_INVERT)
+        return array("L", compress(ordered, flags)) + array(
+            "L", compress(ordered, files)
+        )
+
+
+# Swaps the flags of directories and files
+_INVERT = bytes.maketrans(b"\x00\x01", b"\x01\x00")
+
+
+def _mask(rows: Iterable[int], count: int) -> bytearray:
+    """Flags marking ``rows`` among ``count`` snapshot rows."""
+    mask = bytearray(count)
+    for row in rows:
+        mask[row] = 1
+    return mask
+
+
+def _runs(
+    positions: List[int], limit: Optional[int] = None
+) -> List[List[int]]:
+    """Group sorted positions into ``[first, last]`` runs.
+
+    With a ``limit``, grouping stops once there are more runs than that.
+    """
+    runs: List[List[int]] = []
+    previous = -2
+    for position in positions:
+        if position == previous + 1:
+            runs[-1][1] = position
+        elif limit is not None and len(runs) > limit:
+            break
+        else:
+            runs.append([position, position])
+        previous = position
+    return runs
+
+
+class FileListModel(QAbstractTableModel):
+    """Flat table model over a snapshot of one directory.
+
+    The model keeps the columnar snapshot plus the display order of its
+    rows; display strings and icons are produced on demand in
+    :meth:`data`, so only rows the view actually paints pay for formatting.
+    Rows hidden by the name filter are left out of the display order.
+    """
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self.style: Optional[QStyle] = None
+        self.snapshot = DirectorySnapshot(Path())
+        # Snapshot row shown in each model row
+        self._rows = array("L")
+        self._sort_column = 0
+        self._sort_order = Qt.SortOrder.AscendingOrder
+        self.sort_keys = SortKeys(self.snapshot)
+        # All snapshot rows in display order, if known
+        self._order: Optional["array[int]"] = None
+        self.name_filter = NameFilter()
+        self.fuzzy_filter = FuzzyFilter()
+        self.query_filter = QueryFilter()
+        self.filter_text = ""
+        # Whether the filter matches fuzzily and ranks the matches
+        self.fuzzy = False
+        # Whether the filter text is an attribute query
+        self.query = False
+        self._needle = ""
+        # Whether rows are in the order of fuzzy match quality
+        self._ranked = False
+        # Duration of the last filter change, in seconds
+        self.filter_seconds = 0.0
+        # Recognizes files by content when their name says too little
+        self.sniffer: Optional[TypeSniffer] = None
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(COLUMNS)
+
+    def data(
+        self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole
+    ) -> Any:
+        if not index.isValid():
+            return None
+
+        row = self._rows[index.row()]
+        item = self.snapshot.item(row)
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return item.name
+            if column == 1:
+                return item.size_str
+            if column == 2:
+                return self._file_type(row).description
+            if column == 3:
+                return item.modified_str
+        elif role == Qt.ItemDataRole.DecorationRole:
+            if column == 0 and self.style is not None:
+                return icon_cache.icon(self._file_type(row), self.style)
+        elif role == PathRole:
+            return item.path
+        return None
+
+    def headerData(
+        self,
+        section: int,
+        orientation: Qt.Orientation,
+        role: int = Qt.ItemDataRole.DisplayRole,
+    ) -> Any:
+        if (
+            orientation == Qt.Orientation.Horizontal
+            and role == Qt.ItemDataRole.DisplayRole
+            and 0 <= section < len(COLUMNS)
+        ):
+            return COLUMNS[section]
+        return None
+
+    def sort(
+        self, column: int, order: Qt.SortOrder = Qt.SortOrder.AscendingOrder
+    ) -> None:
+        """Sort rows, keeping selections and the current row intact."""
+        self._sort_column = column
+        self._sort_order = order
+        with tracer.span("sort", column=column, entries=len(self.snapshot)):
+            self._order = self._sorted()
+            self._ranked = False
+            self._relayout(self._filtered(self._order))
+
+    def _sorted(self) -> "array[int]":
+        """All snapshot rows sorted by the current sort column and order."""
+        descending = self._sort_order == Qt.SortOrder.DescendingOrder
+        return self.sort_keys.sorted(self._sort_column, descending)
+
+    def _ordered(self) -> "array[int]":
+        """All snapshot rows in display order, hidden ones included."""
+        if self._order is None:
+            if len(self._rows) == len(self.snapshot) and not self._ranked:
+                self._order = array("L", self._rows)
+            else:
+                self._order = self._sorted()
+        return self._order
+
+    def _filtered(self, rows: Iterable[int]) -> "array[int]":
+        """The rows among ``rows`` that the filter lets through."""
+        if self.query:
+            matches = self.query_filter.match(self.snapshot, self.filter_text)
+        elif self.fuzzy:
+            matches = self.fuzzy_filter.match(self.snapshot, self.filter_text)
+        else:
+            matches = self.name_filter.match(self.snapshot, self.filter_text)
+        if matches is None:
+            return array("L", rows)
+        shown = _mask(matches, len(self.snapshot))
+        return array("L", [row for row in rows if shown[row]])
+
+    def _relayout(self, rows: "array[int]") -> None:
+        """Show ``rows`` instead of the current rows in one layout change.
+
+        Persistent indexes, i.e. selections and the current row, follow
+        their rows; those of rows that are no longer shown are dropped.
+        """
+        self.layoutAboutToBeChanged.emit()
+        old_rows = self._rows
+        old_indexes = self.persistentIndexList()
+        wanted = {old_rows[index.row()] for index in old_indexes}
+        position = {row: new for new, row in enumerate(rows) if row in wanted}
+        self._rows = rows
+        new_indexes = []
+        for index in old_indexes:
+            new = position.get(old_rows[index.row()])
+            new_indexes.append(
+                QModelIndex()
+                if new is None
+                else self.index(new, index.column())
+            )
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    def _accepts(self, row: int) -> bool:
+        """Whether the filter lets snapshot ``row`` through."""
+        if not self._needle:
+            return True
+        if self.query:
+            query = self.query_filter.compile(self.filter_text)
+            return query.accepts(self.snapshot, row)
+        name = self.snapshot.folded_names[row]
+        if self.fuzzy:
+            return fuzzy_score(name, self._needle) is not None
+        return self._needle in name
+
+    def _rows_changed(self) -> None:
+        """Drop what was derived from the snapshot's rows."""
+        self.name_filter.reset()
+        self.fuzzy_filter.reset()
+        self.query_filter.reset()
+        self.sort_keys.reset()
+        self._order = None
+
+    def set_filter(self, text: str, fuzzy: bool = False) -> None:
+        """Show only the rows whose name contains ``text``, ignoring case.
+
+        The new rows are picked from the display order of all rows, so
+        nothing is sorted, and only rows whose visibility changes are
+        removed or inserted, which keeps selections and the scroll
+        position. With ``fuzzy`` the rows containing the characters of
+        ``text`` in order are shown instead, best match first. Text with
+        attribute terms such as ``size>1G`` is an attribute query, see
+        :mod:`flitz.query`; malformed ones raise
+        :class:`~flitz.query.QueryError` and leave the rows as they are.
+        The time taken is stored in :attr:`filter_seconds`.
+        """
+        started = time.perf_counter()
+        query = is_query(text)
+        if query:
+            self.query_filter.compile(text)
+        order = self._ordered()
+        self.filter_text = text
+        self.fuzzy = fuzzy
+        self.query = query
+        self._needle = text.casefold()
+        if fuzzy and self._needle and not query:
+            ranked = self.fuzzy_filter.match(self.snapshot, text)
+            self._relayout(array("L", order if ranked is None else ranked))
+            self._ranked = True
+        elif self._ranked:
+            self._relayout(self._filtered(order))
+            self._ranked = False
+        else:
+            self._show_rows(self._filtered(order))
+        self.filter_seconds = time.perf_counter() - started
+        tracer.complete("filter", started, text=text, fuzzy=fuzzy)
+
+    def _show_rows(self, new_rows: "array[int]") -> None:
+        """Change the shown rows to ``new_rows``, a subsequence of the
+        display order."""
+        rows = self._rows
+        count = len(self.snapshot)
+        old_shown = _mask(rows, count)
+        new_shown = _mask(new_rows, count)
+        removed_runs = _runs(
+            [
+                position
+                for position, row in enumerate(rows)
+                if not new_shown[row]
+            ],
+            MAX_ROW_RUNS,
+        )
+        added_runs = _runs(
+            [
+                position
+                for position, row in enumerate(new_rows)
+                if not old_shown[row]
+            ],
+            MAX_ROW_RUNS,
+        )
+        if len(removed_runs) + len(added_runs) > MAX_ROW_RUNS:
+            self._relayout(new_rows)
+            return
+        for first, last in reversed(removed_runs):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del rows[first : last + 1]
+            self.endRemoveRows()
+        # Rows before each run are final by the time it is inserted
+        for first, last in added_runs:
+            self.beginInsertRows(QModelIndex(), first, last)
+            rows[first:first] = new_rows[first : last + 1]
+            self.endInsertRows()
+
+    def set_snapshot(self, snapshot: DirectorySnapshot) -> None:
+        """Replace the listing with ``snapshot`` in its natural order.
+
+        The name filter applies to the new listing if it is of the same
+        directory and is cleared otherwise.
+        """
+        with tracer.span("show rows", entries=len(snapshot)):
+            self.beginResetModel()
+            if snapshot.path != self.snapshot.path:
+                self.filter_text = ""
+                self.fuzzy = False
+                self.query = False
+                self._needle = ""
+            self.snapshot = snapshot
+            self.sort_keys = SortKeys(snapshot)
+            self._rows_changed()
+            self._ranked = False
+            self._rows = self._filtered(range(len(snapshot)))
+            self.endResetModel()
+
+    def clear(self, path: Path = Path()) -> None:
+        """Remove all rows."""
+        self.set_snapshot(DirectorySnapshot(path))
+
+    def append_snapshot(self, batch: DirectorySnapshot) -> None:
+        """Append the rows of a batch of the same directory."""
+        with tracer.span("add rows", entries=len(batch)):
+            self._append_snapshot(batch)
+
+    def _append_snapshot(self, batch: DirectorySnapshot) -> None:
+        if not len(batch):
+            return
+        snapshot = self.snapshot
+        first = len(snapshot)
+        snapshot.extend(batch)
+        self._rows_changed()
+        if self._ranked:
+            ranked = self.fuzzy_filter.match(snapshot, self.filter_text)
+            if ranked is not None:
+                self._relayout(array("L", ranked))
+            return
+        rows = [
+            row for row in range(first, len(snapshot)) if self._accepts(row)
+        ]
+        if not rows:
+            return
+        self.beginInsertRows(
+            QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1
+        )
+        # Sort: directories first, then files
+        self._rows.extend(
+            sorted(
+                rows,
+                key=lambda row: (
+                    not snapshot.is_dir(row),
+                    snapshot.sort_names[row],
+                ),
+            )
+        )
+        self.endInsertRows()
+
+    def apply_changes(
+        self, changes: Dict[str, Optional[os.stat_result]]
+    ) -> None:
+        """Patch the listing with changed entries.
+
+        ``changes`` maps entry names to their new stat result, or to
+        ``None`` for entries that no longer exist. Only the affected rows
+        are inserted, removed or updated, in line with the current sort
+        order, so selections and the scroll position are preserved.
+        """
+        self.remove_names([name for name, st in changes.items() if st is None])
+        for name, st in changes.items():
+            if st is not None:
+                self.upsert(name, st)
+
+    def upsert(self, name: str, st: os.stat_result) -> None:
+        """Insert the entry ``name`` or update its row."""
+        snapshot = self.snapshot
+        row = snapshot.row_of(name)
+        if row is None:
+            row = snapshot.append(name, st)
+            self._rows_changed()
+            if not self._accepts(row):
+                return
+            position = self._insert_position(row)
+            self.beginInsertRows(QModelIndex(), position, position)
+            self._rows.insert(position, row)
+            self.endInsertRows()
+            return
+
+        snapshot.update(row, st)
+        self.sort_keys.reset(names=False)
+        self.query_filter.reset()
+        self._order = None
+        # Attribute queries may match the row before or after, not both
+        shown = self._position(row)
+        if not self._accepts(row):
+            if shown is not None:
+                self.beginRemoveRows(QModelIndex(), shown, shown)
+                del self._rows[shown]
+                self.endRemoveRows()
+            return
+        if shown is None:
+            shown = self._insert_position(row)
+            self.beginInsertRows(QModelIndex(), shown, shown)
+            self._rows.insert(shown, row)
+            self.endInsertRows()
+            return
+        position = shown
+        target = self._insert_position(row, skip=position)
+        if target != position:
+            # Qt expects the destination in terms of the rows before the
+            # move, which is one further down when moving downwards.
+            destination = target + 1 if target > position else target
+            self.beginMoveRows(
+                QModelIndex(), position, position, QModelIndex(), destination
+            )
+            del self._rows[position]
+            self._rows.insert(target, row)
+            self.endMoveRows()
+        self.dataChanged.emit(
+            self.index(target, 0), self.index(target, len(COLUMNS) - 1)
+        )
+
+    def remove_names(self, names: Iterable[str]) -> None:
+        """Remove the rows of the entries called ``names``."""
+        snapshot = self.snapshot
+        dead = set()
+        for name in names:
+            row = snapshot.row_of(name)
+            if row is not None:
+                dead.add(row)
+        if not dead:
+            return
+
+        self._rows_changed()
+        rows = self._rows
+        if len(dead) < 64:
+            found = (self._position(row) for row in dead)
+            positions = sorted(
+                position for position in found if position is not None
+            )
+        else:
+            positions = [
+                position for position, row in enumerate(rows) if row in dead
+            ]
+        # Remove contiguous runs from the bottom up
+        for first, last in reversed(_runs(positions)):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del rows[first : last + 1]
+            self.endRemoveRows()
+
+        moved = snapshot.remove(dead)
+        if len(moved) < 64:
+            for old, new in moved.items():
+                position = self._position(old)
+                if position is not None:
+                    rows[position] = new
+        else:
+            for position, row in enumerate(rows):
+                if row in moved:
+                    rows[position] = moved[row]
+
+    def set_folder_sizes(self, sizes: Dict[str, int]) -> None:
+        """Show the total sizes of the folders in ``sizes`` by name."""
+        self.snapshot.folder_sizes.update(sizes)
+        if self._sort_column == 1 and not self._ranked:
+            self._order = None
+            self.sort(self._sort_column, self._sort_order)
+        elif self._rows:
+            self.dataChanged.emit(
+                self.index(0, 1), self.index(len(self._rows) - 1, 1)
+            )
+
+    def _file_type(self, row: int) -> FileType:
+        """Type of snapshot ``row``, sniffed from its content if needed."""
+        snapshot = self.snapshot
+        if snapshot.is_dir(row):
+            return FOLDER
+        name = snapshot.names[row]
+        sniffer = self.sniffer
+        if (
+            sniffer is not None
+            and needs_sniffing(name)
+            and snapshot.inodes[row]
+            and stat.S_ISREG(snapshot.modes[row])
+        ):
+            key = (
+                snapshot.devices[row],
+                snapshot.inodes[row],
+                snapshot.mtimes[row],
+            )
+            sniffed = sniffer.resolve(snapshot.path, name, key)
+            if sniffed is not None:
+                return sniffed
+        return type_of(name)
+
+    def types_resolved(
+        self, directory: Path, types: Dict[str, FileType]
+    ) -> None:
+        """Repaint the rows of ``directory`` once file types are sniffed."""
+        if directory != self.snapshot.path or not self._rows:
+            return
+        self.dataChanged.emit(
+            self.index(0, 0), self.index(len(self._rows) - 1, 2)
+        )
+
+    def _insert_position(self, row: int, skip: Optional[int] = None) -> int:
+        """Position for ``row`` in the shown rows, ignoring ``skip``.
+
+        That is in sort order, or by match quality while ranked.
+        """
+        snapshot = self.snapshot
+        key = _sort_key(snapshot, self._sort_column)
+        descending = self._sort_order == Qt.SortOrder.DescendingOrder
+        rows = self._rows
+        needle = self._needle
+
+        def rank(entry: int) -> Tuple[int, int, int]:
+            # The sort key of FuzzyFilter.match
+            name = snapshot.folded_names[entry]
+            score = fuzzy_score(name, needle, original=snapshot.names[entry])
+            return (-(score or 0), len(name), entry)
+
+        def before(a: int, b: int) -> bool:
+            if self._ranked:
+                return rank(a) < rank(b)
+            a_file = not snapshot.is_dir(a)
+            b_file = not snapshot.is_dir(b)
+            if a_file != b_file:
+                return a_file < b_file
+            a_key, b_key = key(a), key(b)
+            return bool(a_key > b_key if descending else a_key < b_key)
+
+        count = len(rows) if skip is None else len(rows) - 1
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            other = rows[
+                middle if skip is None or middle < skip else middle + 1
+            ]
+            if before(row, other):
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def position_of(self, name: str) -> Optional[int]:
+        """Model row showing the entry called ``name``, if any."""
+        row = self.snapshot.row_of(name)
+        if row is None:
+            return None
+        return self._position(row)
+
+    def _position(self, row: int) -> Optional[int]:
+        """Model row showing snapshot ``row``, if it is shown."""
+        try:
+            return self._rows.index(row)
+        except ValueError:
+            return None
+
+    def item(self, row: int) -> FileItem:
+        """Item shown in ``row``."""
+        return self.snapshot.item(self._rows[row])
+
+    def path(self, index: QModelIndex) -> Optional[Path]:
+        """Path of the row ``index`` belongs to."""
+        if not index.isValid():
+            return None
+        return self.item(index.row()).path
+
+
+RESULT_COLUMNS = ["Name", "Folder"]
+
+
+class SearchResultsModel(QAbstractTableModel):
+    """Table of search matches below a root directory.
+
+    Matches are appended as they stream in and stay in arrival order.
+    """
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self.root = Path()
+        self._paths: List[Path] = []
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._paths)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(RESULT_COLUMNS)
+
+    def data(
+        self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole
+    ) -> Any:
+        if not index.isValid():
+            return None
+
+        path = self._paths[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            if index.column() == 0:
+                return path.name
+            folder = os.path.relpath(path.parent, self.root)
+            return "" if folder == "." else folder
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return str(path)
+        if role == PathRole:
+            return path
+        return None
+
+    def headerData(
+        self,
+        section: int,
+        orientation: Qt.Orientation,
+        role: int = Qt.ItemDataRole.DisplayRole,
+    ) -> Any:
+        if (
+            orientation == Qt.Orientation.Horizontal
+            and role == Qt.ItemDataRole.DisplayRole
+            and 0 <= section < len(RESULT_COLUMNS)
+        ):
+            return RESULT_COLUMNS[section]
+        return None
+
+    def clear(self, root: Path) -> None:
+        """Remove all matches and show new ones relative to ``root``."""
+        self.beginResetModel()
+        self.root = root
+        self._paths = []
+        self.endResetModel()
+
+    def append_paths(self, paths: List[Path]) -> None:
+        """Append a batch of matches."""
+        if not paths:
+            return
+        first = len(self._paths)
+        self.beginInsertRows(QModelIndex(), first, first + len(paths) - 1)
+        self._paths.extend(paths)
+        self.endInsertRows()
+
+    def path(self, index: QModelIndex) -> Optional[Path]:
+        """Path of the match ``index`` belongs to."""
+        if not index.isValid():
+            return None
+        return self._paths[index.row()]
+
+
+CONTENT_COLUMNS = ["Name", "Folder", "Line", "Text"]
+
+
+class ContentResultsModel(SearchResultsModel):
+    """Table of content search hits, one row per matching line."""
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self._hits: List[ContentHit] = []
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._hits)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(CONTENT_COLUMNS)
+
+    def data(
+        self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole
+    ) -> Any:
+        if not index.isValid():
+            return None
+
+        hit = self._hits[index.row()]
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return hit.path.name
+            if column == 1:
+                folder = os.path.relpath(hit.path.parent, self.root)
+                return "" if folder == "." else folder
+            if column == 2:
+                return hit.line
+            return hit.text.strip()
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{hit.path}:{hit.line} (offset {hit.offset})"
+        if role == PathRole:
+            return hit.path
+        return None
+
+    def headerData(
+        self,
+        section: int,
+        orientation: Qt.Orientation,
+        role: int = Qt.ItemDataRole.DisplayRole,
+    ) -> Any:
+        if (
+            orientation == Qt.Orientation.Horizontal
+            and role == Qt.ItemDataRole.DisplayRole
+            and 0 <= section < len(CONTENT_COLUMNS)
+        ):
+            return CONTENT_COLUMNS[section]
+        return None
+
+    def clear(self, root: Path) -> None:
+        """Remove all hits and show new ones relative to ``root``."""
+        self.beginResetModel()
+        self.root = root
+        self._hits = []
+        self.endResetModel()
+
+    def append_hits(self, hits: List[ContentHit]) -> None:
+        """Append a batch of hits."""
+        if not hits:
+            return
+        first = len(self._hits)
+        self.beginInsertRows(QModelIndex(), first, first + len(hits) - 1)
+        self._hits.extend(hits)
+        self.endInsertRows()
+
+    def path(self, index: QModelIndex) -> Optional[Path]:
+        """Path of the file the hit ``index`` belongs to."""
+        if not index.isValid():
+            return None
+        return self._hits[index.row()].path
@@ -1,21 +1,149 @@
 """File operations and utilities."""
 
+import math
+import mmap
 import os
+import re
 import shutil
+import stat as stat_module
+import sys
+from array import array
+from datetime import datetime
 from pathlib import Path
-from typing import Any, List, Optional
+from typing import (
+    Any,
+    Collection,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
 
-from PyQt6.QtCore import QDateTime
-from PyQt6.QtGui import QIcon
-from PyQt6.QtWidgets import QStyle
+from . import fastcopy
+from .filetypes import file_type_of
+from .tracing import tracer
+
+# Files with a NUL byte in this many leading bytes are treated as binary
+BINARY_SNIFF_BYTES = 8192
+# Characters of a matching line kept for display
+CONTENT_LINE_CHARS = 200
+# Bytes lowercased at a time by case-insensitive content searches
+CONTENT_WINDOW = 1024 * 1024
+
+
+class ContentHit(NamedTuple):
+    """A line of a file that contains a search pattern."""
+
+    path: Path
+    # 1-based line number
+    line: int
+    # Byte offset of the match in the file
+    offset: int
+    text: str
+
+
+_NUMBER = re.compile(r"[0-9]+")
+
+
+def _pad_number(match: "re.Match[str]") -> str:
+    digits = match.group()
+    return f"{len(digits):03d}{digits}"
+
+
+def natural_key(name: str) -> str:
+    """Sort key putting ``file2`` before ``file10``.
+
+    Every run of digits is prefixed with its length, so numbers compare
+    by value while the key remains a plain string; names without digits
+    are their own key.
+    """
+    return _NUMBER.sub(_pad_number, name)
+
+
+def format_size(size: float) -> str:
+    """Human-readable size."""
+    size = float(size)
+    for unit in ["B", "KB", "MB", "GB", "TB"]:
+        if size < 1024.0:
+            return f"{size:.1f} {unit}"
+        size /= 1024.0
+    return f"{size:.1f} PB"
 
 
 class FileItem:
-    """Represents a file or directory item."""
+    """Represents a file or directory item.
 
-    def __init__(self, path: Path) -> None:
-        self.path = path
-        self._stat: Optional[Any] = None
+    An item either stands on its own and reads metadata from its path, or
+    is a thin view over one row of a :class:`DirectorySnapshot`.
+    """
+
+    __slots__ = ("_path", "_stat", "_is_dir", "_snapshot", "_row")
+
+    _path: Optional[Path]
+    _stat: Optional[Any]
+    # Directory flag taken from the directory entry's ``d_type``; ``None``
+    # means it has to be looked up on the path itself.
+    _is_dir: Optional[bool]
+    _snapshot: Optional["DirectorySnapshot"]
+    _row: int
+
+    def __new__(cls, *args: Any, **kwargs: Any) -> "FileItem":
+        self = super().__new__(cls)
+        self._path = None
+        self._stat = None
+        self._is_dir = None
+        self._snapshot = None
+        self._row = 0
+        return self
+
+    def __init__(
+        self,
+        path: Path,
+        stat: Optional[os.stat_result] = None,
+        is_dir: Optional[bool] = None,
+    ) -> None:
+        self._path = path
+        self._stat = stat
+        self._is_dir = is_dir
+
+    @classmethod
+    def from_entry(cls, entry: "os.DirEntry[str]") -> "FileItem":
+        """Create an item from a ``os.scandir`` entry.
+
+        The directory flag comes from the entry's ``d_type`` and the stat
+        result is fetched once, so the item never touches the file system
+        again when its properties are read.
+        """
+        is_dir = entry.is_dir()
+        try:
+            stat: Optional[os.stat_result] = entry.stat()
+        except (OSError, PermissionError):
+            stat = None
+        return cls(Path(entry.path), stat, is_dir)
+
+    @classmethod
+    def from_snapshot(
+        cls, snapshot: "DirectorySnapshot", row: int
+    ) -> "FileItem":
+        """Create a view over one row of a snapshot."""
+        item = cls.__new__(cls)
+        item._snapshot = snapshot
+        item._row = row
+        return item
+
+    @property
+    def path(self) -> Path:
+        """Full path of the item."""
+        if self._path is None:
+            assert self._snapshot is not None
+            self._path = self._snapshot.path / self._snapshot.names[self._row]
+        return self._path
+
+    @path.setter
+    def path(self, path: Path) -> None:
+        self._path = path
 
     @property
     def stat(self) -> Optional[Any]:
@@ -30,32 +158,52 @@ class FileItem:
     @property
     def name(self) -> str:
         """File/directory name."""
+        if self._snapshot is not None:
+            return self._snapshot.names[self._row]
         return self.path.name
 
     @property
     def size(self) -> int:
-        """File size in bytes."""
-        if self.is_directory or self.stat is None:
+        """File size in bytes, or the size of a folder's files if known."""
+        if self.is_directory:
+            if self._snapshot is not None:
+                return self._snapshot.folder_sizes.get(self.name, 0)
+            return 0
+        if self._snapshot is not None:
+            return self._snapshot.sizes[self._row]
+        if self.stat is None:
             return 0
         return int(self.stat.st_size)
 
+    @property
+    def mtime(self) -> Optional[float]:
+        """Last modified time in seconds since the epoch."""
+        if self._snapshot is not None:
+            mtime = self._snapshot.mtimes[self._row]
+            return None if math.isnan(mtime) else mtime
+        if self.stat is None:
+            return None
+        return float(self.stat.st_mtime)
+
     @property
     def size_str(self) -> str:
         """Human-readable file size."""
-        if self.is_directory:
+        if self.is_directory and (
+            self._snapshot is None
+            or self.name not in self._snapshot.folder_sizes
+        ):
             return ""
 
-        size = float(self.size)
-        for unit in ["B", "KB", "MB", "GB", "TB"]:
-            if size < 1024.0:
-                return f"{size:.1f} {unit}"
-            size /= 1024.0
-        return f"{size:.1f} PB"
+        return format_size(self.size)
 
     @property
     def is_directory(self) -> bool:
         """Check if item is a directory."""
-        return self.path.is_dir()
+        if self._snapshot is not None:
+            return self._snapshot.is_dir(self._row)
+        if self._is_dir is None:
+            self._is_dir = self.path.is_dir()
+        return self._is_dir
 
     @property
     def is_hidden(self) -> bool:
@@ -68,71 +216,365 @@ class FileItem:
         if self.is_directory:
             return "Folder"
 
-        suffix = self.path.suffix.lower()
-        if not suffix:
-            return "File"
-
-        type_map = {
-            ".txt": "Text Document",
-            ".py": "Python Script",
-            ".js": "JavaScript File",
-            ".html": "HTML Document",
-            ".css": "CSS Stylesheet",
-            ".json": "JSON File",
-            ".xml": "XML Document",
-            ".pdf": "PDF Document",
-            ".jpg": "JPEG Image",
-            ".jpeg": "JPEG Image",
-            ".png": "PNG Image",
-            ".gif": "GIF Image",
-            ".svg": "SVG Image",
-            ".mp3": "MP3 Audio",
-            ".mp4": "MP4 Video",
-            ".zip": "ZIP Archive",
-            ".tar": "TAR Archive",
-            ".gz": "GZIP Archive",
-        }
-
-        return type_map.get(suffix, f"{suffix[1:].upper()} File")
+        return file_type_of(self.name)
 
     @property
-    def modified_time(self) -> QDateTime:
-        """Last modified time."""
-        if self.stat is None:
-            return QDateTime()
-        return QDateTime.fromSecsSinceEpoch(int(self.stat.st_mtime))
+    def modified_time(self) -> Optional[datetime]:
+        """Last modified time in local time, if known."""
+        mtime = self.mtime
+        if mtime is None:
+            return None
+        return datetime.fromtimestamp(int(mtime))
 
     @property
     def modified_str(self) -> str:
         """Human-readable modified time."""
-        return str(self.modified_time.toString("yyyy-MM-dd hh:mm:ss"))
+        modified = self.modified_time
+        if modified is None:
+            return ""
+        return modified.strftime("%Y-%m-%d %H:%M:%S")
 
-    def get_icon(self, style: QStyle) -> QIcon:
-        """Get appropriate icon for the file type."""
-        if self.is_directory:
-            return style.standardIcon(QStyle.StandardPixmap.SP_DirIcon)
+
+class DirectorySnapshot:
+    """Columnar listing of one directory.
+
+    Every entry is a row across a handful of compact arrays instead of a
+    separate Python object, which keeps large listings small in memory and
+    lets whole columns be sorted and filtered at once. Rows are exposed as
+    :class:`FileItem` views on demand.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.names: List[str] = []
+        # Casefolded names for case-insensitive matching and their
+        # natural sort keys, computed once while scanning
+        self.folded_names: List[str] = []
+        self.sort_names: List[str] = []
+        self.sizes = array("q")
+        # NaN marks entries whose metadata could not be read
+        self.mtimes = array("d")
+        self.modes = array("L")
+        self.inodes = array("Q")
+        self.devices = array("Q")
+        # Total size of the files below folders, by name, once computed
+        self.folder_sizes: Dict[str, int] = {}
+        # Name to row lookup, built on first use
+        self._index: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _columns(self) -> Tuple["array[Any]", ...]:
+        return (
+            self.sizes,
+            self.mtimes,
+            self.modes,
+            self.inodes,
+            self.devices,
+        )
+
+    @classmethod
+    def scan(
+        cls, path: Path, show_hidden: bool = False
+    ) -> "DirectorySnapshot":
+        """Scan a directory into a new snapshot."""
+        snapshot = cls(path)
+        with tracer.span("scan", path=path):
+            for entry in FileOperations.iter_entries(path, show_hidden):
+                snapshot.add_entry(entry)
+        return snapshot
+
+    def add_entry(self, entry: "os.DirEntry[str]") -> None:
+        """Append a row for a ``os.scandir`` entry.
+
+        Costs at most one ``stat`` call; the entry caches the result.
+        """
+        try:
+            st: Optional[os.stat_result] = entry.stat()
+        except (OSError, PermissionError):
+            st = None
+        self.append(entry.name, st, entry.is_dir())
+
+    def append(
+        self, name: str, st: Optional[os.stat_result], is_dir: bool = False
+    ) -> int:
+        """Append a row and return its number.
+
+        ``is_dir`` is only used when no stat result is available.
+        """
+        row = len(self.names)
+        name = sys.intern(name)
+        self.names.append(name)
+        folded = name.casefold()
+        # Most names are lowercase already and can share the string
+        folded = name if folded == name else folded
+        self.folded_names.append(folded)
+        self.sort_names.append(natural_key(folded))
+        for column in self._columns():
+            column.append(0)
+        self._set(row, st, is_dir)
+        if self._index is not None:
+            self._index[name] = row
+        return row
+
+    def update(self, row: int, st: os.stat_result) -> None:
+        """Replace the metadata of ``row``."""
+        self._set(row, st, False)
+
+    def _set(
+        self, row: int, st: Optional[os.stat_result], is_dir: bool
+    ) -> None:
+        if st is None:
+            self.sizes[row] = 0
+            self.mtimes[row] = math.nan
+            self.modes[row] = stat_module.S_IFDIR if is_dir else 0
+            self.inodes[row] = 0
+            self.devices[row] = 0
         else:
-            return style.standardIcon(QStyle.StandardPixmap.SP_FileIcon)
+            self.sizes[row] = st.st_size
+            self.mtimes[row] = st.st_mtime
+            self.modes[row] = st.st_mode
+            self.inodes[row] = st.st_ino
+            self.devices[row] = st.st_dev
+
+    def extend(self, other: "DirectorySnapshot") -> None:
+        """Append all rows of another snapshot of the same directory."""
+        first = len(self.names)
+        self.names.extend(other.names)
+        self.folded_names.extend(other.folded_names)
+        self.sort_names.extend(other.sort_names)
+        for column, other_column in zip(self._columns(), other._columns()):
+            column.extend(other_column)
+        if self._index is not None:
+            for row in range(first, len(self.names)):
+                self._index[self.names[row]] = row
+
+    def remove(self, rows: Collection[int]) -> Dict[int, int]:
+        """Remove ``rows`` from the snapshot.
+
+        Rows are not kept in any particular order, so every removed row is
+        filled with the current last row instead of shifting the columns.
+        Returns the old and new numbers of the rows that were moved.
+        """
+        index = self._index
+        folded = self.folded_names
+        keys = self.sort_names
+        columns = self._columns()
+        origin: Dict[int, int] = {}
+        moved: Dict[int, int] = {}
+        for row in sorted(rows, reverse=True):
+            last = len(self.names) - 1
+            self.folder_sizes.pop(self.names[row], None)
+            if index is not None:
+                del index[self.names[row]]
+            if row != last:
+                self.names[row] = self.names[last]
+                folded[row] = folded[last]
+                keys[row] = keys[last]
+                for column in columns:
+                    column[row] = column[last]
+                original = origin.pop(last, last)
+                origin[row] = original
+                moved[original] = row
+                if index is not None:
+                    index[self.names[row]] = row
+            self.names.pop()
+            folded.pop()
+            keys.pop()
+            for column in columns:
+                column.pop()
+        return moved
+
+    def row_of(self, name: str) -> Optional[int]:
+        """Row holding the entry called ``name``, if any."""
+        if self._index is None:
+            self._index = {name: row for row, name in enumerate(self.names)}
+        return self._index.get(name)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the snapshot."""
+        return (
+            sys.getsizeof(self.names)
+            + sum(sys.getsizeof(name) for name in self.names)
+            + sys.getsizeof(self.folded_names)
+            + sum(
+                sys.getsizeof(folded)
+                for folded, name in zip(self.folded_names, self.names)
+                if folded is not name
+            )
+            + sys.getsizeof(self.sort_names)
+            + sum(
+                sys.getsizeof(key)
+                for key, folded in zip(self.sort_names, self.folded_names)
+                if key is not folded
+            )
+            + sum(column.itemsize * len(column) for column in self._columns())
+        )
+
+    def is_dir(self, row: int) -> bool:
+        """Check if the entry in ``row`` is a directory."""
+        return stat_module.S_ISDIR(self.modes[row])
+
+    def item(self, row: int) -> FileItem:
+        """View over the entry in ``row``."""
+        return FileItem.from_snapshot(self, row)
+
+    def items(self) -> List[FileItem]:
+        """Views over all entries."""
+        return [FileItem.from_snapshot(self, row) for row in range(len(self))]
 
 
 class FileOperations:
     """File operations utilities."""
 
+    @staticmethod
+    def iter_entries(
+        path: Path, show_hidden: bool = False
+    ) -> Iterator["os.DirEntry[str]"]:
+        """Iterate over the ``os.scandir`` entries of a directory.
+
+        Hidden entries are skipped by name before any metadata is fetched.
+        """
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if not show_hidden and entry.name.startswith("."):
+                        continue
+                    yield entry
+        except (OSError, PermissionError):
+            return
+
+    @staticmethod
+    def iter_directory(
+        path: Path, show_hidden: bool = False
+    ) -> Iterator[FileItem]:
+        """Iterate over directory contents using ``os.scandir``.
+
+        Every yielded item carries its stat result, so a listing costs one
+        ``stat`` per visible entry on top of the directory reads.
+        """
+        for entry in FileOperations.iter_entries(path, show_hidden):
+            yield FileItem.from_entry(entry)
+
+    @staticmethod
+    def scan_directory(
+        path: Path, show_hidden: bool = False
+    ) -> DirectorySnapshot:
+        """Scan directory contents into a columnar snapshot."""
+        return DirectorySnapshot.scan(path, show_hidden)
+
     @staticmethod
     def list_directory(
         path: Path, show_hidden: bool = False
     ) -> List[FileItem]:
         """List directory contents."""
-        items = []
+        return FileOperations.scan_directory(path, show_hidden).items()
+
+    @staticmethod
+    def stat_path(path: Path) -> Optional[os.stat_result]:
+        """Stat a path the way a directory listing would.
+
+        Broken symlinks report the link itself; ``None`` means the path
+        does not exist (any more).
+        """
         try:
-            for item_path in path.iterdir():
-                item = FileItem(item_path)
-                if not show_hidden and item.is_hidden:
-                    continue
-                items.append(item)
+            return os.stat(path)
         except (OSError, PermissionError):
             pass
-        return items
+        try:
+            return os.lstat(path)
+        except (OSError, PermissionError):
+            return None
+
+    @staticmethod
+    def search_content(
+        path: Path,
+        needle: bytes,
+        ignore_case: bool = True,
+        max_size: Optional[int] = None,
+        max_hits: int = 100,
+    ) -> List[ContentHit]:
+        """Find the lines of a file containing ``needle``.
+
+        The file is memory-mapped rather than read, so only the pages the
+        search touches are loaded. Case-insensitive searches lowercase
+        the mapping window by window, which is much faster than a regular
+        expression. Binary files (with a NUL byte near the start), empty
+        files and files larger than ``max_size`` yield no hits. Each line
+        is reported once, at its first match.
+        """
+        hits: List[ContentHit] = []
+        if not needle:
+            return hits
+        if ignore_case:
+            needle = needle.lower()
+        try:
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0 or (max_size is not None and size > max_size):
+                    return hits
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if mm.find(b"\0", 0, BINARY_SNIFF_BYTES) >= 0:
+                        return hits
+                    window_start = 0
+                    window = b""
+
+                    def find(position: int) -> int:
+                        nonlocal window_start, window
+                        if not ignore_case:
+                            return mm.find(needle, position)
+                        while True:
+                            window_end = window_start + len(window)
+                            if window_start <= position <= window_end:
+                                found = window.find(
+                                    needle, position - window_start
+                                )
+                                if found >= 0:
+                                    return window_start + found
+                                # Matches crossing the end are in the next
+                                position = max(
+                                    position, window_end - len(needle) + 1
+                                )
+                            if position + len(needle) > size:
+                                return -1
+                            window_start = position
+                            window = mm[
+                                position : position + CONTENT_WINDOW
+                            ].lower()
+
+                    line = 1
+                    counted = 0
+                    position = 0
+                    while len(hits) < max_hits:
+                        start = find(position)
+                        if start < 0:
+                            break
+                        line += mm[counted:start].count(b"\n")
+                        counted = start
+                        line_start = mm.rfind(b"\n", 0, start) + 1
+                        line_end = mm.find(b"\n", start)
+                        if line_end < 0:
+                            line_end = size
+                        text = mm[
+                            line_start : min(
+                                line_end, line_start + CONTENT_LINE_CHARS
+                            )
+                        ]
+                        hits.append(
+                            ContentHit(
+                                path,
+                                line,
+                                start,
+                                text.decode("utf-8", "replace").rstrip("\r"),
+                            )
+                        )
+                        # Continue on the next line
+                        position = line_end + 1
+        except (OSError, ValueError):
+            pass
+        return hits
 
     @staticmethod
     def can_access(path: Path) -> bool:
@@ -142,9 +584,21 @@ class FileOperations:
         except (OSError, PermissionError):
             return False
 
+    @staticmethod
+    def is_valid_name(name: str) -> bool:
+        """Whether ``name`` names an entry of a folder, not a path."""
+        separators = [os.sep] + ([os.altsep] if os.altsep else [])
+        return (
+            name not in ("", ".", "..")
+            and "\0" not in name
+            and not any(separator in name for separator in separators)
+        )
+
     @staticmethod
     def create_folder(parent: Path, name: str) -> bool:
         """Create a new folder."""
+        if not FileOperations.is_valid_name(name):
+            return False
         try:
             new_path = parent / name
             new_path.mkdir(exist_ok=False)
@@ -155,6 +609,8 @@ class FileOperations:
     @staticmethod
     def create_file(parent: Path, name: str) -> bool:
         """Create a new empty file."""
+        if not FileOperations.is_valid_name(name):
+            return False
         try:
             new_path = parent / name
             new_path.touch(exist_ok=False)
@@ -165,6 +621,8 @@ class FileOperations:
     @staticmethod
     def rename_item(old_path: Path, new_name: str) -> bool:
         """Rename a file or directory."""
+        if not FileOperations.is_valid_name(new_name):
+            return False
         try:
             new_path = old_path.parent / new_name
             old_path.rename(new_path)
@@ -186,12 +644,19 @@ class FileOperations:
 
     @staticmethod
     def copy_item(src: Path, dst: Path) -> bool:
-        """Copy a file or directory."""
+        """Copy a file or directory.
+
+        File data is copied with the fastest method the file systems
+        support, see :mod:`flitz.fastcopy`. Holes of sparse files and hard
+        links within a copied tree are preserved.
+        """
         try:
             if src.is_dir():
-                shutil.copytree(src, dst)
+                shutil.copytree(
+                    src, dst, copy_function=fastcopy.HardlinkCopier()
+                )
             else:
-                shutil.copy2(src, dst)
+                fastcopy.copy2(str(src), str(dst))
             return True
         except (OSError, PermissionError, FileExistsError):
             return False
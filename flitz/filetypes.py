@@ -0,0 +1,209 @@
+"""File types by extension and content."""
+
+import os
+import stat
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Leading bytes of a file read to recognize its content
+SNIFF_BYTES = 512
+
+
+class FileType(NamedTuple):
+    """Description of a type of file and the name of its icon."""
+
+    description: str
+    # Icon name from the freedesktop icon naming specification
+    icon: str
+
+
+FOLDER = FileType("Folder", "folder")
+FILE = FileType("File", "unknown")
+TEXT = FileType("Text Document", "text-x-generic")
+SCRIPT = FileType("Script", "text-x-script")
+EXECUTABLE = FileType("Executable", "application-x-executable")
+
+# Types by lowercase extension
+EXTENSIONS: Dict[str, FileType] = {
+    ".txt": TEXT,
+    ".py": FileType("Python Script", "text-x-script"),
+    ".js": FileType("JavaScript File", "text-x-script"),
+    ".html": FileType("HTML Document", "text-html"),
+    ".css": FileType("CSS Stylesheet", "text-x-generic"),
+    ".json": FileType("JSON File", "text-x-generic"),
+    ".xml": FileType("XML Document", "text-x-generic"),
+    ".pdf": FileType("PDF Document", "x-office-document"),
+    ".jpg": FileType("JPEG Image", "image-x-generic"),
+    ".png": FileType("PNG Image", "image-x-generic"),
+    ".gif": FileType("GIF Image", "image-x-generic"),
+    ".svg": FileType("SVG Image", "image-x-generic"),
+    ".mp3": FileType("MP3 Audio", "audio-x-generic"),
+    ".mp4": FileType("MP4 Video", "video-x-generic"),
+    ".zip": FileType("ZIP Archive", "package-x-generic"),
+    ".tar": FileType("TAR Archive", "package-x-generic"),
+    ".gz": FileType("GZIP Archive", "package-x-generic"),
+}
+EXTENSIONS[".jpeg"] = EXTENSIONS[".jpg"]
+
+# Extensions that say little about the content
+AMBIGUOUS_EXTENSIONS = frozenset(
+    (".bin", ".dat", ".data", ".out", ".tmp", ".bak", ".old")
+)
+
+# Content signatures as (offset, leading bytes, type)
+SIGNATURES: List[Tuple[int, bytes, FileType]] = [
+    (0, b"\x89PNG\r\n\x1a\n", EXTENSIONS[".png"]),
+    (0, b"\xff\xd8\xff", EXTENSIONS[".jpg"]),
+    (0, b"GIF87a", EXTENSIONS[".gif"]),
+    (0, b"GIF89a", EXTENSIONS[".gif"]),
+    (0, b"%PDF-", EXTENSIONS[".pdf"]),
+    (0, b"PK\x03\x04", EXTENSIONS[".zip"]),
+    (0, b"\x1f\x8b", EXTENSIONS[".gz"]),
+    (257, b"ustar", EXTENSIONS[".tar"]),
+    (0, b"ID3", EXTENSIONS[".mp3"]),
+    (4, b"ftyp", EXTENSIONS[".mp4"]),
+    (0, b"\x7fELF", EXECUTABLE),
+    (0, b"<?xml", EXTENSIONS[".xml"]),
+]
+# Scripts by interpreter
+INTERPRETERS = [
+    (b"python", EXTENSIONS[".py"]),
+    (b"node", EXTENSIONS[".js"]),
+]
+
+
+class _ExtensionTable(Dict[str, FileType]):
+    """Types of all extensions, filled in for unknown ones on first use."""
+
+    def __missing__(self, extension: str) -> FileType:
+        file_type = FileType(f"{extension[1:].upper()} File", FILE.icon)
+        if len(self) < 10_000:
+            self[extension] = file_type
+        return file_type
+
+
+_TYPES = _ExtensionTable(EXTENSIONS)
+
+
+def _extension(name: str) -> str:
+    """Lowercase extension of ``name`` with its dot, or ``""``."""
+    stem, _dot, extension = name.rpartition(".")
+    if not (stem and extension):
+        return ""
+    return "." + extension.lower()
+
+
+def type_of(name: str) -> FileType:
+    """Type of a file called ``name`` according to its extension."""
+    extension = _extension(name)
+    return _TYPES[extension] if extension else FILE
+
+
+def file_type_of(name: str) -> str:
+    """Description of the type of a file called ``name``."""
+    return type_of(name).description
+
+
+def needs_sniffing(name: str) -> bool:
+    """Whether the type of a file called ``name`` is worth sniffing."""
+    extension = _extension(name)
+    return not extension or extension in AMBIGUOUS_EXTENSIONS
+
+
+# Opening a FIFO without O_NONBLOCK waits for a writer
+_SNIFF_FLAGS = (
+    os.O_RDONLY
+    | getattr(os, "O_NONBLOCK", 0)
+    | getattr(os, "O_NOCTTY", 0)
+    | getattr(os, "O_CLOEXEC", 0)
+)
+
+
+def sniff_type(path: Path) -> Optional[FileType]:
+    """Recognize the type of a file by its leading bytes, if possible.
+
+    Only regular files are read: FIFOs would block and opening device
+    nodes can have side effects.
+    """
+    try:
+        fd = os.open(path, _SNIFF_FLAGS)
+    except OSError:
+        return None
+    try:
+        # The path may have been replaced since it was listed
+        if not stat.S_ISREG(os.fstat(fd).st_mode):
+            return None
+        head = os.read(fd, SNIFF_BYTES)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+    if not head:
+        return None
+    for offset, signature, file_type in SIGNATURES:
+        if head.startswith(signature, offset):
+            return file_type
+    if head.startswith(b"#!"):
+        interpreter = head.split(b"\n", 1)[0]
+        for word, file_type in INTERPRETERS:
+            if word in interpreter:
+                return file_type
+        return SCRIPT
+    if head.lstrip()[:14].lower() in (b"<!doctype html", b"<html"):
+        return EXTENSIONS[".html"]
+    if b"\0" not in head:
+        return TEXT
+    return None
+
+
+# (device, inode, mtime)
+TypeKey = Tuple[int, int, float]
+
+
+class TypeCache:
+    """LRU cache of sniffed file types keyed by device, inode and mtime."""
+
+    def __init__(self, max_entries: int = 100_000) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[TypeKey, FileType]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: TypeKey) -> Optional[FileType]:
+        """Return the type stored for ``key``, if any."""
+        with self._lock:
+            file_type = self._entries.get(key)
+            if file_type is not None:
+                self._entries.move_to_end(key)
+            return file_type
+
+    def put(self, key: TypeKey, file_type: FileType) -> None:
+        """Store the type of the file identified by ``key``."""
+        with self._lock:
+            self._entries[key] = file_type
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+type_cache = TypeCache()
+
+
+def sniff_batch(
+    files: Iterable[Tuple[TypeKey, Path, str]], cache: TypeCache = type_cache
+) -> Dict[Path, Dict[str, FileType]]:
+    """Sniff ``(key, directory, name)`` files into ``cache``.
+
+    Returns the types found as ``{name: FileType}`` per directory. Files
+    that cannot be recognized get their extension type.
+    """
+    found: Dict[Path, Dict[str, FileType]] = {}
+    for key, directory, name in files:
+        file_type = sniff_type(directory / name) or type_of(name)
+        cache.put(key, file_type)
+        found.setdefault(directory, {})[name] = file_type
+    return found
@@ -0,0 +1,349 @@
+"""Filtering of directory listings by name and attributes."""
+
+import re
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .file_operations import DirectorySnapshot
+from .query import Query, compile_query
+
+
+class NameFilter:
+    """Incremental case-insensitive substring filter over a snapshot.
+
+    Names are casefolded once per listing by the snapshot. The matches of
+    each query are kept while the following queries contain it, so typing
+    another character only checks the names that matched so far, and
+    deleting one goes back to an earlier result without matching at all.
+    Call :meth:`reset` whenever the snapshot's rows change.
+    """
+
+    def __init__(self) -> None:
+        # Queries that each contain the one before, with their matches
+        self._history: List[Tuple[str, "array[int]"]] = []
+        # Duration of the last call to match, in seconds
+        self.seconds = 0.0
+
+    def reset(self) -> None:
+        """Forget the matches of previous queries."""
+        self._history.clear()
+
+    def match(
+        self, snapshot: DirectorySnapshot, text: str
+    ) -> Optional["array[int]"]:
+        """Return the ascending snapshot rows whose name contains ``text``.
+
+        Returns ``None`` if every row matches, i.e. for empty text.
+        """
+        started = time.perf_counter()
+        needle = text.casefold()
+        history = self._history
+        while history and history[-1][0] not in needle:
+            history.pop()
+        if not needle:
+            matches = None
+        elif history and history[-1][0] == needle:
+            matches = history[-1][1]
+        else:
+            names = snapshot.folded_names
+            if history:
+                # Every match of the longer query matched before
+                candidates = history[-1][1]
+                matches = array(
+                    "L", [row for row in candidates if needle in names[row]]
+                )
+            else:
+                matches = array(
+                    "L",
+                    [row for row, name in enumerate(names) if needle in name],
+                )
+            history.append((needle, matches))
+        self.seconds = time.perf_counter() - started
+        return matches
+
+
+# Scores of fuzzy matches, modelled on fzf
+SCORE_MATCH = 16
+SCORE_GAP_START = -3
+SCORE_GAP_EXTENSION = -1
+# Matches right after a separator, e.g. "b" in "foo_bar"
+BONUS_BOUNDARY = SCORE_MATCH // 2
+# Matches of separators themselves
+BONUS_NON_WORD = SCORE_MATCH // 2
+# Matches at a camelCase hump or the start of a number
+BONUS_CAMEL = BONUS_BOUNDARY + SCORE_GAP_EXTENSION
+# Minimum bonus of characters continuing a match
+BONUS_CONSECUTIVE = -(SCORE_GAP_START + SCORE_GAP_EXTENSION)
+# The bonus of the first query character counts this many times
+BONUS_FIRST_CHAR_MULTIPLIER = 2
+
+# Possessive quantifiers skip pointless backtracking where supported
+_POSSESSIVE = "+" if sys.version_info >= (3, 11) else ""
+
+# Character classes
+_NON_WORD, _LOWER, _UPPER, _LETTER, _DIGIT = range(5)
+
+
+class _ClassTable(Dict[str, int]):
+    """Character class of each character, filled in on first use."""
+
+    def __missing__(self, char: str) -> int:
+        if char.islower():
+            cls = _LOWER
+        elif char.isupper():
+            cls = _UPPER
+        elif char.isdigit():
+            cls = _DIGIT
+        elif char.isalpha():
+            cls = _LETTER
+        else:
+            cls = _NON_WORD
+        self[char] = cls
+        return cls
+
+
+_CLASSES = _ClassTable()
+
+
+def _bonus(previous: int, current: int) -> int:
+    if current == _NON_WORD:
+        return BONUS_NON_WORD
+    if previous == _NON_WORD:
+        return BONUS_BOUNDARY
+    if (previous == _LOWER and current == _UPPER) or (
+        previous != _DIGIT and current == _DIGIT
+    ):
+        return BONUS_CAMEL
+    return 0
+
+
+# Bonus for each pair of character classes
+_BONUSES = [
+    [_bonus(previous, current) for current in range(5)]
+    for previous in range(5)
+]
+
+
+def fuzzy_pattern(needle: str) -> str:
+    """Regular expression finding ``needle`` as a subsequence.
+
+    Each character after the first is matched at its first occurrence
+    after the previous one, so the expression never needs to backtrack.
+    Gaps do not extend over NUL characters, so the pattern can search
+    names joined by NULs, which file names cannot contain.
+    """
+    parts = [re.escape(needle[0])]
+    for char in needle[1:]:
+        escaped = re.escape(char)
+        parts.append(f"[^\\x00{escaped}]*{_POSSESSIVE}{escaped}")
+    return "".join(parts)
+
+
+def fuzzy_score(
+    name: str,
+    needle: str,
+    end: Optional[int] = None,
+    original: Optional[str] = None,
+) -> Optional[int]:
+    """Score how well ``needle`` matches ``name`` as a subsequence.
+
+    Both are expected casefolded; ``original`` is the name as it is, for
+    camelCase bonuses. Matches score higher the fewer gaps they have and
+    the more of their characters start words. ``end`` may give the end
+    of the earliest match, if known. Returns ``None`` if ``needle`` does
+    not occur in ``name``.
+    """
+    if end is None:
+        end = -1
+        for char in needle:
+            end = name.find(char, end + 1)
+            if end < 0:
+                return None
+        end += 1
+    # Latest start of a match ending there, for the shortest window
+    position = end
+    for char in reversed(needle):
+        position = name.rfind(char, 0, position)
+    if original is None or len(original) != len(name):
+        original = name
+
+    classes = _CLASSES
+    score = 0
+    previous_position = position - 1
+    first_bonus = 0
+    for index, char in enumerate(needle):
+        if index:
+            position = name.find(char, previous_position + 1)
+        before = original[position - 1] if position else "/"
+        bonus = _BONUSES[classes[before]][classes[original[position]]]
+        gap = position - previous_position - 1
+        if gap:
+            score += SCORE_GAP_START + (gap - 1) * SCORE_GAP_EXTENSION
+            first_bonus = bonus
+        elif index:
+            # A run of matches keeps the bonus of its first character
+            if bonus >= BONUS_BOUNDARY > first_bonus:
+                first_bonus = bonus
+            bonus = max(bonus, first_bonus, BONUS_CONSECUTIVE)
+        else:
+            first_bonus = bonus
+        if not index:
+            bonus *= BONUS_FIRST_CHAR_MULTIPLIER
+        score += SCORE_MATCH + bonus
+        previous_position = position
+    return score
+
+
+class FuzzyFilter:
+    """Fuzzy filter ranking the names of a snapshot by match quality.
+
+    All casefolded names are joined into one string once per listing, so
+    finding the candidates that contain the query as a subsequence is a
+    regular expression search in C; only those are scored in Python.
+    Call :meth:`reset` whenever the snapshot's rows change.
+    """
+
+    def __init__(self) -> None:
+        self._snapshot: Optional[DirectorySnapshot] = None
+        self._joined = ""
+        # Offset of each name in the joined string
+        self._offsets = array("Q")
+        # Queries that each extend the one before, with their matches
+        self._history: List[Tuple[str, "array[int]"]] = []
+        # Duration of the last call to match, in seconds
+        self.seconds = 0.0
+
+    def reset(self) -> None:
+        """Forget the names of the snapshot and previous matches."""
+        self._snapshot = None
+        self._joined = ""
+        self._offsets = array("Q")
+        self._history.clear()
+
+    def prepare(self, snapshot: DirectorySnapshot) -> None:
+        """Join the names of ``snapshot`` unless that is done already."""
+        if self._snapshot is snapshot:
+            return
+        names = snapshot.folded_names
+        self._joined = "\0".join(names)
+        self._offsets = array("Q", [0])
+        self._offsets.extend(accumulate(len(name) + 1 for name in names))
+        self._snapshot = snapshot
+
+    def match(
+        self, snapshot: DirectorySnapshot, text: str
+    ) -> Optional["array[int]"]:
+        """Return the snapshot rows matching ``text``, best match first.
+
+        Returns ``None`` if every row matches, i.e. for empty text.
+        """
+        started = time.perf_counter()
+        needle = text.casefold()
+        history = self._history
+        while history and not needle.startswith(history[-1][0]):
+            history.pop()
+        if not needle:
+            matches = None
+        elif history and history[-1][0] == needle:
+            matches = history[-1][1]
+        else:
+            if history:
+                # Names matching the longer query matched before
+                scored = self._score_rows(snapshot, needle, history[-1][1])
+            else:
+                scored = self._score_all(snapshot, needle)
+            scored.sort()
+            matches = array("L", [row for _score, _length, row in scored])
+            history.append((needle, matches))
+        self.seconds = time.perf_counter() - started
+        return matches
+
+    def _score_all(
+        self, snapshot: DirectorySnapshot, needle: str
+    ) -> List[Tuple[int, int, int]]:
+        """Sort keys of all matching rows, found in the joined names."""
+        self.prepare(snapshot)
+        offsets = self._offsets
+        names = snapshot.folded_names
+        originals = snapshot.names
+        scored = []
+        previous = -1
+        for found in re.finditer(fuzzy_pattern(needle), self._joined):
+            row = bisect_right(offsets, found.start()) - 1
+            if row == previous:
+                # Another match in the same name
+                continue
+            previous = row
+            name = names[row]
+            score = fuzzy_score(
+                name, needle, found.end() - offsets[row], originals[row]
+            )
+            scored.append((-(score or 0), len(name), row))
+        return scored
+
+    @staticmethod
+    def _score_rows(
+        snapshot: DirectorySnapshot, needle: str, rows: Iterable[int]
+    ) -> List[Tuple[int, int, int]]:
+        """Sort keys of the matching rows among ``rows``."""
+        names = snapshot.folded_names
+        originals = snapshot.names
+        scored = []
+        for row in rows:
+            name = names[row]
+            score = fuzzy_score(name, needle, original=originals[row])
+            if score is not None:
+                scored.append((-score, len(name), row))
+        return scored
+
+
+class QueryFilter:
+    """Filter by an attribute query such as ``size>1G mtime<7d``.
+
+    The query is compiled once per text and its matches are kept until
+    the text changes or :meth:`reset` is called, which also makes ages
+    relative to the time of the next match again.
+    """
+
+    def __init__(self) -> None:
+        self._query: Optional[Query] = None
+        self._matches: Optional["array[int]"] = None
+        # Duration of the last call to match, in seconds
+        self.seconds = 0.0
+
+    def reset(self) -> None:
+        """Forget the compiled query and its matches."""
+        self._query = None
+        self._matches = None
+
+    def compile(self, text: str) -> Query:
+        """Return the compiled query for ``text``.
+
+        Raises :class:`~flitz.query.QueryError` if it is malformed.
+        """
+        if self._query is None or self._query.text != text:
+            self._query = compile_query(text)
+            self._matches = None
+        return self._query
+
+    def match(
+        self, snapshot: DirectorySnapshot, text: str
+    ) -> Optional["array[int]"]:
+        """Return the ascending snapshot rows matching the query ``text``.
+
+        Returns ``None`` if every row matches, i.e. for empty text.
+        """
+        started = time.perf_counter()
+        if not text.strip():
+            matches = None
+        else:
+            query = self.compile(text)
+            if self._matches is None:
+                self._matches = array("L", query.rows(snapshot))
+            matches = self._matches
+        self.seconds = time.perf_counter() - started
+        return matches
@@ -0,0 +1,487 @@
+"""Persistent file-name index for fast global search."""
+
+import fnmatch
+import os
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from .search import GLOB_CHARS, compile_pattern
+
+# Directories processed per transaction while updating
+COMMIT_INTERVAL = 500
+# Matches returned by a query at most
+RESULT_LIMIT = 1000
+# Literal characters a pattern needs for a trigram lookup
+TRIGRAM = 3
+# Layout of the database; indexes of other layouts are rebuilt
+INDEX_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+CREATE TABLE IF NOT EXISTS dirs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    generation INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    dir INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    -- Case-folded name, which LIKE compares without further folding
+    folded TEXT NOT NULL,
+    is_dir INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_dir ON entries (dir);
+CREATE VIRTUAL TABLE IF NOT EXISTS names USING fts5 (
+    folded, content='entries', content_rowid='id',
+    tokenize='trigram', detail='none'
+);
+"""
+OLD_TABLES = ("names", "entries", "dirs", "meta")
+
+
+class IndexStats(NamedTuple):
+    """Size and freshness of an index."""
+
+    entries: int
+    directories: int
+    # Size of the database file
+    bytes: int
+    # Duration of the last complete update, in seconds
+    update_seconds: Optional[float]
+    # Time of the last complete update
+    updated_at: Optional[float]
+
+
+def default_index_path() -> Path:
+    """Location of the index in the user's cache directory."""
+    cache = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache) / "flitz" / "index.sqlite3"
+
+
+def _like_pattern(text: str) -> Tuple[str, int]:
+    """Translate search text into a ``LIKE`` pattern.
+
+    The pattern may match more names than the text, e.g. for ``%`` or
+    character classes, so results must be filtered again. Also returns
+    the length of the longest literal run, which decides whether the
+    trigram index can answer the query.
+    """
+    if not GLOB_CHARS.intersection(text):
+        return f"%{text}%", len(text)
+
+    parts = []
+    literal = longest = 0
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char in "*?[":
+            if char == "[":
+                end = text.find("]", i + 2)
+                if end < 0:
+                    parts.append(char)
+                    literal += 1
+                    longest = max(longest, literal)
+                    i += 1
+                    continue
+                i = end
+            parts.append("%" if char == "*" else "_")
+            literal = 0
+        else:
+            parts.append(char)
+            literal += 1
+            longest = max(longest, literal)
+        i += 1
+    return "".join(parts), longest
+
+
+class FilenameIndex:
+    """SQLite index of all names below a set of root directories.
+
+    Names are stored in an FTS5 table using the trigram tokenizer, so
+    substring and glob queries only look at candidate rows instead of
+    every name. :meth:`update` re-reads only directories whose mtime
+    changed since the previous update and takes the subdirectories of
+    unchanged ones from the index, so keeping it fresh costs one
+    ``stat`` per directory. It works through the tree one directory at
+    a time and commits periodically, so memory use does not grow with
+    the tree.
+
+    Updates open their own connection and may run in a background
+    thread while the index is queried.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        roots: Iterable[Path],
+        exclude: Iterable[str] = (),
+    ) -> None:
+        self.path = path
+        self.roots = [Path(root).expanduser().resolve() for root in roots]
+        self.exclude = list(exclude)
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @staticmethod
+    def available() -> bool:
+        """Check whether SQLite supports the trigram tokenizer."""
+        try:
+            with sqlite3.connect(":memory:") as connection:
+                connection.execute(
+                    "CREATE VIRTUAL TABLE t USING fts5(x, tokenize='trigram')"
+                )
+        except sqlite3.Error:
+            return False
+        return True
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        (version,) = connection.execute("PRAGMA user_version").fetchone()
+        if version != INDEX_VERSION:
+            for table in OLD_TABLES:
+                connection.execute(f"DROP TABLE IF EXISTS {table}")
+            connection.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        connection.executescript(SCHEMA)
+        return connection
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Connection for queries from the creating thread."""
+        if self._connection is None:
+            self._connection = self._connect()
+        return self._connection
+
+    def close(self) -> None:
+        """Close the query connection."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def covers(self, path: Path) -> bool:
+        """Whether ``path`` lies below one of the indexed roots."""
+        return any(path == root or root in path.parents for root in self.roots)
+
+    def _excluded(self, name: str) -> bool:
+        return any(fnmatch.fnmatchcase(name, p) for p in self.exclude)
+
+    def update(self, cancelled: Callable[[], bool] = lambda: False) -> bool:
+        """Bring the index up to date with the file system.
+
+        Returns ``False`` if ``cancelled`` returned true before the update
+        was complete; what was done so far is kept.
+        """
+        started = time.monotonic()
+        connection = self._connect()
+        try:
+            generation = self._meta(connection, "generation", 0) + 1
+            stack = list(reversed(self.roots))
+            processed = 0
+            while stack:
+                if cancelled():
+                    connection.commit()
+                    return False
+                path = stack.pop()
+                subdirectories = self._update_directory(
+                    connection, path, generation
+                )
+                stack.extend(
+                    path / name
+                    for name in reversed(subdirectories)
+                    if not self._excluded(name)
+                )
+                processed += 1
+                if processed % COMMIT_INTERVAL == 0:
+                    connection.commit()
+
+            # Directories not reached in this pass no longer exist
+            connection.execute(
+                "INSERT INTO names (names, rowid, folded) "
+                "SELECT 'delete', entries.id, entries.folded FROM entries "
+                "JOIN dirs ON dirs.id = entries.dir "
+                "WHERE dirs.generation != ?",
+                (generation,),
+            )
+            connection.execute(
+                "DELETE FROM entries WHERE dir IN "
+                "(SELECT id FROM dirs WHERE generation != ?)",
+                (generation,),
+            )
+            connection.execute(
+                "DELETE FROM dirs WHERE generation != ?", (generation,)
+            )
+            self._set_meta(connection, "generation", generation)
+            self._set_meta(
+                connection, "update_seconds", time.monotonic() - started
+            )
+            self._set_meta(connection, "updated_at", time.time())
+            connection.commit()
+            return True
+        finally:
+            connection.close()
+
+    def _update_directory(
+        self, connection: sqlite3.Connection, path: Path, generation: int
+    ) -> List[str]:
+        """Update one directory and return the names of its subdirs."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return []
+        row = connection.execute(
+            "SELECT id, mtime_ns FROM dirs WHERE path = ?", (str(path),)
+        ).fetchone()
+        if row is not None and row[1] == st.st_mtime_ns:
+            connection.execute(
+                "UPDATE dirs SET generation = ? WHERE id = ?",
+                (generation, row[0]),
+            )
+            return [
+                name
+                for (name,) in connection.execute(
+                    "SELECT name FROM entries WHERE dir = ? AND is_dir",
+                    (row[0],),
+                )
+            ]
+
+        current: Dict[str, bool] = {}
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        is_dir = False
+                    current[entry.name] = is_dir
+        except OSError:
+            # Unreadable; keep what is known and try again next time
+            if row is not None:
+                connection.execute(
+                    "UPDATE dirs SET generation = ? WHERE id = ?",
+                    (generation, row[0]),
+                )
+            return []
+
+        if row is None:
+            dir_id = connection.execute(
+                "INSERT INTO dirs (path, mtime_ns, generation) "
+                "VALUES (?, ?, ?)",
+                (str(path), st.st_mtime_ns, generation),
+            ).lastrowid
+            known: Dict[str, Tuple[int, bool]] = {}
+        else:
+            dir_id = row[0]
+            connection.execute(
+                "UPDATE dirs SET mtime_ns = ?, generation = ? WHERE id = ?",
+                (st.st_mtime_ns, generation, dir_id),
+            )
+            known = {
+                name: (entry_id, bool(is_dir))
+                for entry_id, name, is_dir in connection.execute(
+                    "SELECT id, name, is_dir FROM entries WHERE dir = ?",
+                    (dir_id,),
+                )
+            }
+
+        removed = [
+            (entry_id, name.casefold())
+            for name, (entry_id, is_dir) in known.items()
+            if current.get(name) != is_dir
+        ]
+        if removed:
+            connection.executemany(
+                "INSERT INTO names (names, rowid, folded) "
+                "VALUES ('delete', ?, ?)",
+                removed,
+            )
+            connection.executemany(
+                "DELETE FROM entries WHERE id = ?",
+                [(entry_id,) for entry_id, _name in removed],
+            )
+        for name, is_dir in current.items():
+            if name in known and known[name][1] == is_dir:
+                continue
+            folded = name.casefold()
+            entry_id = connection.execute(
+                "INSERT INTO entries (dir, name, folded, is_dir) "
+                "VALUES (?, ?, ?, ?)",
+                (dir_id, name, folded, is_dir),
+            ).lastrowid
+            connection.execute(
+                "INSERT INTO names (rowid, folded) VALUES (?, ?)",
+                (entry_id, folded),
+            )
+        return [name for name, is_dir in current.items() if is_dir]
+
+    def search(
+        self,
+        root: Path,
+        text: str,
+        show_hidden: bool = False,
+        exclude: Iterable[str] = (),
+        limit: int = RESULT_LIMIT,
+    ) -> List[Path]:
+        """Return up to ``limit`` indexed paths below ``root`` matching
+        ``text``, with the same semantics as the recursive search."""
+        return [
+            path
+            for batch in self.search_batches(
+                root, text, show_hidden, exclude, limit
+            )
+            for path in batch
+        ]
+
+    def search_batches(
+        self,
+        root: Path,
+        text: str,
+        show_hidden: bool = False,
+        exclude: Iterable[str] = (),
+        limit: int = RESULT_LIMIT,
+        cancelled: Callable[[], bool] = lambda: False,
+    ) -> Iterator[List[Path]]:
+        """Yield the matches of :meth:`search` in batches.
+
+        Runs on its own connection, so it may be called from any thread.
+        The index is read ``limit`` candidate rows at a time, which are
+        checked against the exact pattern, hidden and excluded names;
+        ``cancelled`` is checked between batches.
+        """
+        matches = compile_pattern(text)
+        exclude = list(exclude)
+        pattern, literal = _like_pattern(text.casefold())
+        if literal >= TRIGRAM:
+            source = "names JOIN entries ON entries.id = names.rowid"
+            column = "names.folded"
+            # Rows come out of the full-text index in this order
+            order = "names.rowid"
+        else:
+            # Too short for trigrams; scanning the plain table is faster
+            source = "entries"
+            column = "entries.folded"
+            order = "entries.id"
+
+        base = str(root)
+        prefix = base if base.endswith(os.sep) else base + os.sep
+        # Paths below root sort between prefix and this
+        upper = prefix[:-1] + chr(ord(os.sep) + 1)
+        conditions = [
+            f"{column} LIKE :pattern",
+            "(dirs.path = :base OR "
+            "(dirs.path >= :prefix AND dirs.path < :upper))",
+            f"{order} > :after",
+        ]
+        if not show_hidden:
+            conditions.append("entries.name NOT LIKE '.%'")
+            conditions.append(
+                f"substr(dirs.path, :start) NOT LIKE '%{os.sep}.%'"
+            )
+        query = (
+            f"SELECT entries.id, dirs.path, entries.name FROM {source} "
+            "JOIN dirs ON dirs.id = entries.dir "
+            f"WHERE {' AND '.join(conditions)} "
+            f"ORDER BY {order} LIMIT :limit"
+        )
+        parameters: Dict[str, Any] = {
+            "pattern": pattern,
+            "base": base,
+            "prefix": prefix,
+            "upper": upper,
+            "start": len(prefix),
+            "limit": limit,
+        }
+
+        found = 0
+        after = 0
+        with closing(sqlite3.connect(self.path, timeout=30)) as connection:
+            while found < limit and not cancelled():
+                rows = connection.execute(
+                    query, dict(parameters, after=after)
+                ).fetchall()
+                batch = []
+                for entry_id, directory, name in rows:
+                    after = entry_id
+                    if directory == base:
+                        parts = [name]
+                    elif directory.startswith(prefix):
+                        parts = directory[len(prefix) :].split(os.sep) + [name]
+                    else:
+                        continue
+                    if not matches(name):
+                        continue
+                    if not show_hidden and any(
+                        p.startswith(".") for p in parts
+                    ):
+                        continue
+                    if exclude and any(
+                        fnmatch.fnmatchcase(p, e)
+                        for p in parts
+                        for e in exclude
+                    ):
+                        continue
+                    batch.append(Path(directory, name))
+                    if found + len(batch) >= limit:
+                        break
+                if batch:
+                    found += len(batch)
+                    yield batch
+                if len(rows) < limit:
+                    break
+
+    def stats(self) -> IndexStats:
+        """Current size of the index and duration of the last update."""
+        connection = self.connection
+        entries = connection.execute("SELECT count(*) FROM entries")
+        directories = connection.execute("SELECT count(*) FROM dirs")
+        try:
+            size = sum(
+                os.path.getsize(f"{self.path}{suffix}")
+                for suffix in ("", "-wal")
+                if os.path.exists(f"{self.path}{suffix}")
+            )
+        except OSError:
+            size = 0
+        return IndexStats(
+            entries.fetchone()[0],
+            directories.fetchone()[0],
+            size,
+            self._meta(connection, "update_seconds", None),
+            self._meta(connection, "updated_at", None),
+        )
+
+    @property
+    def ready(self) -> bool:
+        """Whether the index has been completely built once."""
+        return self._meta(self.connection, "updated_at", None) is not None
+
+    @staticmethod
+    def _meta(connection: sqlite3.Connection, key: str, default: Any) -> Any:
+        row = connection.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return default if row is None else row[0]
+
+    @staticmethod
+    def _set_meta(
+        connection: sqlite3.Connection, key: str, value: object
+    ) -> None:
+        connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            (key, value),
+        )
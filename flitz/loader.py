@@ -0,0 +1,107 @@
+"""Background directory loading."""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from .file_operations import DirectorySnapshot, FileOperations
+from .tracing import tracer
+
+# A batch is handed to the GUI once it holds this many entries ...
+BATCH_SIZE = 1000
+# ... or once this many seconds have passed since the previous batch.
+BATCH_INTERVAL = 0.05
+
+
+class LoadJob:
+    """A single directory load, identified by object identity."""
+
+    def __init__(self, path: Path, show_hidden: bool) -> None:
+        self.path = path
+        self.show_hidden = show_hidden
+        self.loaded = 0
+        # Directory stat taken before enumerating, used to validate caches
+        self.stat: Optional[os.stat_result] = None
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the job has been cancelled."""
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Ask the worker to stop at the next entry."""
+        self._cancelled.set()
+
+
+class DirectoryLoader(QObject):
+    """Enumerate directories in a worker thread and stream the results.
+
+    Only one job is active at a time: starting a new load cancels the
+    previous one, and batches of a cancelled job are never emitted.
+    """
+
+    batch_loaded = pyqtSignal(object, object)
+    load_finished = pyqtSignal(object)
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self.current_job: Optional[LoadJob] = None
+
+    def start(self, path: Path, show_hidden: bool = False) -> LoadJob:
+        """Cancel any running load and start loading ``path``."""
+        self.cancel()
+        job = LoadJob(path, show_hidden)
+        self.current_job = job
+        thread = threading.Thread(
+            target=self._run, args=(job,), name="flitz-loader", daemon=True
+        )
+        thread.start()
+        return job
+
+    def cancel(self) -> None:
+        """Cancel the running load, if any."""
+        if self.current_job is not None:
+            self.current_job.cancel()
+            self.current_job = None
+
+    def is_current(self, job: LoadJob) -> bool:
+        """Check whether ``job`` is still the active load."""
+        return job is self.current_job and not job.cancelled
+
+    def _run(self, job: LoadJob) -> None:
+        with tracer.span("list directory", path=job.path) as span:
+            self._load(job)
+            if span is not None:
+                span.args["entries"] = job.loaded
+
+    def _load(self, job: LoadJob) -> None:
+        try:
+            job.stat = os.stat(job.path)
+        except (OSError, PermissionError):
+            pass
+        batch = DirectorySnapshot(job.path)
+        last_emit = time.perf_counter()
+        for entry in FileOperations.iter_entries(job.path, job.show_hidden):
+            if job.cancelled:
+                return
+            batch.add_entry(entry)
+            now = time.perf_counter()
+            if len(batch) >= BATCH_SIZE or now - last_emit >= BATCH_INTERVAL:
+                # Reading and stating the entries of the batch
+                tracer.complete("read batch", last_emit, entries=len(batch))
+                job.loaded += len(batch)
+                self.batch_loaded.emit(job, batch)
+                batch = DirectorySnapshot(job.path)
+                last_emit = now
+        if job.cancelled:
+            return
+        if len(batch):
+            tracer.complete("read batch", last_emit, entries=len(batch))
+            job.loaded += len(batch)
+            self.batch_loaded.emit(job, batch)
+        self.load_finished.emit(job)
@@ -1,14 +1,39 @@
 """Main application and GUI components."""
 
-import subprocess
+import os
 import sys
+import threading
+import time
 from pathlib import Path
-from typing import List, Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    List,
+    Optional,
+    Set,
+)
 
-from PyQt6.QtCore import QPoint, Qt, QTimer, pyqtSignal
-from PyQt6.QtGui import QAction, QKeyEvent, QKeySequence
+from PyQt6.QtCore import (
+    QEvent,
+    QModelIndex,
+    QObject,
+    QPoint,
+    Qt,
+    QTimer,
+    pyqtSignal,
+)
+from PyQt6.QtGui import (
+    QAction,
+    QCloseEvent,
+    QKeyEvent,
+    QKeySequence,
+    QPaintEvent,
+)
 from PyQt6.QtWidgets import (
-    QApplication,
+    QCheckBox,
     QHBoxLayout,
     QHeaderView,
     QInputDialog,
@@ -17,16 +42,45 @@ from PyQt6.QtWidgets import (
     QMainWindow,
     QMenu,
     QMessageBox,
+    QProgressBar,
     QPushButton,
     QToolBar,
-    QTreeWidget,
-    QTreeWidgetItem,
+    QTreeView,
     QVBoxLayout,
     QWidget,
 )
 
+from .adapters import FolderSizer, TypeSniffer
+from .cache import listing_cache
 from .config import Config
-from .file_operations import FileItem, FileOperations
+from .config_watcher import ConfigWatcher
+from .file_model import (
+    ContentResultsModel,
+    FileListModel,
+    SearchResultsModel,
+)
+from .file_operations import (
+    ContentHit,
+    DirectorySnapshot,
+    FileItem,
+    FileOperations,
+    format_size,
+)
+from .loader import DirectoryLoader, LoadJob
+from .query import QueryError
+from .search import ContentSearch, RecursiveSearch, SearchJob
+from .sizes import SizeJob
+from .tracing import tracer
+from .transfers import DeleteJob, TransferJob, TransferQueue
+from .watcher import DirectoryWatcher
+
+if TYPE_CHECKING:
+    from .index import FilenameIndex
+
+# Delay after the last keystroke before the view is filtered
+FILTER_DELAY_MS = 30
+# Delay after the last keystroke before a recursive search starts
+SEARCH_DELAY_MS = 300
 
 
 class SearchBar(QWidget):
@@ -37,6 +91,9 @@ class SearchBar(QWidget):
 
     def __init__(self) -> None:
         super().__init__()
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.timeout.connect(self.on_search)
         self.setup_ui()
         self.hide()
 
@@ -48,9 +105,41 @@ class SearchBar(QWidget):
         self.search_input.setPlaceholderText("Search files and folders...")
         self.search_input.textChanged.connect(self.on_text_changed)
         self.search_input.returnPressed.connect(self.on_search)
+        self.recursive_check = QCheckBox("Subfolders")
+        self.recursive_check.setToolTip("Search all folders below this one")
+        self.recursive_check.toggled.connect(lambda _checked: self.on_search())
+        self.contents_check = QCheckBox("Contents")
+        self.contents_check.setToolTip(
+            "Search the contents of all files below this folder"
+        )
+        self.contents_check.toggled.connect(lambda _checked: self.on_search())
+        self.fuzzy_check = QCheckBox("Fuzzy")
+        self.fuzzy_check.setToolTip(
+            "Match names containing the typed letters in order, "
+            "best matches first"
+        )
+        self.fuzzy_check.toggled.connect(lambda _checked: self.on_search())
 
         layout.addWidget(QLabel("Search:"))
         layout.addWidget(self.search_input)
+        layout.addWidget(self.fuzzy_check)
+        layout.addWidget(self.recursive_check)
+        layout.addWidget(self.contents_check)
+
+    @property
+    def recursive(self) -> bool:
+        """Whether searches include subfolders."""
+        return self.recursive_check.isChecked()
+
+    @property
+    def contents(self) -> bool:
+        """Whether file contents are searched instead of names."""
+        return self.contents_check.isChecked()
+
+    @property
+    def fuzzy(self) -> bool:
+        """Whether the listing is filtered fuzzily and ranked."""
+        return self.fuzzy_check.isChecked()
 
     def keyPressEvent(self, event: Optional[QKeyEvent]) -> None:
         if event is None:
@@ -61,18 +150,15 @@ class SearchBar(QWidget):
             super().keyPressEvent(event)
 
     def on_text_changed(self, text: str) -> None:
-        # Real-time search with a small delay
-        if hasattr(self, "_search_timer"):
-            self._search_timer.stop()
-
-        self._search_timer: QTimer = QTimer()
-        self._search_timer.timeout.connect(
-            lambda: self.search_requested.emit(text)
-        )
-        self._search_timer.setSingleShot(True)
-        self._search_timer.start(300)  # 300ms delay
+        # Real-time search once typing pauses; filtering the listing is
+        # cheap, so it waits just long enough to coalesce fast typing
+        if self.recursive or self.contents:
+            self._search_timer.start(SEARCH_DELAY_MS)
+        else:
+            self._search_timer.start(FILTER_DELAY_MS)
 
     def on_search(self) -> None:
+        self._search_timer.stop()
         self.search_requested.emit(self.search_input.text())
 
     def show_search(self) -> None:
@@ -85,24 +171,274 @@ class SearchBar(QWidget):
         self.search_input.clear()
 
 
-class FileListWidget(QTreeWidget):
-    """Custom tree widget for file listing."""
+class SearchResultsView(QTreeView):
+    """List of recursive search matches or content search hits."""
+
+    path_activated = pyqtSignal(Path)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.results_model = SearchResultsModel(self)
+        self.content_model = ContentResultsModel(self)
+        self.setModel(self.results_model)
+        self.setRootIsDecorated(False)
+        self.setItemsExpandable(False)
+        self.setUniformRowHeights(True)
+        self.setSelectionBehavior(QTreeView.SelectionBehavior.SelectRows)
+        self.doubleClicked.connect(self.on_double_clicked)
+        header = self.header()
+        if header is not None:
+            header.setStretchLastSection(True)
+
+    def show_model(self, model: SearchResultsModel, root: Path) -> None:
+        """Clear ``model`` for results below ``root`` and show it."""
+        model.clear(root)
+        if self.model() is not model:
+            self.setModel(model)
+
+    def on_double_clicked(self, index: QModelIndex) -> None:
+        model = self.model()
+        if not isinstance(model, SearchResultsModel):
+            return
+        path = model.path(index)
+        if path is not None:
+            self.path_activated.emit(path)
+
+    def keyPressEvent(self, event: Optional[QKeyEvent]) -> None:
+        if event is None:
+            return
+        if event.key() in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
+            self.on_double_clicked(self.currentIndex())
+        else:
+            super().keyPressEvent(event)
+
+
+class IndexManager(QObject):
+    """Keep the file-name index up to date in a background thread."""
+
+    update_finished = pyqtSignal()
+
+    def __init__(
+        self,
+        index: "FilenameIndex",
+        interval_minutes: int,
+        parent: Optional[QObject] = None,
+    ) -> None:
+        super().__init__(parent)
+        self.index = index
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._timer = QTimer(self)
+        self._timer.setInterval(max(interval_minutes, 1) * 60 * 1000)
+        self._timer.timeout.connect(self.start_update)
+        self._timer.start()
+
+    @property
+    def updating(self) -> bool:
+        """Whether an update is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start_update(self) -> None:
+        """Update the index unless an update is already running."""
+        if self.updating:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="flitz-index", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        if self.index.update(self._stop.is_set):
+            self.update_finished.emit()
+
+    def shutdown(self) -> None:
+        """Stop a running update and close the index."""
+        self._timer.stop()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.index.close()
+
+
+class TransferManager(QObject):
+    """Qt front end of the background transfer queue."""
+
+    job_finished = pyqtSignal(object)
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        # The queue calls back from its scheduler thread; the signal hands
+        # the job over to the GUI thread.
+        self.queue = TransferQueue(on_finished=self.job_finished.emit)
+
+    def submit(self, job: TransferJob) -> TransferJob:
+        """Queue a job."""
+        return self.queue.submit(job)
+
+    def shutdown(self) -> None:
+        """Stop all jobs and the workers."""
+        self.queue.shutdown()
+
+
+class TransferStatus(QWidget):
+    """Status bar widget showing the progress of running transfers."""
+
+    def __init__(self, manager: TransferManager) -> None:
+        super().__init__()
+        self.manager = manager
+        self.setup_ui()
+        self.hide()
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(250)
+        self._timer.timeout.connect(self.update_status)
+        self._timer.start()
+
+    def setup_ui(self) -> None:
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.label = QLabel()
+        self.progress = QProgressBar()
+        self.progress.setMaximumWidth(150)
+        self.pause_button = QPushButton("Pause")
+        self.pause_button.clicked.connect(self.toggle_pause)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel)
+
+        layout.addWidget(self.label)
+        layout.addWidget(self.progress)
+        layout.addWidget(self.pause_button)
+        layout.addWidget(self.cancel_button)
+
+    def update_status(self) -> None:
+        """Refresh the display from the running job."""
+        jobs = self.manager.queue.jobs()
+        if not jobs:
+            self.hide()
+            return
+
+        job = jobs[0]
+        progress = job.progress()
+        if job.operation == "delete":
+            text = (
+                f"Deleting {progress.done_files}/{progress.total_files} items"
+            )
+        else:
+            verb = "Moving" if job.operation == "move" else "Copying"
+            text = (
+                f"{verb} {progress.done_files}/{progress.total_files} files, "
+                f"{format_size(progress.bytes_per_second)}/s"
+            )
+        if progress.eta is not None:
+            text += f", {int(progress.eta)} s left"
+        if len(jobs) > 1:
+            text += f" ({len(jobs) - 1} queued)"
+        details = [
+            f"{path.name}: {format_size(done)} of {format_size(size)}"
+            for path, done, size in progress.active_files
+        ]
+        if progress.physical_bytes != progress.done_bytes:
+            # Holes, hard links and reflinked data are not written
+            details.append(
+                f"Written: {format_size(progress.physical_bytes)} for "
+                f"{format_size(progress.done_bytes)}"
+            )
+        if progress.strategies:
+            details.append(
+                "Copied with: "
+                + ", ".join(
+                    f"{name} ({count})"
+                    for name, count in progress.strategies.items()
+                )
+            )
+        self.label.setToolTip("\n".join(details))
+        self.label.setText(text)
+
+        if progress.scanned and progress.total_bytes:
+            self.progress.setRange(0, 1000)
+            self.progress.setValue(
+                int(1000 * progress.done_bytes / progress.total_bytes)
+            )
+        else:
+            self.progress.setRange(0, 0)  # Busy indicator
+        self.pause_button.setText(
+            "Resume" if progress.state == TransferJob.PAUSED else "Pause"
+        )
+        self.show()
+
+    def toggle_pause(self) -> None:
+        """Pause or resume the running job."""
+        jobs = self.manager.queue.jobs()
+        if not jobs:
+            return
+        if jobs[0].state == TransferJob.PAUSED:
+            jobs[0].resume()
+        else:
+            jobs[0].pause()
+        self.update_status()
+
+    def cancel(self) -> None:
+        """Cancel the running job."""
+        jobs = self.manager.queue.jobs()
+        if jobs:
+            jobs[0].cancel()
+
+
+class FileListWidget(QTreeView):
+    """Custom tree view for file listing."""
 
     path_changed = pyqtSignal(Path)
     item_renamed = pyqtSignal(Path, str)
+    load_started = pyqtSignal(Path)
+    load_progress = pyqtSignal(int)
+    load_finished = pyqtSignal(int)
+    filter_changed = pyqtSignal(int, int)
 
     def __init__(self) -> None:
         super().__init__()
+        self.file_model = FileListModel(self)
+        self.file_model.style = self.style()
+        self.setModel(self.file_model)
         self.setup_ui()
         self.current_path = Path.home()
         self.show_hidden = False
         self.clipboard_items: List[Path] = []
         self.clipboard_operation: Optional[str] = None  # 'copy' or 'cut'
 
+        self.loader = DirectoryLoader(self)
+        self.loader.batch_loaded.connect(self.on_batch_loaded)
+        self.loader.load_finished.connect(self.on_load_finished)
+        self.loading = False
+        # Trace span of the running load
+        self._navigation = 0
+
+        self.watcher = DirectoryWatcher(self)
+        self.watcher.entries_changed.connect(self.on_entries_changed)
+
+        self.sizer = FolderSizer(self)
+        self.sizer.sizes_found.connect(self.on_sizes_found)
+        # Whether folder sizes are computed after every load
+        self.auto_folder_sizes = False
+
+        self.sniffer = TypeSniffer(self)
+        self.sniffer.types_found.connect(self.file_model.types_resolved)
+        self.set_type_sniffing(True)
+
+        self.transfers = TransferManager(self)
+        self.transfers.job_finished.connect(self.on_transfer_finished)
+        # Changes reported while a load is running, applied once it is done
+        self._pending_changes: Set[str] = set()
+        # Entry to make current once the running load is done
+        self._select_after_load: Optional[str] = None
+
     def setup_ui(self) -> None:
-        self.setHeaderLabels(["Name", "Size", "Type", "Date Modified"])
         self.setRootIsDecorated(False)
-        self.setSelectionMode(QTreeWidget.SelectionMode.ExtendedSelection)
+        self.setItemsExpandable(False)
+        # Lets the view lay out rows without asking the model for each one
+        self.setUniformRowHeights(True)
+        self.setSelectionBehavior(QTreeView.SelectionBehavior.SelectRows)
+        self.setSelectionMode(QTreeView.SelectionMode.ExtendedSelection)
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.customContextMenuRequested.connect(self.show_context_menu)
 
@@ -111,12 +447,16 @@ class FileListWidget(QTreeWidget):
         self.sortByColumn(0, Qt.SortOrder.AscendingOrder)
 
         # Connect signals
-        self.itemDoubleClicked.connect(self.on_item_double_clicked)
+        self.doubleClicked.connect(self.on_item_double_clicked)
 
         # Adjust column widths
         header = self.header()
         if header is not None:
             header.setStretchLastSection(False)
+            # Size columns to the visible rows plus a sample of others;
+            # the default sample makes every relayout of a large listing
+            # format a thousand rows
+            header.setResizeContentsPrecision(100)
             header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
             header.setSectionResizeMode(
                 1, QHeaderView.ResizeMode.ResizeToContents
@@ -128,44 +468,210 @@ class FileListWidget(QTreeWidget):
                 3, QHeaderView.ResizeMode.ResizeToContents
             )
 
-    def load_directory(self, path: Path) -> None:
-        """Load directory contents into the tree widget."""
+    def load_directory(self, path: Path, select: Optional[str] = None) -> None:
+        """Start loading directory contents into the view.
+
+        Recently viewed directories that did not change are shown straight
+        from the listing cache. Otherwise entries are enumerated in a worker
+        thread and added in batches, so the first rows show up quickly and
+        the window stays responsive. Loading another directory cancels the
+        running load. The entry called ``select`` becomes the current row
+        once it is listed.
+        """
         if not FileOperations.can_access(path):
             QMessageBox.warning(
                 self, "Access Denied", f"Cannot access: {path}"
             )
             return
 
+        # Ends a load that did not finish as cancelled
+        tracer.end(self._navigation, cancelled=True)
+        self._navigation = tracer.begin("navigate", path=path)
+        tracer.start_profile()
+
         self.current_path = path
-        self.clear()
+        self.sizer.cancel()
+        self.sniffer.clear()
+        self._pending_changes.clear()
+        self._select_after_load = select
+        self.watcher.watch(path)
+
+        snapshot = listing_cache.get(path, self.show_hidden)
+        if snapshot is not None:
+            self.loader.cancel()
+            self.loading = False
+            self.file_model.set_snapshot(snapshot)
+            self.sort_listing()
+            if select is not None:
+                self.select_name(select)
+            self.path_changed.emit(path)
+            self.load_finished.emit(len(snapshot))
+            self._end_navigation(cached=True)
+            if self.auto_folder_sizes:
+                self.calculate_folder_sizes()
+            return
+
+        self.file_model.clear(path)
+        self.loader.start(path, self.show_hidden)
+        self.loading = True
 
-        items = FileOperations.list_directory(path, self.show_hidden)
+        self.load_started.emit(path)
+        self.path_changed.emit(path)
+
+    def on_batch_loaded(self, job: LoadJob, batch: DirectorySnapshot) -> None:
+        """Add a batch of loaded entries to the view."""
+        if not self.loader.is_current(job):
+            return
 
-        # Sort: directories first, then files
-        items.sort(key=lambda x: (not x.is_directory, x.name.lower()))
+        self.file_model.append_snapshot(batch)
+
+        self.load_progress.emit(job.loaded)
+
+    def on_load_finished(self, job: LoadJob) -> None:
+        """Finish a load by sorting the complete listing."""
+        if not self.loader.is_current(job):
+            return
 
-        for file_item in items:
-            tree_item = QTreeWidgetItem(
-                [
-                    file_item.name,
-                    file_item.size_str,
-                    file_item.file_type,
-                    file_item.modified_str,
-                ]
+        self.loading = False
+        self.sort_listing()
+        if self._pending_changes:
+            self.apply_entry_changes(self._pending_changes)
+            self._pending_changes = set()
+        if job.stat is not None:
+            listing_cache.put(
+                job.path, job.show_hidden, self.file_model.snapshot, job.stat
             )
-            style = self.style()
-            if style is not None:
-                tree_item.setIcon(0, file_item.get_icon(style))
-            tree_item.setData(0, Qt.ItemDataRole.UserRole, file_item.path)
-            self.addTopLevelItem(tree_item)
+        if self._select_after_load is not None:
+            self.select_name(self._select_after_load)
+            self._select_after_load = None
+        self.load_finished.emit(len(self.file_model.snapshot))
+        self._end_navigation(cached=False)
+        if self.auto_folder_sizes:
+            self.calculate_folder_sizes()
+
+    def _end_navigation(self, cached: bool) -> None:
+        """End the trace span and profile of the finished load."""
+        tracer.end(
+            self._navigation,
+            entries=len(self.file_model.snapshot),
+            cached=cached,
+        )
+        self._navigation = 0
+        tracer.stop_profile()
+
+    def paintEvent(self, event: Optional[QPaintEvent]) -> None:
+        with tracer.span("paint"):
+            super().paintEvent(event)
+
+    def calculate_folder_sizes(self) -> None:
+        """Compute the sizes of the listed folders in the background."""
+        snapshot = self.file_model.snapshot
+        names = [
+            snapshot.names[row]
+            for row in range(len(snapshot))
+            if snapshot.is_dir(row)
+        ]
+        if names and not self.loading:
+            self.sizer.start(self.current_path, names)
 
-        self.path_changed.emit(path)
+    def set_type_sniffing(self, enabled: bool) -> None:
+        """Recognize files without a telling extension by content."""
+        self.file_model.sniffer = self.sniffer if enabled else None
+
+    def on_sizes_found(self, job: SizeJob, sizes: Dict[str, int]) -> None:
+        """Show the sizes of finished folders."""
+        if self.sizer.is_current(job) and job.path == self.current_path:
+            self.file_model.set_folder_sizes(sizes)
+
+    def refresh(self) -> None:
+        """Re-read the current directory from disk."""
+        listing_cache.invalidate(self.current_path)
+        self.load_directory(self.current_path)
 
-    def on_item_double_clicked(
-        self, item: QTreeWidgetItem, column: int
+    def on_entries_changed(
+        self,
+        path: Path,
+        names: Optional[Set[str]],
+        st: Optional[os.stat_result],
     ) -> None:
+        """Apply changes reported by the directory watcher."""
+        if path != self.current_path:
+            return
+        if names is None:
+            self.refresh()
+            return
+        self.patch_entries(names, st)
+
+    def update_entries(self, names: Set[str]) -> None:
+        """Reflect changes this view made to the named entries."""
+        self.patch_entries(names, FileOperations.stat_path(self.current_path))
+
+    def patch_entries(
+        self, names: Set[str], st: Optional[os.stat_result]
+    ) -> None:
+        """Patch the named rows and the cached listing in place.
+
+        ``st`` is the directory's stat result the patched listing is
+        cached under; see :class:`DirectoryWatcher`.
+        """
+        if self.loading:
+            self._pending_changes |= names
+            return
+
+        self.apply_entry_changes(names)
+        if st is not None:
+            listing_cache.put(
+                self.current_path,
+                self.show_hidden,
+                self.file_model.snapshot,
+                st,
+            )
+
+    def apply_entry_changes(self, names: Set[str]) -> None:
+        """Re-stat the named entries and patch their rows."""
+        changes = {
+            name: FileOperations.stat_path(self.current_path / name)
+            for name in names
+            if self.show_hidden or not name.startswith(".")
+        }
+        self.file_model.apply_changes(changes)
+
+    def sort_listing(self) -> None:
+        """Sort the listing by the header's current sort column."""
+        header = self.header()
+        if header is not None:
+            self.file_model.sort(
+                header.sortIndicatorSection(), header.sortIndicatorOrder()
+            )
+
+    def selected_paths(self) -> List[Path]:
+        """Paths of all selected rows."""
+        selection = self.selectionModel()
+        if selection is None:
+            return []
+        return [
+            self.file_model.item(index.row()).path
+            for index in selection.selectedRows(0)
+        ]
+
+    def select_name(self, name: str) -> None:
+        """Make the entry called ``name`` the current row."""
+        position = self.file_model.position_of(name)
+        if position is None:
+            return
+        index = self.file_model.index(position, 0)
+        self.setCurrentIndex(index)
+        self.scrollTo(index)
+
+    def current_file_path(self) -> Optional[Path]:
+        """Path of the current row."""
+        return self.file_model.path(self.currentIndex())
+
+    def on_item_double_clicked(self, index: QModelIndex) -> None:
         """Handle double-click on item."""
-        file_path = item.data(0, Qt.ItemDataRole.UserRole)
+        file_path = self.file_model.path(index)
+        if file_path is None:
+            return
 
         if file_path.is_dir():
             self.load_directory(file_path)
@@ -174,6 +680,8 @@ class FileListWidget(QTreeWidget):
 
     def open_file(self, file_path: Path) -> None:
         """Open file with default application."""
+        import subprocess
+
         try:
             if sys.platform == "win32":
                 subprocess.run(
@@ -196,9 +704,9 @@ class FileListWidget(QTreeWidget):
         elif (
             event.key() == Qt.Key.Key_Return or event.key() == Qt.Key.Key_Enter
         ):
-            current = self.currentItem()
-            if current:
-                self.on_item_double_clicked(current, 0)
+            current = self.currentIndex()
+            if current.isValid():
+                self.on_item_double_clicked(current)
         elif event.matches(QKeySequence.StandardKey.Copy):
             self.copy_selected()
         elif event.matches(QKeySequence.StandardKey.Cut):
@@ -222,8 +730,7 @@ class FileListWidget(QTreeWidget):
 
         menu.addSeparator()
 
-        item = self.itemAt(position)
-        if item:
+        if self.indexAt(position).isValid():
             rename_action = QAction("Rename...", self)
             rename_action.triggered.connect(self.rename_selected)
             menu.addAction(rename_action)
@@ -236,12 +743,25 @@ class FileListWidget(QTreeWidget):
 
         menu.exec(self.mapToGlobal(position))
 
+    def check_name(self, name: str) -> bool:
+        """Warn about typed names that are paths rather than names."""
+        if FileOperations.is_valid_name(name):
+            return True
+        QMessageBox.warning(
+            self,
+            "Invalid Name",
+            f"Not a valid name: {name}\n\n"
+            f"Names cannot be . or .. or contain {os.sep}.",
+        )
+        return False
+
     def create_folder(self) -> None:
         """Create new folder."""
         name, ok = QInputDialog.getText(self, "Create Folder", "Folder name:")
-        if ok and name:
+        if ok and name and self.check_name(name):
             if FileOperations.create_folder(self.current_path, name):
-                self.load_directory(self.current_path)
+                self.update_entries({name})
+                self.select_name(name)
             else:
                 QMessageBox.warning(
                     self, "Error", f"Could not create folder: {name}"
@@ -250,9 +770,10 @@ class FileListWidget(QTreeWidget):
     def create_file(self) -> None:
         """Create new empty file."""
         name, ok = QInputDialog.getText(self, "Create File", "File name:")
-        if ok and name:
+        if ok and name and self.check_name(name):
             if FileOperations.create_file(self.current_path, name):
-                self.load_directory(self.current_path)
+                self.update_entries({name})
+                self.select_name(name)
             else:
                 QMessageBox.warning(
                     self, "Error", f"Could not create file: {name}"
@@ -260,19 +781,24 @@ class FileListWidget(QTreeWidget):
 
     def rename_selected(self) -> None:
         """Rename selected item."""
-        item = self.currentItem()
-        if not item:
+        file_path = self.current_file_path()
+        if file_path is None:
             return
 
-        file_path = item.data(0, Qt.ItemDataRole.UserRole)
         current_name = file_path.name
 
         new_name, ok = QInputDialog.getText(
             self, "Rename", "New name:", text=current_name
         )
-        if ok and new_name and new_name != current_name:
+        if (
+            ok
+            and new_name
+            and new_name != current_name
+            and self.check_name(new_name)
+        ):
             if FileOperations.rename_item(file_path, new_name):
-                self.load_directory(self.current_path)
+                self.update_entries({current_name, new_name})
+                self.select_name(new_name)
                 self.item_renamed.emit(file_path, new_name)
             else:
                 QMessageBox.warning(
@@ -281,11 +807,11 @@ class FileListWidget(QTreeWidget):
 
     def delete_selected(self) -> None:
         """Delete selected items."""
-        selected_items = self.selectedItems()
-        if not selected_items:
+        selected_paths = self.selected_paths()
+        if not selected_paths:
             return
 
-        file_names = [item.text(0) for item in selected_items]
+        file_names = [path.name for path in selected_paths]
         reply = QMessageBox.question(
             self,
             "Confirm Delete",
@@ -297,35 +823,20 @@ class FileListWidget(QTreeWidget):
         )
 
         if reply == QMessageBox.StandardButton.Yes:
-            success_count = 0
-            for item in selected_items:
-                file_path = item.data(0, Qt.ItemDataRole.UserRole)
-                if FileOperations.delete_item(file_path):
-                    success_count += 1
-
-            self.load_directory(self.current_path)
-
-            if success_count < len(selected_items):
-                QMessageBox.warning(
-                    self,
-                    "Partial Success",
-                    f"Deleted {success_count} of {len(selected_items)} items.",
-                )
+            # Staged items are gone right away; errors are reported once
+            # the background job finishes.
+            job = DeleteJob.stage(selected_paths)
+            self.update_entries(set(file_names))
+            self.transfers.submit(job)
 
     def copy_selected(self) -> None:
         """Copy selected items to clipboard."""
-        selected_items = self.selectedItems()
-        self.clipboard_items = [
-            item.data(0, Qt.ItemDataRole.UserRole) for item in selected_items
-        ]
+        self.clipboard_items = self.selected_paths()
         self.clipboard_operation = "copy"
 
     def cut_selected(self) -> None:
         """Cut selected items to clipboard."""
-        selected_items = self.selectedItems()
-        self.clipboard_items = [
-            item.data(0, Qt.ItemDataRole.UserRole) for item in selected_items
-        ]
+        self.clipboard_items = self.selected_paths()
         self.clipboard_operation = "cut"
 
     def paste_selected(self) -> None:
@@ -333,37 +844,36 @@ class FileListWidget(QTreeWidget):
         if not self.clipboard_items:
             return
 
-        success_count = 0
-        for src_path in self.clipboard_items:
-            dst_path = self.current_path / src_path.name
-
-            if self.clipboard_operation == "copy":
-                if FileOperations.copy_item(src_path, dst_path):
-                    success_count += 1
-            elif self.clipboard_operation == "cut":
-                if FileOperations.move_item(src_path, dst_path):
-                    success_count += 1
+        operation = "move" if self.clipboard_operation == "cut" else "copy"
+        self.transfers.submit(
+            TransferJob(operation, self.clipboard_items, self.current_path)
+        )
 
         if self.clipboard_operation == "cut":
-            self.clipboard_items.clear()
+            self.clipboard_items = []
 
-        self.load_directory(self.current_path)
+    def on_transfer_finished(self, job: TransferJob) -> None:
+        """Show the results of a finished paste."""
+        if job.destination == self.current_path:
+            self.update_entries({src.name for src in job.sources})
 
-        if success_count < len(self.clipboard_items):
+        if job.errors:
             QMessageBox.warning(
                 self,
                 "Partial Success",
-                f"Processed {success_count} of "
-                f"{len(self.clipboard_items)} items.",
+                f"Processed {len(job.completed)} of "
+                f"{len(job.sources)} items.\n\n"
+                + "\n".join(
+                    f"{src.name}: {error}" for src, error in job.errors
+                ),
             )
 
     def show_properties(self) -> None:
         """Show properties dialog for selected item."""
-        item = self.currentItem()
-        if not item:
+        file_path = self.current_file_path()
+        if file_path is None:
             return
 
-        file_path = item.data(0, Qt.ItemDataRole.UserRole)
         file_item = FileItem(file_path)
 
         info = f"""Path: {file_path}
@@ -375,22 +885,22 @@ Hidden: {"Yes" if file_item.is_hidden else "No"}"""
 
         QMessageBox.information(self, "Properties", info)
 
-    def filter_items(self, search_text: str) -> None:
-        """Filter items based on search text."""
-        if not search_text:
-            # Show all items
-            for i in range(self.topLevelItemCount()):
-                item = self.topLevelItem(i)
-                if item is not None:
-                    item.setHidden(False)
-            return
+    def filter_items(self, search_text: str, fuzzy: bool = False) -> None:
+        """Show only the items whose name contains ``search_text``.
 
-        search_lower = search_text.lower()
-        for i in range(self.topLevelItemCount()):
-            item = self.topLevelItem(i)
-            if item is not None:
-                name = item.text(0).lower()
-                item.setHidden(search_lower not in name)
+        With ``fuzzy`` the items are ranked by how well they match and
+        the best one becomes the current item.
+        """
+        model = self.file_model
+        if search_text == model.filter_text and fuzzy == model.fuzzy:
+            return
+        model.set_filter(search_text, fuzzy)
+        if fuzzy and search_text and model.rowCount():
+            self.setCurrentIndex(model.index(0, 0))
+            self.scrollToTop()
+        self.filter_changed.emit(
+            self.file_model.rowCount(), len(self.file_model.snapshot)
+        )
 
     def toggle_hidden_files(self) -> None:
         """Toggle visibility of hidden files."""
@@ -398,15 +908,54 @@ Hidden: {"Yes" if file_item.is_hidden else "No"}"""
         self.load_directory(self.current_path)
 
 
+class FirstPaint(QObject):
+    """Call ``callback`` once the file list has been painted with content.
+
+    That is as soon as it shows rows, or is done loading an empty folder.
+    """
+
+    def __init__(
+        self, file_list: FileListWidget, callback: Callable[[], None]
+    ) -> None:
+        super().__init__(file_list)
+        self.file_list = file_list
+        self.callback = callback
+        viewport = file_list.viewport()
+        if viewport is not None:
+            viewport.installEventFilter(self)
+
+    def eventFilter(
+        self, watched: Optional[QObject], event: Optional[QEvent]
+    ) -> bool:
+        if (
+            watched is not None
+            and event is not None
+            and event.type() == QEvent.Type.Paint
+            and (
+                self.file_list.file_model.rowCount() > 0
+                or not self.file_list.loading
+            )
+        ):
+            watched.removeEventFilter(self)
+            # Called once the paint event has been handled
+            QTimer.singleShot(0, self.callback)
+        return False
+
+
 class MainWindow(QMainWindow):
     """Main application window."""
 
-    def __init__(self) -> None:
+    def __init__(self, config: Optional[Config] = None) -> None:
         super().__init__()
-        self.config = Config.load()
+        self.config = config if config is not None else Config.load()
         self.setup_ui()
         self.setup_actions()
         self.apply_config()
+        self.setup_index()
+
+        self.config_watcher = ConfigWatcher(self.config, self)
+        self.config_watcher.config_changed.connect(self.on_config_changed)
+        self.config_watcher.reload_failed.connect(self.on_config_failed)
 
     def setup_ui(self) -> None:
         self.setWindowTitle("Flitz File Explorer")
@@ -443,11 +992,45 @@ class MainWindow(QMainWindow):
         self.search_bar.escape_pressed.connect(self.on_search_escape)
         layout.addWidget(self.search_bar)
 
+        # Recursive search results, shown instead of the file list
+        self.search = RecursiveSearch(self)
+        self.search.results_found.connect(self.on_search_results)
+        self.search.search_finished.connect(self.on_search_finished)
+        self.search_bar.search_input.textChanged.connect(self.search.cancel)
+        self.content_search = ContentSearch(self)
+        self.content_search.results_found.connect(self.on_content_results)
+        self.content_search.search_finished.connect(self.on_search_finished)
+        self.search_bar.search_input.textChanged.connect(
+            self.content_search.cancel
+        )
+        self.search_results = SearchResultsView()
+        self.search_results.path_activated.connect(self.on_result_activated)
+        self.search_results.hide()
+        layout.addWidget(self.search_results)
+
         # File list
         self.file_list = FileListWidget()
         self.file_list.path_changed.connect(self.on_path_changed)
+        self.file_list.load_started.connect(self.on_load_started)
+        self.file_list.load_progress.connect(self.on_load_progress)
+        self.file_list.load_finished.connect(self.on_load_finished)
+        self.file_list.filter_changed.connect(self.on_filter_changed)
+        self.file_list.sizer.sizes_finished.connect(self.on_sizes_finished)
         layout.addWidget(self.file_list)
 
+        # Loading indicator
+        status_bar = self.statusBar()
+        self.load_label = QLabel()
+        self.load_progress = QProgressBar()
+        self.load_progress.setRange(0, 0)  # Busy indicator
+        self.load_progress.setMaximumWidth(150)
+        self.load_progress.hide()
+        self.transfer_status = TransferStatus(self.file_list.transfers)
+        if status_bar is not None:
+            status_bar.addWidget(self.load_label)
+            status_bar.addPermanentWidget(self.transfer_status)
+            status_bar.addPermanentWidget(self.load_progress)
+
     def setup_actions(self) -> None:
         """Setup keyboard shortcuts and actions."""
         # Font size actions
@@ -475,11 +1058,109 @@ class MainWindow(QMainWindow):
         )
         self.addAction(toggle_hidden_action)
 
-    def apply_config(self) -> None:
-        """Apply configuration settings."""
-        font = self.font()
-        font.setPointSize(self.config.font_size)
-        self.setFont(font)
+        folder_sizes_action = QAction("Calculate Folder Sizes", self)
+        folder_sizes_action.setShortcut(QKeySequence("Ctrl+Shift+S"))
+        folder_sizes_action.triggered.connect(
+            self.file_list.calculate_folder_sizes
+        )
+        self.addAction(folder_sizes_action)
+
+    def apply_config(self, changed: Optional[Collection[str]] = None) -> None:
+        """Apply configuration settings, or only the ``changed`` ones."""
+
+        def touched(*fields: str) -> bool:
+            return changed is None or any(field in changed for field in fields)
+
+        if touched("font_size"):
+            font = self.font()
+            font.setPointSize(self.config.font_size)
+            self.setFont(font)
+
+        if touched("listing_cache_entries", "listing_cache_mb"):
+            listing_cache.resize(
+                self.config.listing_cache_entries,
+                self.config.listing_cache_mb * 1024 * 1024,
+            )
+        if touched("content_search_max_mb"):
+            self.content_search.max_size = (
+                self.config.content_search_max_mb * 1024 * 1024
+            )
+        if touched("folder_sizes"):
+            self.file_list.auto_folder_sizes = self.config.folder_sizes
+        if touched("sniff_file_types"):
+            self.file_list.set_type_sniffing(self.config.sniff_file_types)
+        if touched("trace_file", "profile_file"):
+            tracer.configure(self.config.trace_file, self.config.profile_file)
+
+    def on_config_changed(
+        self, config: Config, changed: Dict[str, Any]
+    ) -> None:
+        """Apply fields changed in the configuration files."""
+        self.config = self.config.model_copy(update=changed)
+        self.apply_config(changed)
+        if {"index_roots", "index_refresh_minutes", "search_exclude"} & set(
+            changed
+        ):
+            if self.index_manager is not None:
+                self.index_manager.shutdown()
+            self.setup_index()
+        status_bar = self.statusBar()
+        if status_bar is not None:
+            status_bar.showMessage(
+                f"Settings reloaded: {', '.join(sorted(changed))}", 5000
+            )
+
+    def on_config_failed(self, message: str) -> None:
+        """Report configuration files that could not be used."""
+        status_bar = self.statusBar()
+        if status_bar is not None:
+            status_bar.showMessage(f"Settings not reloaded: {message}", 10000)
+
+    def setup_index(self) -> None:
+        """Start maintaining the file-name index, if configured."""
+        self.index_manager: Optional[IndexManager] = None
+        if not self.config.index_roots:
+            return
+        # Only loaded when configured, to keep startup fast
+        from .index import FilenameIndex, default_index_path
+
+        if not FilenameIndex.available():
+            return
+        index = FilenameIndex(
+            default_index_path(),
+            [Path(root) for root in self.config.index_roots],
+            self.config.search_exclude,
+        )
+        self.index_manager = IndexManager(
+            index, self.config.index_refresh_minutes, self
+        )
+        self.index_manager.update_finished.connect(self.on_index_updated)
+        self.index_manager.start_update()
+
+    def on_index_updated(self) -> None:
+        """Report the size of the updated index."""
+        if self.index_manager is None:
+            return
+        stats = self.index_manager.index.stats()
+        status_bar = self.statusBar()
+        if status_bar is not None:
+            status_bar.showMessage(
+                f"Index updated: {stats.entries} names, "
+                f"{format_size(stats.bytes)}, "
+                f"{stats.update_seconds or 0:.1f} s",
+                10000,
+            )
+
+    def closeEvent(self, event: Optional[QCloseEvent]) -> None:
+        self.search.cancel()
+        self.file_list.sizer.cancel()
+        self.file_list.sniffer.shutdown()
+        self.content_search.shutdown()
+        if self.index_manager is not None:
+            self.index_manager.shutdown()
+        self.file_list.transfers.shutdown()
+        self.config_watcher.close()
+        super().closeEvent(event)
 
     def keyPressEvent(self, event: Optional[QKeyEvent]) -> None:
         if event is None:
@@ -494,12 +1175,14 @@ class MainWindow(QMainWindow):
     def zoom_in(self) -> None:
         """Increase font size."""
         self.config.font_size = min(self.config.font_size + 1, 24)
-        self.apply_config()
+        self.apply_config({"font_size"})
+        self.config_watcher.save({"font_size": self.config.font_size})
 
     def zoom_out(self) -> None:
         """Decrease font size."""
         self.config.font_size = max(self.config.font_size - 1, 8)
-        self.apply_config()
+        self.apply_config({"font_size"})
+        self.config_watcher.save({"font_size": self.config.font_size})
 
     def show_search(self) -> None:
         """Show search bar."""
@@ -507,11 +1190,120 @@ class MainWindow(QMainWindow):
 
     def on_search(self, text: str) -> None:
         """Handle search request."""
-        self.file_list.filter_items(text)
+        if self.search_bar.contents and text:
+            self.file_list.filter_items("")
+            self.start_content_search(text)
+            return
+        if self.search_bar.recursive and text:
+            self.file_list.filter_items("")
+            self.start_recursive_search(text)
+            return
+        self.stop_recursive_search()
+        try:
+            self.file_list.filter_items(text, self.search_bar.fuzzy)
+        except QueryError as e:
+            self.load_label.setText(f"Invalid query: {e}")
+
+    def start_recursive_search(self, text: str) -> None:
+        """Search the tree below the current folder for ``text``."""
+        root = self.file_list.current_path
+        self.content_search.cancel()
+        self.search_results.show_model(self.search_results.results_model, root)
+        self.file_list.hide()
+        self.search_results.show()
+
+        index = self.index_manager.index if self.index_manager else None
+        if index is not None and not (index.ready and index.covers(root)):
+            index = None
+        self.search.start(
+            root,
+            text,
+            self.file_list.show_hidden,
+            self.config.search_exclude,
+            index,
+        )
+        self.load_label.setText("Searching...")
+        self.load_progress.show()
+
+    def start_content_search(self, text: str) -> None:
+        """Search the files below the current folder for ``text``."""
+        root = self.file_list.current_path
+        self.search.cancel()
+        self.search_results.show_model(self.search_results.content_model, root)
+        self.file_list.hide()
+        self.search_results.show()
+        self.content_search.start(
+            root,
+            text,
+            self.file_list.show_hidden,
+            self.config.search_exclude,
+        )
+        self.load_label.setText("Searching contents...")
+        self.load_progress.show()
+
+    def stop_recursive_search(self) -> None:
+        """Cancel the searches and show the file list again."""
+        self.search.cancel()
+        self.content_search.cancel()
+        if self.search_results.isVisible():
+            self.search_results.hide()
+            self.search_results.results_model.clear(Path())
+            self.search_results.content_model.clear(Path())
+            self.file_list.show()
+            self.load_progress.hide()
+            self.load_label.setText(
+                f"{len(self.file_list.file_model.snapshot)} items"
+            )
+
+    def on_search_results(self, job: SearchJob, paths: List[Path]) -> None:
+        """Add streamed matches to the results."""
+        if not self.search.is_current(job):
+            return
+        self.search_results.results_model.append_paths(paths)
+        self.load_label.setText(f"Searching... {job.matches} found")
+
+    def on_content_results(
+        self, job: SearchJob, hits: List[ContentHit]
+    ) -> None:
+        """Add streamed content hits to the results."""
+        if not self.content_search.is_current(job):
+            return
+        self.search_results.content_model.append_hits(hits)
+        self.load_label.setText(f"Searching contents... {job.matches} found")
+
+    def on_search_finished(self, job: SearchJob) -> None:
+        """Report the finished search."""
+        if not (
+            self.search.is_current(job) or self.content_search.is_current(job)
+        ):
+            return
+        self.load_progress.hide()
+        if job.indexed:
+            from .index import RESULT_LIMIT
+
+            elapsed = (time.monotonic() - job.started) * 1000
+            more = "+" if job.matches >= RESULT_LIMIT else ""
+            self.load_label.setText(
+                f"{job.matches}{more} found in index ({elapsed:.0f} ms)"
+            )
+            return
+        self.load_label.setText(
+            f"{job.matches} found in {job.directories} folders"
+        )
+
+    def on_result_activated(self, path: Path) -> None:
+        """Show a search match in its folder."""
+        self.on_search_escape()
+        if path.is_dir():
+            self.file_list.load_directory(path)
+        else:
+            self.file_list.load_directory(path.parent, select=path.name)
+        self.file_list.setFocus()
 
     def on_search_escape(self) -> None:
         """Handle escape in search bar."""
         self.search_bar.hide_search()
+        self.stop_recursive_search()
         self.file_list.filter_items("")  # Clear filter
 
     def go_up(self) -> None:
@@ -525,6 +1317,40 @@ class MainWindow(QMainWindow):
         self.address_bar.setText(str(path))
         self.up_button.setEnabled(path.parent != path)
 
+    def on_load_started(self, path: Path) -> None:
+        """Show the loading indicator."""
+        self.load_label.setText("Loading...")
+        self.load_progress.show()
+
+    def on_load_progress(self, count: int) -> None:
+        """Update the loading indicator."""
+        self.load_label.setText(f"Loading... {count} items")
+
+    def on_load_finished(self, count: int) -> None:
+        """Hide the loading indicator."""
+        self.load_progress.hide()
+        self.load_label.setText(f"{count} items")
+
+    def on_sizes_finished(self, job: SizeJob) -> None:
+        """Report how long computing folder sizes took."""
+        status_bar = self.statusBar()
+        if status_bar is not None:
+            status_bar.showMessage(
+                f"Sized {len(job.names)} folders ({job.directories} "
+                f"directories) in {job.seconds or 0:.1f} s",
+                10000,
+            )
+
+    def on_filter_changed(self, shown: int, total: int) -> None:
+        """Show how many items the filter lets through."""
+        if shown == total:
+            self.load_label.setText(f"{total} items")
+            return
+        milliseconds = self.file_list.file_model.filter_seconds * 1000
+        self.load_label.setText(
+            f"{shown} of {total} items (filtered in {milliseconds:.0f} ms)"
+        )
+
     def navigate_to(self, path: Path) -> None:
         """Navigate to specified path."""
         if path.exists() and path.is_dir():
@@ -535,42 +1361,9 @@ class MainWindow(QMainWindow):
 
 def main() -> None:
     """Main entry point."""
-    import argparse
-
-    parser = argparse.ArgumentParser(
-        description="Flitz - A modern file explorer"
-    )
-    parser.add_argument(
-        "path",
-        nargs="?",
-        default=".",
-        help="Path to open (default: current directory)",
-    )
-    parser.add_argument(
-        "--version",
-        action="version",
-        version=f"Flitz {__import__('flitz').__version__}",
-    )
-
-    args = parser.parse_args()
-
-    app = QApplication(sys.argv)
-
-    # Set application properties
-    app.setApplicationName("Flitz")
-    app.setApplicationVersion("0.1.0")
-    app.setOrganizationName("Flitz Project")
-
-    # Create main window
-    window = MainWindow()
-
-    # Handle path argument
-    start_path = Path(args.path).resolve()
-    window.navigate_to(start_path)
-
-    window.show()
-
-    sys.exit(app.exec())
+    from .startup import launch
+
+    launch()
 
 
 if __name__ == "__main__":
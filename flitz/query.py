@@ -0,0 +1,259 @@
+"""Attribute queries over directory snapshots.
+
+A query is a list of terms that must all hold, e.g.
+``size>1G mtime<7d ext:log``:
+
+``size``
+    Size of files, compared with ``<``, ``<=``, ``>``, ``>=`` or ``=``
+    against a number of bytes with an optional unit (``K``, ``M``, ``G``,
+    ``T``). Folders never match.
+``mtime``
+    Modification time, compared against an age such as ``30min``,
+    ``12h``, ``7d``, ``2w`` or ``1y`` (``mtime<7d`` means modified within
+    the last seven days) or against a date such as ``2024-01-31``.
+``ext``
+    File extension, or several separated by commas: ``ext:jpg,png``.
+``type``
+    ``dir`` or ``file``.
+``name``
+    Text contained in the name, or a glob pattern.
+
+Any other word is matched against names like ``name``. Terms are negated
+by a leading ``-``, e.g. ``-ext:tmp``.
+
+Queries are compiled once and evaluated column by column: every term
+maps a test implemented in C over one column of the snapshot, and later
+terms only over the rows the earlier ones let through.
+"""
+
+import fnmatch
+import operator
+import re
+import shlex
+import stat
+import time
+from datetime import date, datetime, timedelta
+from itertools import compress
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple
+
+from .file_operations import DirectorySnapshot
+
+# Keys of attribute terms
+ATTRIBUTES = frozenset(("size", "mtime", "ext", "type", "name"))
+
+GLOB_CHARS = frozenset("*?[")
+
+SIZE_UNITS = {
+    "": 1,
+    "b": 1,
+    "k": 1024,
+    "kb": 1024,
+    "m": 1024**2,
+    "mb": 1024**2,
+    "g": 1024**3,
+    "gb": 1024**3,
+    "t": 1024**4,
+    "tb": 1024**4,
+}
+AGE_UNITS = {
+    "s": 1,
+    "min": 60,
+    "h": 3600,
+    "d": 86400,
+    "w": 7 * 86400,
+    "y": 365 * 86400,
+}
+
+_TERM = re.compile(r"(-?)([a-z]+)(<=|>=|<|>|=|:)(.*)$", re.IGNORECASE)
+_AMOUNT = re.compile(r"(\d+(?:\.\d*)?|\.\d+)([a-z]*)$")
+
+# Name of the method of the bound testing ``value <op> bound``
+_REFLECTED = {
+    "<": "__gt__",
+    "<=": "__ge__",
+    ">": "__lt__",
+    ">=": "__le__",
+    "=": "__eq__",
+    ":": "__eq__",
+}
+# Swaps the flags of matching and other rows
+_INVERT = bytes.maketrans(b"\x00\x01", b"\x01\x00")
+# The same comparison with the operands swapped
+_SWAPPED = {"<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+
+class QueryError(ValueError):
+    """Raised for malformed queries."""
+
+
+class Term(NamedTuple):
+    """A condition on one column of a snapshot."""
+
+    # Name of the snapshot attribute holding the column
+    column: str
+    # Whether a cell matches; must return a bool
+    test: Callable[[Any], bool]
+    negate: bool = False
+
+
+def is_query(text: str) -> bool:
+    """Whether ``text`` contains any attribute terms."""
+    for word in text.split():
+        found = _TERM.match(word)
+        if found is not None and found[2].lower() in ATTRIBUTES:
+            return True
+    return False
+
+
+def _compare(op: str, bound: Any) -> Callable[[Any], bool]:
+    """Test of ``value <op> bound`` as a method of ``bound``.
+
+    The values must be of the same type as ``bound``.
+    """
+    test: Callable[[Any], bool] = getattr(bound, _REFLECTED[op])
+    return test
+
+
+def _amount(value: str, units: Dict[str, int], what: str) -> float:
+    found = _AMOUNT.match(value)
+    if found is None or found[2] not in units:
+        raise QueryError(f"Invalid {what}: {value}")
+    return float(found[1]) * units[found[2]]
+
+
+def _size_terms(op: str, value: str) -> List[Term]:
+    size = int(_amount(value, SIZE_UNITS, "size"))
+    return [
+        Term("sizes", _compare(op, size)),
+        Term("modes", stat.S_ISDIR, negate=True),
+    ]
+
+
+def _mtime_terms(op: str, value: str, now: float) -> List[Term]:
+    if _AMOUNT.match(value):
+        if op not in _SWAPPED:
+            raise QueryError(f"Ages can only be compared: {value}")
+        # A smaller age is a later modification time
+        cutoff = now - _amount(value, AGE_UNITS, "age")
+        return [Term("mtimes", _compare(_SWAPPED[op], cutoff))]
+
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        raise QueryError(f"Invalid age or date: {value}") from None
+    start = datetime.combine(day, datetime.min.time()).timestamp()
+    end = datetime.combine(
+        day + timedelta(days=1), datetime.min.time()
+    ).timestamp()
+    if op in ("=", ":"):
+        return [Term("mtimes", lambda mtime: start <= mtime < end)]
+    # The whole day counts as the date
+    compared, bound = {
+        "<": ("<", start),
+        "<=": ("<", end),
+        ">": (">=", end),
+        ">=": (">=", start),
+    }[op]
+    return [Term("mtimes", _compare(compared, bound))]
+
+
+def _name_terms(value: str) -> List[Term]:
+    needle = value.casefold()
+    if GLOB_CHARS.intersection(needle):
+        match = re.compile(fnmatch.translate(needle)).match
+        return [Term("folded_names", lambda name: match(name) is not None)]
+    return [
+        Term("folded_names", operator.methodcaller("__contains__", needle))
+    ]
+
+
+def _ext_terms(value: str) -> List[Term]:
+    suffixes = tuple(
+        "." + ext.lstrip(".") for ext in value.casefold().split(",") if ext
+    )
+    if not suffixes:
+        raise QueryError(f"Invalid extension: {value}")
+    return [Term("folded_names", operator.methodcaller("endswith", suffixes))]
+
+
+def _type_terms(value: str) -> List[Term]:
+    kind = value.lower()
+    if kind in ("d", "dir", "folder"):
+        return [Term("modes", stat.S_ISDIR)]
+    if kind in ("f", "file"):
+        return [Term("modes", stat.S_ISREG)]
+    raise QueryError(f"Unknown type: {value}")
+
+
+def _parse(word: str, now: float) -> List[Term]:
+    found = _TERM.match(word)
+    if found is None or found[2].lower() not in ATTRIBUTES:
+        if word.startswith("-") and len(word) > 1:
+            return [_name_terms(word[1:])[0]._replace(negate=True)]
+        return _name_terms(word)
+    negate, key, op, value = found.groups()
+    key = key.lower()
+    if not value:
+        raise QueryError(f"Missing value: {word}")
+
+    if key == "size":
+        terms = _size_terms(op, value.lower())
+    elif key == "mtime":
+        terms = _mtime_terms(op, value.lower(), now)
+    elif op != ":":
+        raise QueryError(f"{key} can only be matched with ':': {word}")
+    elif key == "ext":
+        terms = _ext_terms(value)
+    elif key == "type":
+        terms = _type_terms(value)
+    else:
+        terms = _name_terms(value)
+    if negate:
+        # Only the first term is the condition, the rest narrow it down
+        terms[0] = terms[0]._replace(negate=True)
+    return terms
+
+
+class Query:
+    """A compiled query, see the module documentation for its syntax."""
+
+    def __init__(self, text: str, now: float) -> None:
+        self.text = text
+        try:
+            words = shlex.split(text)
+        except ValueError:
+            # Unbalanced quotes, e.g. in "don't"
+            words = text.split()
+        self.terms: List[Term] = []
+        for word in words:
+            self.terms.extend(_parse(word, now))
+
+    def rows(self, snapshot: DirectorySnapshot) -> List[int]:
+        """Ascending rows of ``snapshot`` matching the query."""
+        rows: Iterable[int] = range(len(snapshot))
+        for index, term in enumerate(self.terms):
+            column = getattr(snapshot, term.column)
+            # Later terms only look at the rows still matching
+            cells = map(column.__getitem__, rows) if index else column
+            flags = bytes(map(term.test, cells))
+            if term.negate:
+                flags = flags.translate(_INVERT)
+            rows = list(compress(rows, flags))
+            if not rows:
+                break
+        return list(rows)
+
+    def accepts(self, snapshot: DirectorySnapshot, row: int) -> bool:
+        """Whether ``row`` of ``snapshot`` matches the query."""
+        return all(
+            term.test(getattr(snapshot, term.column)[row]) != term.negate
+            for term in self.terms
+        )
+
+
+def compile_query(text: str, now: float = 0.0) -> Query:
+    """Parse ``text`` into a :class:`Query`.
+
+    Ages are relative to ``now``, the current time by default.
+    """
+    return Query(text, now or time.time())
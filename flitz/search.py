@@ -0,0 +1,393 @@
+"""Recursive background search of file names and contents."""
+
+import fnmatch
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    BrokenExecutor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from .file_operations import ContentHit, FileOperations
+from .loader import BATCH_INTERVAL, BATCH_SIZE
+
+if TYPE_CHECKING:
+    from .index import FilenameIndex
+
+# Number of directories scanned concurrently
+SEARCH_WORKERS = 8
+
+GLOB_CHARS = frozenset("*?[")
+
+# Files larger than this are skipped by content searches
+CONTENT_MAX_SIZE = 64 * 1024 * 1024
+# Files and bytes handed to a worker process at once
+CONTENT_BATCH_FILES = 64
+CONTENT_BATCH_BYTES = 16 * 1024 * 1024
+
+
+def compile_pattern(text: str) -> Callable[[str], bool]:
+    """Return a case-insensitive matcher for entry names.
+
+    Text containing glob characters is matched as a glob against the
+    whole name, anything else as a substring.
+    """
+    needle = text.casefold()
+    if GLOB_CHARS.intersection(needle):
+        regex = re.compile(fnmatch.translate(needle))
+        return lambda name: regex.match(name.casefold()) is not None
+    return lambda name: needle in name.casefold()
+
+
+class SearchJob:
+    """A single recursive search, identified by object identity."""
+
+    def __init__(
+        self,
+        root: Path,
+        text: str,
+        show_hidden: bool = False,
+        exclude: Sequence[str] = (),
+    ) -> None:
+        self.root = root
+        self.text = text
+        self.show_hidden = show_hidden
+        self.exclude = list(exclude)
+        self.matches = 0
+        self.directories = 0
+        # Whether the matches come from the file-name index
+        self.indexed = False
+        self.started = time.monotonic()
+        # Seconds until the first match was found
+        self.first_match: Optional[float] = None
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the job has been cancelled."""
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Ask the workers to stop."""
+        self._cancelled.set()
+
+    def excluded(self, name: str) -> bool:
+        """Whether entries called ``name`` are skipped."""
+        if not self.show_hidden and name.startswith("."):
+            return True
+        return any(fnmatch.fnmatchcase(name, p) for p in self.exclude)
+
+
+class RecursiveSearch(QObject):
+    """Search a directory tree in the background and stream the matches.
+
+    Directories are scanned concurrently on a thread pool, in roughly
+    breadth-first order so matches close to the root come first, unless
+    a file-name index covering the tree is given, which is queried on
+    the worker thread instead. Matches are emitted in batches as
+    :class:`Path` lists. Only one search runs at a time: starting a new
+    one cancels the previous one, and results of a cancelled search are
+    never emitted.
+    """
+
+    results_found = pyqtSignal(object, object)
+    search_finished = pyqtSignal(object)
+
+    def __init__(
+        self, parent: Optional[QObject] = None, workers: int = SEARCH_WORKERS
+    ) -> None:
+        super().__init__(parent)
+        self.workers = workers
+        self.current_job: Optional[SearchJob] = None
+
+    def start(
+        self,
+        root: Path,
+        text: str,
+        show_hidden: bool = False,
+        exclude: Sequence[str] = (),
+        index: Optional["FilenameIndex"] = None,
+    ) -> SearchJob:
+        """Cancel any running search and search ``root`` for ``text``.
+
+        With an ``index`` the matches are looked up in it rather than
+        found by walking the tree.
+        """
+        self.cancel()
+        job = SearchJob(root, text, show_hidden, exclude)
+        self.current_job = job
+        if index is None:
+            target: Callable[..., None] = self._run
+            args: Tuple[Any, ...] = (job,)
+        else:
+            job.indexed = True
+            target, args = self._run_index, (job, index)
+        thread = threading.Thread(
+            target=target, args=args, name="flitz-search", daemon=True
+        )
+        thread.start()
+        return job
+
+    def cancel(self) -> None:
+        """Cancel the running search, if any."""
+        if self.current_job is not None:
+            self.current_job.cancel()
+            self.current_job = None
+
+    def is_current(self, job: SearchJob) -> bool:
+        """Check whether ``job`` is still the active search."""
+        return job is self.current_job and not job.cancelled
+
+    def _run(self, job: SearchJob) -> None:
+        matches = compile_pattern(job.text)
+        lock = threading.Lock()
+        batch: List[Path] = []
+
+        def scan(path: Path) -> List[Path]:
+            """Collect matches in ``path`` and return its subdirectories."""
+            subdirectories = []
+            found = []
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        if job.cancelled:
+                            break
+                        name = entry.name
+                        if job.excluded(name):
+                            continue
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                        except OSError:
+                            is_dir = False
+                        if is_dir:
+                            subdirectories.append(path / name)
+                        if matches(name):
+                            found.append(path / name)
+            except OSError:
+                pass
+            if found:
+                with lock:
+                    batch.extend(found)
+            return subdirectories
+
+        last_emit = time.monotonic()
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="flitz-search"
+        ) as pool:
+            pending: Set["Future[List[Path]]"] = {pool.submit(scan, job.root)}
+            while pending and not job.cancelled:
+                done, pending = wait(
+                    pending,
+                    timeout=BATCH_INTERVAL,
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    job.directories += 1
+                    pending.update(
+                        pool.submit(scan, path) for path in future.result()
+                    )
+                now = time.monotonic()
+                with lock:
+                    due = len(batch) >= BATCH_SIZE or (
+                        batch and now - last_emit >= BATCH_INTERVAL
+                    )
+                    # The first matches are handed over right away
+                    if due or (batch and job.first_match is None):
+                        results, batch[:] = batch[:], []
+                    else:
+                        results = []
+                if results:
+                    self._emit(job, results)
+                    last_emit = now
+            if job.cancelled:
+                for future in pending:
+                    future.cancel()
+                return
+        if batch:
+            self._emit(job, batch)
+        self.search_finished.emit(job)
+
+    def _run_index(self, job: SearchJob, index: "FilenameIndex") -> None:
+        for batch in index.search_batches(
+            job.root,
+            job.text,
+            job.show_hidden,
+            job.exclude,
+            cancelled=lambda: job.cancelled,
+        ):
+            if job.cancelled:
+                return
+            self._emit(job, batch)
+        if not job.cancelled:
+            self.search_finished.emit(job)
+
+    def _emit(self, job: SearchJob, results: List[Any]) -> None:
+        if job.first_match is None:
+            job.first_match = time.monotonic() - job.started
+        job.matches += len(results)
+        self.results_found.emit(job, results)
+
+
+def _search_files(
+    paths: List[Path], needle: bytes, max_size: int
+) -> List[ContentHit]:
+    """Search a batch of files; runs in a worker process."""
+    hits = []
+    for path in paths:
+        hits.extend(
+            FileOperations.search_content(path, needle, max_size=max_size)
+        )
+    return hits
+
+
+class ContentSearch(RecursiveSearch):
+    """Search the contents of all files below a directory.
+
+    The tree is walked in a background thread, and its files are
+    searched in batches on a pool of worker processes, so the search is
+    not serialized by the GIL and scales with the number of cores.
+    Matches are streamed as lists of :class:`ContentHit`. Text is
+    matched literally and case-insensitively.
+    """
+
+    def __init__(
+        self,
+        parent: Optional[QObject] = None,
+        workers: Optional[int] = None,
+        max_size: int = CONTENT_MAX_SIZE,
+    ) -> None:
+        super().__init__(parent, workers or os.cpu_count() or 1)
+        self.max_size = max_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # Forking a process with running Qt threads is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def shutdown(self) -> None:
+        """Cancel the running search and stop the worker processes."""
+        self.cancel()
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _iter_files(self, job: SearchJob) -> Iterator[Tuple[Path, int]]:
+        """Walk the tree and yield the files to search with their size."""
+        stack = [job.root]
+        while stack and not job.cancelled:
+            path = stack.pop()
+            job.directories += 1
+            subdirectories = []
+            for entry in FileOperations.iter_entries(path, job.show_hidden):
+                if job.excluded(entry.name):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(path / entry.name)
+                        continue
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    size = entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue
+                if 0 < size <= self.max_size:
+                    yield path / entry.name, size
+            stack.extend(reversed(subdirectories))
+
+    def _run(self, job: SearchJob) -> None:
+        needle = job.text.encode()
+        pending: Set["Future[List[ContentHit]]"] = set()
+        hits: List[ContentHit] = []
+        last_emit = time.monotonic()
+
+        def collect(timeout: Optional[float]) -> None:
+            nonlocal pending, last_emit
+            done, pending = wait(
+                pending, timeout=timeout, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                if not future.cancelled():
+                    hits.extend(future.result())
+            now = time.monotonic()
+            if hits and (
+                len(hits) >= BATCH_SIZE
+                or now - last_emit >= BATCH_INTERVAL
+                or job.first_match is None
+            ):
+                self._emit(job, hits[:])
+                hits.clear()
+                last_emit = now
+
+        try:
+            pool = self._get_pool()
+            batch: List[Path] = []
+            batch_bytes = 0
+            for path, size in self._iter_files(job):
+                batch.append(path)
+                batch_bytes += size
+                # Small batches while workers are idle, so the first hits
+                # arrive early; larger ones once they are all busy
+                if (
+                    len(pending) < self.workers
+                    or len(batch) >= CONTENT_BATCH_FILES
+                    or batch_bytes >= CONTENT_BATCH_BYTES
+                ):
+                    pending.add(
+                        pool.submit(
+                            _search_files, batch, needle, self.max_size
+                        )
+                    )
+                    batch = []
+                    batch_bytes = 0
+                    # Bound the work in flight
+                    while len(pending) >= 2 * self.workers:
+                        collect(BATCH_INTERVAL)
+                    if pending:
+                        collect(0)
+            if batch and not job.cancelled:
+                pending.add(
+                    pool.submit(_search_files, batch, needle, self.max_size)
+                )
+            while pending and not job.cancelled:
+                collect(BATCH_INTERVAL)
+        except BrokenExecutor:
+            # A worker died; start with a fresh pool next time
+            with self._pool_lock:
+                self._pool = None
+        finally:
+            for future in pending:
+                future.cancel()
+        if job.cancelled:
+            return
+        if hits:
+            self._emit(job, hits)
+        self.search_finished.emit(job)
@@ -0,0 +1,294 @@
+"""Recursive folder sizes computed in the background."""
+
+import os
+import stat
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+# Number of directories read concurrently
+SIZE_WORKERS = 8
+# Seconds between reports of finished folders
+SIZE_REPORT_INTERVAL = 0.25
+
+# (device, inode)
+FileKey = Tuple[int, int]
+
+
+class DirectoryUsage:
+    """What one directory contributes to the size of its folders."""
+
+    __slots__ = ("mtime_ns", "files", "links", "subdirectories", "total")
+
+    def __init__(
+        self,
+        mtime_ns: int,
+        files: int,
+        links: Dict[FileKey, int],
+        subdirectories: Tuple[str, ...],
+    ) -> None:
+        self.mtime_ns = mtime_ns
+        # Total size of the files that have a single link
+        self.files = files
+        # Size of each file with several links, counted once per folder
+        self.links = links
+        self.subdirectories = subdirectories
+        # Size of the whole tree as last computed, if known
+        self.total: Optional[int] = None
+
+
+class SizeCache:
+    """LRU cache of directory usage keyed by device and inode.
+
+    Entries are only returned while the directory's mtime is unchanged,
+    so a cached directory is checked with one ``stat`` and its entries
+    are not read again. Changes to files that leave the mtime of their
+    directory alone, such as appending to a file, are not noticed.
+    """
+
+    def __init__(self, max_entries: int = 200_000) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[FileKey, DirectoryUsage]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, st: os.stat_result) -> Optional[DirectoryUsage]:
+        """Return the usage of the directory ``st`` belongs to, if valid."""
+        key = (st.st_dev, st.st_ino)
+        with self._lock:
+            usage = self._entries.get(key)
+            if usage is None:
+                return None
+            if usage.mtime_ns != st.st_mtime_ns:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return usage
+
+    def put(self, st: os.stat_result, usage: DirectoryUsage) -> None:
+        """Store the usage of the directory ``st`` belongs to."""
+        with self._lock:
+            self._entries[(st.st_dev, st.st_ino)] = usage
+            self._entries.move_to_end((st.st_dev, st.st_ino))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+
+
+size_cache = SizeCache()
+
+
+def read_usage(path: Path, st: os.stat_result) -> DirectoryUsage:
+    """Read the entries of the directory ``path`` with stat ``st``."""
+    files = 0
+    links: Dict[FileKey, int] = {}
+    subdirectories = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.name)
+                        continue
+                    entry_stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if entry_stat.st_nlink > 1:
+                    key = (entry_stat.st_dev, entry_stat.st_ino)
+                    links[key] = entry_stat.st_size
+                else:
+                    files += entry_stat.st_size
+    except OSError:
+        pass
+    return DirectoryUsage(st.st_mtime_ns, files, links, tuple(subdirectories))
+
+
+class SizeJob:
+    """Sizes of the folders ``names`` in ``path``, by object identity."""
+
+    def __init__(self, path: Path, names: Iterable[str]) -> None:
+        self.path = path
+        self.names = list(names)
+        # Directories looked at so far
+        self.directories = 0
+        self.started = time.monotonic()
+        self.seconds: Optional[float] = None
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the job has been cancelled."""
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Ask the workers to stop."""
+        self._cancelled.set()
+
+
+class _Folder:
+    """A directory whose tree is being added up."""
+
+    __slots__ = ("path", "parent", "name", "usage", "pending")
+
+    def __init__(
+        self, path: Path, parent: Optional["_Folder"], name: str
+    ) -> None:
+        self.path = path
+        self.parent = parent
+        # Name of the listed folder the directory belongs to
+        self.name = name
+        self.usage: Optional[DirectoryUsage] = None
+        # Subdirectories whose trees are not added up yet
+        self.pending = 0
+
+
+class _Total:
+    """Running size of a tree."""
+
+    __slots__ = ("files", "links")
+
+    def __init__(self) -> None:
+        self.files = 0
+        self.links: Dict[FileKey, int] = {}
+
+    def add(self, files: int, links: Dict[FileKey, int]) -> None:
+        self.files += files
+        self.links.update(links)
+
+    @property
+    def size(self) -> int:
+        return self.files + sum(self.links.values())
+
+
+def compute_sizes(
+    job: SizeJob,
+    report: Callable[[Dict[str, int]], None],
+    cache: SizeCache = size_cache,
+    workers: int = SIZE_WORKERS,
+) -> Dict[str, int]:
+    """Add up the size of the files below each folder of ``job``.
+
+    Directories are read concurrently on a thread pool without following
+    symlinks or leaving the file system of ``job.path``, and files with
+    several hard links are counted once per folder. ``report`` is called
+    from this thread with the sizes of folders as they are finished,
+    starting with the sizes cached from earlier calls, which are then
+    checked. Directories whose mtime did not change since they were last
+    read are taken from ``cache``. Returns all sizes, or what was found
+    until the job was cancelled.
+    """
+    try:
+        device = os.stat(job.path).st_dev
+    except OSError:
+        return {}
+
+    sizes: Dict[str, int] = {}
+    # Last computed sizes, shown until they are confirmed
+    for name in job.names:
+        try:
+            usage = cache.get(os.lstat(job.path / name))
+        except OSError:
+            continue
+        if usage is not None and usage.total is not None:
+            sizes[name] = usage.total
+    if sizes:
+        report(dict(sizes))
+
+    def scan(folder: _Folder) -> _Folder:
+        try:
+            st = os.lstat(folder.path)
+        except OSError:
+            return folder
+        if not stat.S_ISDIR(st.st_mode) or st.st_dev != device:
+            return folder
+        usage = cache.get(st)
+        if usage is None:
+            usage = read_usage(folder.path, st)
+            cache.put(st, usage)
+        folder.usage = usage
+        return folder
+
+    totals: Dict[_Folder, _Total] = {}
+    found: Dict[str, int] = {}
+
+    def finish(folder: _Folder) -> None:
+        """Add up a folder whose subdirectories are all done."""
+        while True:
+            total = totals.pop(folder, None) or _Total()
+            if folder.usage is not None:
+                folder.usage.total = total.size
+            parent = folder.parent
+            if parent is None:
+                if folder.usage is not None:
+                    found[folder.name] = total.size
+                return
+            parent_total = totals.setdefault(parent, _Total())
+            parent_total.add(total.files, total.links)
+            parent.pending -= 1
+            if parent.pending:
+                return
+            folder = parent
+
+    last_report = time.monotonic()
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="flitz-sizes"
+    ) as pool:
+        pending: Dict["Future[_Folder]", _Folder] = {}
+        for name in job.names:
+            folder = _Folder(job.path / name, None, name)
+            pending[pool.submit(scan, folder)] = folder
+        while pending and not job.cancelled:
+            done, _ = wait(
+                pending,
+                timeout=SIZE_REPORT_INTERVAL,
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                folder = pending.pop(future)
+                job.directories += 1
+                usage = folder.usage
+                if usage is not None:
+                    totals.setdefault(folder, _Total()).add(
+                        usage.files, usage.links
+                    )
+                    for name in usage.subdirectories:
+                        child = _Folder(
+                            folder.path / name, folder, folder.name
+                        )
+                        folder.pending += 1
+                        pending[pool.submit(scan, child)] = child
+                if not folder.pending:
+                    finish(folder)
+            now = time.monotonic()
+            if found and (
+                now - last_report >= SIZE_REPORT_INTERVAL or not pending
+            ):
+                changed = {
+                    name: size
+                    for name, size in found.items()
+                    if sizes.get(name) != size
+                }
+                sizes.update(found)
+                found.clear()
+                if changed:
+                    report(changed)
+                last_report = now
+        if job.cancelled:
+            for future in pending:
+                future.cancel()
+    job.seconds = time.monotonic() - job.started
+    return sizes
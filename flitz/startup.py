@@ -0,0 +1,163 @@
+"""Startup pipeline of the file explorer window.
+
+Launching does as little as possible before the first listing is shown:
+the start folder is scanned on a thread while the configuration is read
+and Qt and the window are set up, the configuration is taken from a
+cache unless its YAML files changed, and modules needed only by some
+features are imported when first used. ``--startup-profile`` prints the
+time spent in each phase.
+"""
+
+import argparse
+import os
+import stat
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from .cache import listing_cache
+from .file_operations import DirectorySnapshot
+
+# Longest wait for the scan of the start folder once the window is built,
+# in seconds; slower folders are loaded in batches like any other
+PREFETCH_WAIT = 1.0
+
+
+class StartupProfile:
+    """Durations of the phases of startup."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str) -> None:
+        """End ``phase``, which started at the previous mark."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def report(self, background: Sequence[Tuple[str, float]] = ()) -> str:
+        """Table of the phases, then of work done in the background."""
+        lines = [
+            f"{phase:<24} {seconds * 1000:8.1f} ms"
+            for phase, seconds in self.phases
+        ]
+        lines.append(
+            f"{'total':<24} {(self._last - self.started) * 1000:8.1f} ms"
+        )
+        lines.extend(
+            f"{phase + ' (background)':<24} {seconds * 1000:8.1f} ms"
+            for phase, seconds in background
+        )
+        return "\n".join(lines)
+
+
+class ListingPrefetch:
+    """Scan a folder into the listing cache on a background thread.
+
+    Opening the folder afterwards finds the listing in the cache, as long
+    as the folder did not change in between.
+    """
+
+    def __init__(self, path: Path, show_hidden: bool = False) -> None:
+        self.path = path
+        self.show_hidden = show_hidden
+        # Duration of the scan, once it is done
+        self.seconds: Optional[float] = None
+        self._thread = threading.Thread(
+            target=self._run, name="flitz-prefetch", daemon=True
+        )
+        self._thread.start()
+
+    def wait(self, timeout: float) -> bool:
+        """Wait for the scan to finish; ``False`` on timeout."""
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _run(self) -> None:
+        started = time.perf_counter()
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        if not stat.S_ISDIR(st.st_mode):
+            return
+        snapshot = DirectorySnapshot.scan(self.path, self.show_hidden)
+        listing_cache.put(self.path, self.show_hidden, snapshot, st)
+        self.seconds = time.perf_counter() - started
+
+
+def parse_arguments(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    """Parse the command line of the file explorer."""
+    from . import __version__
+
+    parser = argparse.ArgumentParser(
+        description="Flitz - A modern file explorer"
+    )
+    parser.add_argument(
+        "path",
+        nargs="?",
+        default=".",
+        help="Path to open (default: current directory)",
+    )
+    parser.add_argument(
+        "--startup-profile",
+        action="store_true",
+        help="Print how long each phase of startup takes",
+    )
+    parser.add_argument(
+        "--version",
+        action="version",
+        version=f"Flitz {__version__}",
+    )
+    return parser.parse_args(argv)
+
+
+def launch(argv: Optional[Sequence[str]] = None) -> None:
+    """Open the file explorer window and run the application."""
+    profile = StartupProfile()
+    args = parse_arguments(argv)
+    start_path = Path(args.path).resolve()
+    prefetch = ListingPrefetch(start_path)
+    profile.mark("start scan")
+
+    from .config import Config
+
+    profile.mark("import config")
+    config = Config.load()
+    profile.mark("load config")
+
+    from PyQt6.QtWidgets import QApplication
+
+    from .main import FirstPaint, MainWindow
+
+    profile.mark("import Qt and GUI")
+    app = QApplication(sys.argv)
+    app.setApplicationName("Flitz")
+    app.setApplicationVersion("0.1.0")
+    app.setOrganizationName("Flitz Project")
+    profile.mark("create application")
+
+    window = MainWindow(config)
+    profile.mark("build window")
+    prefetch.wait(PREFETCH_WAIT)
+    profile.mark("wait for scan")
+    window.navigate_to(start_path)
+    window.show()
+    profile.mark("show window")
+
+    if args.startup_profile:
+
+        def painted() -> None:
+            profile.mark("first listing painted")
+            background = []
+            if prefetch.seconds is not None:
+                background.append(("scan", prefetch.seconds))
+            print(profile.report(background), file=sys.stderr)
+
+        FirstPaint(window.file_list, painted)
+
+    sys.exit(app.exec())
@@ -0,0 +1,287 @@
+"""Timing spans of the hot paths, exported as Chrome trace events.
+
+Tracing is off unless ``FLITZ_TRACE`` or the ``trace_file`` setting names
+a file. The spans recorded until exit are then written to that file in
+the trace event format, which ``chrome://tracing`` and Perfetto open.
+While tracing is off, :meth:`Tracer.span` returns a shared object that
+does nothing, so instrumented code costs one attribute check.
+
+``FLITZ_PROFILE`` or the ``profile_file`` setting additionally runs the
+next navigation of the file list under :mod:`cProfile` and writes the
+statistics to that file, to be read with :mod:`pstats` or snakeviz.
+"""
+
+import atexit
+import itertools
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from types import TracebackType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    ContextManager,
+    Dict,
+    List,
+    Optional,
+    Type,
+)
+
+if TYPE_CHECKING:
+    import cProfile
+
+TRACE_ENV = "FLITZ_TRACE"
+PROFILE_ENV = "FLITZ_PROFILE"
+
+# Events kept at most; later ones are counted but dropped
+MAX_TRACE_EVENTS = 1_000_000
+
+
+class _NoSpan:
+    """Span that records nothing, used while tracing is off."""
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Span:
+    """A named interval on the current thread."""
+
+    def __init__(
+        self, tracer: "Tracer", name: str, args: Dict[str, Any]
+    ) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.started = 0.0
+
+    def __enter__(self) -> "Span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.complete(self.name, self.started, **self.args)
+
+
+class Tracer:
+    """Collect timing spans from all threads.
+
+    Spans are recorded as complete events of the thread they ran on.
+    Intervals that start and end in different calls, such as loading a
+    folder, are asynchronous events from :meth:`begin` to :meth:`end`
+    and get a track of their own.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.path: Optional[Path] = None
+        self.dropped = 0
+        self._events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, str] = {}
+        self._ids = itertools.count(1)
+        # Open asynchronous intervals: id -> name
+        self._open: Dict[int, str] = {}
+        self._origin = time.perf_counter()
+        self._exit_hook = False
+        self._profile_path: Optional[Path] = None
+        self._profiler: Optional["cProfile.Profile"] = None
+
+    def enable(self, path: Optional[Path] = None) -> None:
+        """Start recording; the trace is written to ``path`` at exit."""
+        self.path = path
+        self.enabled = True
+        if path is not None and not self._exit_hook:
+            atexit.register(self._save_at_exit)
+            self._exit_hook = True
+
+    def disable(self) -> None:
+        """Stop recording and write what was recorded."""
+        if self.enabled and self.path is not None:
+            self.save(self.path)
+        self.enabled = False
+        self.path = None
+
+    def enable_from_environment(self) -> None:
+        """Apply ``FLITZ_TRACE`` and ``FLITZ_PROFILE``."""
+        trace = os.environ.get(TRACE_ENV)
+        if trace:
+            self.enable(Path(trace).expanduser())
+        profile = os.environ.get(PROFILE_ENV)
+        if profile:
+            self.profile_next(Path(profile).expanduser())
+
+    def configure(
+        self, trace_file: Optional[str], profile_file: Optional[str]
+    ) -> None:
+        """Apply the tracing settings, unless the environment sets them."""
+        if not os.environ.get(TRACE_ENV):
+            if trace_file:
+                self.enable(Path(trace_file).expanduser())
+            else:
+                self.disable()
+        if not os.environ.get(PROFILE_ENV) and profile_file:
+            self.profile_next(Path(profile_file).expanduser())
+
+    def span(self, name: str, **args: Any) -> ContextManager[Optional[Span]]:
+        """Context manager timing the code run in it as ``name``.
+
+        ``args`` are shown with the span; they are converted to text only
+        when the trace is written.
+        """
+        if not self.enabled:
+            return _NO_SPAN
+        return Span(self, name, args)
+
+    def complete(self, name: str, started: float, **args: Any) -> None:
+        """Record ``name`` from ``started``, a perf_counter time, to now."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._record(
+            {
+                "name": name,
+                "ph": "X",
+                "ts": self._micros(started),
+                "dur": (now - started) * 1e6,
+                "args": args,
+            }
+        )
+
+    def begin(self, name: str, **args: Any) -> int:
+        """Start an interval ended by :meth:`end`; 0 while tracing is off."""
+        if not self.enabled:
+            return 0
+        span_id = next(self._ids)
+        self._open[span_id] = name
+        self._record(self._async_event(name, "b", span_id, args))
+        return span_id
+
+    def end(self, span_id: int, **args: Any) -> None:
+        """End the interval started as ``span_id``."""
+        name = self._open.pop(span_id, None)
+        if name is not None and self.enabled:
+            self._record(self._async_event(name, "e", span_id, args))
+
+    def events(self) -> List[Dict[str, Any]]:
+        """Recorded events in the trace event format."""
+        pid = os.getpid()
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for tid, name in list(self._threads.items())
+        ]
+        events = []
+        for event in list(self._events):
+            event = dict(event, pid=pid)
+            event["args"] = {
+                key: (
+                    value
+                    if isinstance(value, (bool, int, float, str))
+                    else str(value)
+                )
+                for key, value in event["args"].items()
+            }
+            events.append(event)
+        return metadata + events
+
+    def save(self, path: Path) -> None:
+        """Write the trace to ``path`` as trace event JSON."""
+        trace = {
+            "traceEvents": self.events(),
+            "displayTimeUnit": "ms",
+            "otherData": {"dropped_events": self.dropped},
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(trace, f)
+
+    def clear(self) -> None:
+        """Forget the recorded events."""
+        self._events = []
+        self._open.clear()
+        self.dropped = 0
+
+    def profile_next(self, path: Path) -> None:
+        """Profile the next navigation and write the statistics to ``path``.
+
+        Only the thread that navigates, i.e. the GUI thread, is profiled.
+        """
+        self._profile_path = path
+
+    def start_profile(self) -> None:
+        """Start profiling if a navigation profile was asked for."""
+        if self._profile_path is None or self._profiler is not None:
+            return
+        import cProfile
+
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+
+    def stop_profile(self) -> None:
+        """Stop profiling and write the statistics, once."""
+        profiler, path = self._profiler, self._profile_path
+        if profiler is None or path is None:
+            return
+        profiler.disable()
+        self._profiler = self._profile_path = None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(path))
+
+    def _micros(self, seconds: float) -> float:
+        return (seconds - self._origin) * 1e6
+
+    def _async_event(
+        self, name: str, phase: str, span_id: int, args: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        return {
+            "name": name,
+            "cat": "async",
+            "ph": phase,
+            "id": span_id,
+            "ts": self._micros(time.perf_counter()),
+            "args": args,
+        }
+
+    def _record(self, event: Dict[str, Any]) -> None:
+        if len(self._events) >= MAX_TRACE_EVENTS:
+            self.dropped += 1
+            return
+        thread = threading.current_thread()
+        tid = thread.ident or 0
+        if tid not in self._threads:
+            self._threads[tid] = thread.name
+        event["tid"] = tid
+        # Appending to a list is atomic, so threads need no lock
+        self._events.append(event)
+
+    def _save_at_exit(self) -> None:
+        if self.enabled and self.path is not None:
+            self.save(self.path)
+
+
+tracer = Tracer()
@@ -0,0 +1,716 @@
+"""Background copy, move and delete jobs."""
+
+import collections
+import errno
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from pathlib import Path
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from . import fastcopy
+
+# Time window the transfer rate is averaged over, in seconds
+RATE_WINDOW = 3.0
+
+# Name prefix of the hidden directories items are moved into for deletion
+STAGING_PREFIX = ".flitz-delete-"
+
+# Whether trees can be deleted relative to directory descriptors
+_FD_WALK = os.unlink in os.supports_dir_fd and os.scandir in os.supports_fd
+
+# Staging directories of jobs of this process that are not done yet
+_active_staging: Set[Path] = set()
+_staging_lock = threading.Lock()
+
+
+def _process_alive(pid: int) -> bool:
+    if os.name != "posix":
+        # Cannot tell without side effects; assume it still runs
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists, but belongs to another user
+        return True
+    return True
+
+
+def leftover_staging(parent: Path) -> List[Path]:
+    """Staging directories in ``parent`` left behind by crashed deletes.
+
+    These are the ones owned by the current user whose process is gone,
+    or that belong to this process but to no running job. Directories
+    named without a process ID are from older versions and left over,
+    too.
+    """
+    uid = getattr(os, "getuid", lambda: None)()
+    leftovers = []
+    try:
+        with os.scandir(parent) as it:
+            entries = [
+                entry for entry in it if entry.name.startswith(STAGING_PREFIX)
+            ]
+    except OSError:
+        return []
+    for entry in entries:
+        try:
+            st = entry.stat(follow_symlinks=False)
+        except OSError:
+            continue
+        if not stat.S_ISDIR(st.st_mode):
+            continue
+        if uid is not None and st.st_uid != uid:
+            continue
+        path = Path(entry.path)
+        pid = entry.name[len(STAGING_PREFIX) :].split("-", 1)[0]
+        if pid.isdigit():
+            if int(pid) != os.getpid():
+                if _process_alive(int(pid)):
+                    continue
+            else:
+                with _staging_lock:
+                    if path in _active_staging:
+                        continue
+        leftovers.append(path)
+    return leftovers
+
+
+class TransferCancelled(Exception):
+    """Raised inside a job's workers once the job has been cancelled."""
+
+
+class TransferProgress(NamedTuple):
+    """Point-in-time progress of a transfer job."""
+
+    state: str
+    # Logical bytes done, including holes skipped in sparse files
+    done_bytes: int
+    # File data actually written
+    physical_bytes: int
+    total_bytes: int
+    done_files: int
+    total_files: int
+    # Whether the source trees have been walked completely, i.e. whether
+    # the totals are final
+    scanned: bool
+    bytes_per_second: float
+    eta: Optional[float]
+    # (path, bytes done, file size) of the files currently being copied
+    active_files: List[Tuple[Path, int, int]]
+    # Number of files copied with each fastcopy strategy, plus "symlink"
+    # and "hardlink" for recreated links
+    strategies: Dict[str, int]
+
+
+class TransferJob:
+    """Copy or move a list of paths into a destination directory.
+
+    A job walks its sources and copies their files on a shared worker
+    pool, so metadata work such as walking and creating directories
+    overlaps with copying data. It can be paused, resumed and cancelled
+    from any thread.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    PAUSED = "paused"
+    CANCELLED = "cancelled"
+    FINISHED = "finished"
+
+    OPERATIONS: Tuple[str, ...] = ("copy", "move")
+
+    def __init__(
+        self, operation: str, sources: List[Path], destination: Path
+    ) -> None:
+        if operation not in self.OPERATIONS:
+            raise ValueError(f"Unknown transfer operation: {operation}")
+        self.operation = operation
+        self.sources = list(sources)
+        self.destination = destination
+        self.state = self.PENDING
+        # Sources that were transferred completely, and failures
+        self.completed: List[Path] = []
+        self.errors: List[Tuple[Path, str]] = []
+
+        self._lock = threading.Lock()
+        self._unpaused = threading.Event()
+        self._unpaused.set()
+        self._cancelled = threading.Event()
+        self._done_bytes = 0
+        self._physical_bytes = 0
+        self._total_bytes = 0
+        self._done_files = 0
+        self._total_files = 0
+        self._scanned = False
+        self._started = False
+        self._active: Dict[Path, Tuple[int, int]] = {}
+        self._strategies: Dict[str, int] = collections.Counter()
+        # First copy of every multiply linked source inode
+        self._links: Dict[Tuple[int, int], Path] = {}
+        self._samples: Deque[Tuple[float, int]] = collections.deque()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the job has been cancelled."""
+        return self._cancelled.is_set()
+
+    def pause(self) -> None:
+        """Pause copying after the current chunks.
+
+        Pausing a queued job holds it back once its turn comes.
+        """
+        if self.state in (self.PENDING, self.RUNNING):
+            self._unpaused.clear()
+            self.state = self.PAUSED
+
+    def resume(self) -> None:
+        """Continue a paused job."""
+        if self.state == self.PAUSED:
+            self.state = self.RUNNING if self._started else self.PENDING
+            self._unpaused.set()
+
+    def cancel(self) -> None:
+        """Stop the job as soon as possible."""
+        self._cancelled.set()
+        # Wake paused workers so they notice the cancellation
+        self._unpaused.set()
+        if self.state in (self.PENDING, self.PAUSED):
+            self.state = self.CANCELLED
+
+    def stop(self) -> None:
+        """Cancel the job without undoing it, e.g. because the app quits."""
+        self.cancel()
+
+    def checkpoint(self) -> None:
+        """Block while paused and raise once cancelled."""
+        self._unpaused.wait()
+        if self._cancelled.is_set():
+            raise TransferCancelled()
+
+    def progress(self) -> TransferProgress:
+        """Current progress, transfer rate and estimated time left."""
+        now = time.monotonic()
+        with self._lock:
+            done = self._done_bytes
+            samples = self._samples
+            samples.append((now, done))
+            while len(samples) > 2 and now - samples[0][0] > RATE_WINDOW:
+                samples.popleft()
+            elapsed = now - samples[0][0]
+            rate = (done - samples[0][1]) / elapsed if elapsed > 0 else 0.0
+            remaining = self._total_bytes - done
+            eta = remaining / rate if rate > 0 and self._scanned else None
+            return TransferProgress(
+                self.state,
+                done,
+                self._physical_bytes,
+                self._total_bytes,
+                self._done_files,
+                self._total_files,
+                self._scanned,
+                rate,
+                eta,
+                [
+                    (path, file_done, size)
+                    for path, (file_done, size) in self._active.items()
+                ],
+                dict(self._strategies),
+            )
+
+    def run(self, pool: ThreadPoolExecutor) -> None:
+        """Run the job, copying file data on ``pool``."""
+        if self.cancelled:
+            self.state = self.CANCELLED
+            return
+        self._started = True
+        if self.state != self.PAUSED:
+            self.state = self.RUNNING
+        for src in self.sources:
+            try:
+                self.checkpoint()
+                self._process(src, pool)
+            except TransferCancelled:
+                break
+            except (OSError, shutil.Error) as e:
+                self._fail(src, e)
+            else:
+                self.completed.append(src)
+        with self._lock:
+            self._scanned = True
+        self.state = self.CANCELLED if self.cancelled else self.FINISHED
+
+    def _process(self, src: Path, pool: ThreadPoolExecutor) -> None:
+        self._transfer(src, self.destination / src.name, pool)
+
+    def _transfer(
+        self, src: Path, dst: Path, pool: ThreadPoolExecutor
+    ) -> None:
+        if dst.exists() or dst.is_symlink():
+            raise FileExistsError(f"Destination exists: {dst}")
+        if (
+            src.is_dir()
+            and not src.is_symlink()
+            and dst.resolve().is_relative_to(src.resolve())
+        ):
+            raise shutil.Error(
+                f"Cannot {self.operation} a folder into itself: {dst}"
+            )
+        if self.operation == "move":
+            try:
+                os.rename(src, dst)
+                self._count_renamed()
+                return
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                # Different file system; copy and delete the source below
+
+        if src.is_dir() and not src.is_symlink():
+            self._copy_tree(src, dst, pool)
+        else:
+            link = self._add_file(src, dst)
+            if link is None:
+                pool.submit(self._copy_file, src, dst).result()
+            else:
+                self._link(link, dst)
+
+        if self.operation == "move":
+            self.checkpoint()
+            if src.is_dir() and not src.is_symlink():
+                shutil.rmtree(src)
+            else:
+                src.unlink()
+
+    def _copy_tree(
+        self, src: Path, dst: Path, pool: ThreadPoolExecutor
+    ) -> None:
+        """Copy a tree, creating directories while its files are copied."""
+        futures: List["Future[None]"] = []
+        directories = []
+        links = []
+        try:
+            for root, dirnames, filenames in os.walk(src):
+                self.checkpoint()
+                root_path = Path(root)
+                target = dst / root_path.relative_to(src)
+                target.mkdir()
+                directories.append((root_path, target))
+                # Symlinks to directories are copied as links
+                for name in list(dirnames):
+                    if (root_path / name).is_symlink():
+                        dirnames.remove(name)
+                        filenames.append(name)
+                for name in filenames:
+                    link = self._add_file(root_path / name, target / name)
+                    if link is None:
+                        futures.append(
+                            pool.submit(
+                                self._copy_file,
+                                root_path / name,
+                                target / name,
+                            )
+                        )
+                    else:
+                        links.append((link, target / name))
+        finally:
+            # Never leave workers writing into the tree behind
+            wait(futures)
+
+        for future in futures:
+            future.result()
+        # Hard links are made once the files they point to are complete
+        for link, path in links:
+            self.checkpoint()
+            self._link(link, path)
+        # Directory times are restored once their contents are written
+        for source_dir, target_dir in reversed(directories):
+            shutil.copystat(source_dir, target_dir)
+
+    def _copy_file(self, src: Path, dst: Path) -> None:
+        """Copy one file in chunks, reporting progress."""
+        self.checkpoint()
+        if src.is_symlink():
+            os.symlink(os.readlink(src), dst)
+            self._file_done("symlink")
+            return
+
+        size = self._file_size(src)
+        with self._lock:
+            self._active[src] = (0, size)
+        copied = 0
+
+        def advance(count: int) -> None:
+            nonlocal copied
+            copied += count
+            self._advance(src, count, copied, size)
+
+        try:
+            result = fastcopy.copy_file(
+                src,
+                dst,
+                progress=advance,
+                checkpoint=self.checkpoint,
+                exclusive=True,
+            )
+        except TransferCancelled:
+            dst.unlink(missing_ok=True)
+            raise
+        finally:
+            with self._lock:
+                self._active.pop(src, None)
+        with self._lock:
+            self._physical_bytes += result.physical_bytes
+        self._file_done(result.strategy)
+
+    def _link(self, target: Path, path: Path) -> None:
+        os.link(target, path)
+        self._file_done("hardlink")
+
+    @staticmethod
+    def _file_size(path: Path) -> int:
+        try:
+            return path.lstat().st_size
+        except OSError:
+            return 0
+
+    def _add_file(self, src: Path, dst: Path) -> Optional[Path]:
+        """Count a file to copy to ``dst``.
+
+        Returns the earlier copy to hard link ``dst`` to instead if ``src``
+        is another link to an inode that has been copied already.
+        """
+        try:
+            st = src.lstat()
+        except OSError:
+            st = None
+        with self._lock:
+            self._total_files += 1
+            if st is None:
+                return None
+            if st.st_nlink > 1 and not stat.S_ISLNK(st.st_mode):
+                key = (st.st_dev, st.st_ino)
+                link = self._links.get(key)
+                if link is not None:
+                    return link
+                self._links[key] = dst
+            self._total_bytes += st.st_size
+            return None
+
+    def _count_renamed(self) -> None:
+        with self._lock:
+            self._total_files += 1
+            self._done_files += 1
+
+    def _advance(self, path: Path, delta: int, done: int, size: int) -> None:
+        with self._lock:
+            self._done_bytes += delta
+            self._active[path] = (done, size)
+
+    def _file_done(self, strategy: str) -> None:
+        with self._lock:
+            self._done_files += 1
+            self._strategies[strategy] += 1
+
+    def _fail(self, src: Path, error: BaseException) -> None:
+        with self._lock:
+            self.errors.append((src, str(error)))
+
+
+class DeleteJob(TransferJob):
+    """Delete paths in the background.
+
+    Jobs created with :meth:`stage` first rename the paths into a hidden
+    staging directory next to them, which takes effect immediately. The
+    staged trees are then removed on the worker pool, one task per
+    directory, unlinking entries relative to the directory's descriptor.
+    Paths that cannot be staged, such as mount points, are deleted in
+    place. Cancelling the job moves what is left of staged paths back,
+    while stopping it leaves them staged. Staging directories that
+    crashed or stopped jobs left in the same folders are removed as well,
+    once the paths are deleted.
+    """
+
+    OPERATIONS = ("delete",)
+
+    def __init__(
+        self,
+        sources: List[Path],
+        staged: Optional[Dict[Path, Path]] = None,
+        leftovers: Iterable[Path] = (),
+    ) -> None:
+        super().__init__("delete", sources, sources[0].parent)
+        # Original path -> staged path
+        self.staged = dict(staged or {})
+        self.leftovers = list(leftovers)
+        # Whether cancelling moves staged paths back
+        self._restore = True
+
+    @classmethod
+    def stage(cls, sources: Iterable[Path]) -> "DeleteJob":
+        """Move ``sources`` out of sight and return a job deleting them."""
+        sources = list(sources)
+        leftovers = [
+            path
+            for parent in dict.fromkeys(src.parent for src in sources)
+            for path in leftover_staging(parent)
+        ]
+        staged = {}
+        staging_dirs: Dict[Path, Path] = {}
+        for src in sources:
+            staging = staging_dirs.get(src.parent)
+            try:
+                if staging is None:
+                    staging = Path(
+                        tempfile.mkdtemp(
+                            prefix=f"{STAGING_PREFIX}{os.getpid()}-",
+                            dir=src.parent,
+                        )
+                    )
+                    with _staging_lock:
+                        _active_staging.add(staging)
+                    staging_dirs[src.parent] = staging
+                os.rename(src, staging / src.name)
+            except OSError:
+                # Deleted in place by the job
+                continue
+            staged[src] = staging / src.name
+        for staging in staging_dirs.values():
+            if not any(path.parent == staging for path in staged.values()):
+                staging.rmdir()
+                with _staging_lock:
+                    _active_staging.discard(staging)
+        return cls(sources, staged, leftovers)
+
+    def run(self, pool: ThreadPoolExecutor) -> None:
+        """Run the job, deleting directories in parallel on ``pool``."""
+        try:
+            super().run(pool)
+        finally:
+            self._unstage()
+        for path in self.leftovers:
+            if self.cancelled:
+                break
+            try:
+                self._delete_tree(path, pool)
+            except (OSError, TransferCancelled):
+                # Tried again on the next delete in this folder
+                pass
+
+    def stop(self) -> None:
+        """Cancel the job, leaving what is left of staged paths staged."""
+        self._restore = False
+        super().stop()
+
+    def _process(self, src: Path, pool: ThreadPoolExecutor) -> None:
+        path = self.staged.get(src, src)
+        if stat.S_ISDIR(path.lstat().st_mode):
+            self._delete_tree(path, pool)
+        else:
+            self._add_total(1)
+            path.unlink()
+            self._removed()
+
+    def _delete_tree(self, root: Path, pool: ThreadPoolExecutor) -> None:
+        """Delete a tree, emptying its directories in parallel."""
+        if not _FD_WALK:
+            self._delete_walk(root)
+            return
+
+        self._add_total(1)
+        # Parents always come before their subdirectories
+        directories = [root]
+        pending: Set["Future[List[Path]]"] = {
+            pool.submit(self._empty_directory, root)
+        }
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for subdirectory in future.result():
+                        directories.append(subdirectory)
+                        pending.add(
+                            pool.submit(self._empty_directory, subdirectory)
+                        )
+        finally:
+            # Never leave workers deleting in the tree behind
+            wait(pending)
+
+        for directory in reversed(directories):
+            self.checkpoint()
+            os.rmdir(directory)
+            self._removed()
+
+    def _delete_walk(self, root: Path) -> None:
+        """Delete a tree by path, deepest directories first."""
+        for directory, dirnames, filenames in os.walk(root, topdown=False):
+            # Symlinks to directories are listed, but not walked into
+            names = filenames + [
+                name
+                for name in dirnames
+                if os.path.islink(os.path.join(directory, name))
+            ]
+            self._add_total(len(names) + 1)
+            for name in names:
+                self.checkpoint()
+                os.unlink(os.path.join(directory, name))
+                self._removed()
+            self.checkpoint()
+            os.rmdir(directory)
+            self._removed()
+
+    def _empty_directory(self, path: Path) -> List[Path]:
+        """Unlink all non-directories in ``path`` and return its subdirs."""
+        self.checkpoint()
+        subdirectories = []
+        flags = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0)
+        fd = os.open(path, flags | getattr(os, "O_NOFOLLOW", 0))
+        try:
+            with os.scandir(fd) as it:
+                entries = list(it)
+            self._add_total(len(entries))
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(path / entry.name)
+                    continue
+                self.checkpoint()
+                os.unlink(entry.name, dir_fd=fd)
+                self._removed()
+        finally:
+            os.close(fd)
+        return subdirectories
+
+    def _add_total(self, files: int) -> None:
+        with self._lock:
+            self._total_files += files
+
+    def _removed(self) -> None:
+        with self._lock:
+            self._done_files += 1
+
+    def _unstage(self) -> None:
+        """Restore what is left of cancelled paths and drop staging dirs."""
+        for src, path in self.staged.items():
+            if self.cancelled and self._restore and os.path.lexists(path):
+                if not os.path.lexists(src):
+                    os.rename(path, src)
+        for staging in {path.parent for path in self.staged.values()}:
+            try:
+                staging.rmdir()
+            except OSError:
+                pass
+            with _staging_lock:
+                _active_staging.discard(staging)
+
+
+class TransferQueue:
+    """Run transfer jobs one after another in the background.
+
+    Jobs are executed in submission order by a single scheduler thread,
+    while the files of the running job are copied on a worker pool.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        on_finished: Optional[Callable[[TransferJob], None]] = None,
+    ) -> None:
+        self.on_finished = on_finished
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="flitz-transfer"
+        )
+        self._jobs: Deque[TransferJob] = collections.deque()
+        self._current: Optional[TransferJob] = None
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="flitz-transfers", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, job: TransferJob) -> TransferJob:
+        """Queue ``job`` and return it."""
+        with self._condition:
+            self._jobs.append(job)
+            self._condition.notify()
+        return job
+
+    def jobs(self) -> List[TransferJob]:
+        """The running job followed by the queued ones."""
+        with self._condition:
+            current = [self._current] if self._current is not None else []
+            return current + list(self._jobs)
+
+    def cancel_all(self) -> None:
+        """Cancel the running and all queued jobs."""
+        for job in self.jobs():
+            job.cancel()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until all jobs are done; ``False`` on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._jobs or self._current is not None:
+                remaining = (
+                    None if deadline is None else deadline - time.monotonic()
+                )
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def shutdown(self) -> None:
+        """Stop all jobs and the background threads.
+
+        Deletes are not undone; what they staged is removed by the next
+        delete in the same folder.
+        """
+        for job in self.jobs():
+            job.stop()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        # Let jobs that never started clean up after themselves
+        for job in self._jobs:
+            job.run(self._pool)
+        self._jobs.clear()
+        self._pool.shutdown(wait=True)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._jobs and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                job = self._current = self._jobs.popleft()
+            try:
+                job.run(self._pool)
+            finally:
+                with self._condition:
+                    self._current = None
+                    self._condition.notify_all()
+                if self.on_finished is not None:
+                    self.on_finished(job)
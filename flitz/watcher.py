@@ -0,0 +1,250 @@
+"""Watching the current directory for external changes."""
+
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+from PyQt6.QtCore import QObject, QSocketNotifier, QTimer, pyqtSignal
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Changes are collected for this long before they are applied
+COALESCE_INTERVAL_MS = 100
+# Interval of the mtime polling fallback
+POLL_INTERVAL_MS = 1000
+
+
+class Inotify:
+    """Minimal ctypes wrapper around the Linux inotify API."""
+
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    @staticmethod
+    def available() -> bool:
+        """Check if inotify can be used on this platform."""
+        return sys.platform.startswith("linux")
+
+    def add_watch(self, path: Path, mask: int = WATCH_MASK) -> int:
+        """Watch ``path`` and return the watch descriptor."""
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(path))
+        return int(wd)
+
+    def rm_watch(self, wd: int) -> None:
+        """Stop watching a watch descriptor."""
+        self._rm_watch(self.fd, wd)
+
+    def read_events(self) -> List[Tuple[int, int, str]]:
+        """Read all pending events as ``(wd, mask, name)`` tuples."""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(
+                    data, offset
+                )
+                offset += _EVENT_HEADER.size
+                raw_name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                events.append((wd, mask, os.fsdecode(raw_name)))
+        return events
+
+    def close(self) -> None:
+        """Close the inotify file descriptor."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class DirectoryWatcher(QObject):
+    """Report changed entries of one directory.
+
+    Uses inotify on Linux and falls back to polling the directory's mtime
+    elsewhere or when inotify is unavailable. Events are coalesced and
+    emitted as sets of entry names; ``None`` means the changes are unknown
+    and the directory has to be re-read. Each emission also carries the
+    directory's stat result from before the changes were collected, which
+    is what a cache of the patched listing must be validated against.
+    """
+
+    entries_changed = pyqtSignal(Path, object, object)
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self.path: Optional[Path] = None
+        self._pending: Set[str] = set()
+        self._overflow = False
+        self._wd: Optional[int] = None
+        self._inotify: Optional[Inotify] = None
+        self._notifier: Optional[QSocketNotifier] = None
+
+        # Polling fallback state
+        self._mtime_ns = 0
+        self._names: Set[str] = set()
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(COALESCE_INTERVAL_MS)
+        self._flush_timer.timeout.connect(self._flush)
+
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(POLL_INTERVAL_MS)
+        self._poll_timer.timeout.connect(self._poll)
+
+        if Inotify.available():
+            try:
+                self._inotify = Inotify()
+            except (OSError, AttributeError):
+                self._inotify = None
+        if self._inotify is not None:
+            self._notifier = QSocketNotifier(
+                self._inotify.fd, QSocketNotifier.Type.Read, self
+            )
+            self._notifier.activated.connect(self._read_events)
+
+    @property
+    def uses_inotify(self) -> bool:
+        """Whether changes are reported by inotify rather than polling."""
+        return self._wd is not None
+
+    def watch(self, path: Path) -> None:
+        """Watch ``path`` instead of the previously watched directory."""
+        self.unwatch()
+        self.path = path
+        if self._inotify is not None:
+            try:
+                self._wd = self._inotify.add_watch(path)
+                return
+            except OSError:
+                self._wd = None
+
+        try:
+            self._mtime_ns = os.stat(path).st_mtime_ns
+            self._names = set(os.listdir(path))
+        except (OSError, PermissionError):
+            self._names = set()
+        self._poll_timer.start()
+
+    def unwatch(self) -> None:
+        """Stop watching."""
+        if self._inotify is not None and self._wd is not None:
+            self._inotify.rm_watch(self._wd)
+            self._inotify.read_events()
+        self._wd = None
+        self.path = None
+        self._pending.clear()
+        self._overflow = False
+        self._flush_timer.stop()
+        self._poll_timer.stop()
+
+    def _read_events(self) -> None:
+        if self._inotify is None:
+            return
+        for wd, mask, name in self._inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                self._overflow = True
+            elif wd != self._wd or mask & IN_IGNORED:
+                continue
+            elif name:
+                self._pending.add(name)
+        if (self._pending or self._overflow) and not (
+            self._flush_timer.isActive()
+        ):
+            # Not restarted on later events, so a steady stream of changes
+            # is still applied every interval.
+            self._flush_timer.start()
+
+    def _flush(self) -> None:
+        if self.path is None:
+            return
+        try:
+            st: Optional[os.stat_result] = os.stat(self.path)
+        except (OSError, PermissionError):
+            st = None
+        # Pick up anything that happened up to the stat above
+        self._read_events()
+        self._flush_timer.stop()
+        names: Optional[Set[str]] = None if self._overflow else self._pending
+        self._pending = set()
+        self._overflow = False
+        if names is None or names:
+            self.entries_changed.emit(self.path, names, st)
+
+    def _poll(self) -> None:
+        if self.path is None:
+            return
+        try:
+            st = os.stat(self.path)
+            if st.st_mtime_ns == self._mtime_ns:
+                return
+            names = set(os.listdir(self.path))
+        except (OSError, PermissionError):
+            return
+        self._mtime_ns = st.st_mtime_ns
+        # The mtime only reveals added, removed and renamed entries
+        changed = names ^ self._names
+        self._names = names
+        if changed:
+            self.entries_changed.emit(self.path, changed, st)
+
+    def close(self) -> None:
+        """Stop watching and release the inotify descriptor."""
+        self.unwatch()
+        if self._notifier is not None:
+            self._notifier.setEnabled(False)
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
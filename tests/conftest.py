@@ -1,10 +1,14 @@
 """Test fixtures for Flitz tests."""
 
+import os
 import tempfile
 from pathlib import Path
 
 import pytest
 
+# Run Qt tests without a display server.
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
 
 @pytest.fixture
 def temp_dir():
@@ -0,0 +1,98 @@
+"""Tests for the benchmark suite."""
+
+import json
+import threading
+
+from flitz.bench import bench_tree, compare_results, main, make_tree
+
+
+def test_make_tree(temp_dir):
+    """Test creating wide and deep synthetic trees."""
+    folders = make_tree(temp_dir / "wide", 25, "wide", 10)
+    assert folders == [temp_dir / "wide"]
+    files = list(folders[0].iterdir())
+    assert len(files) == 25
+    assert all(path.stat().st_size == 10 for path in files)
+
+    folders = make_tree(temp_dir / "deep", 100, "deep", 0)
+    assert len(folders) > 2
+    entries = [path for folder in folders for path in folder.iterdir()]
+    assert len(entries) == 100
+    assert (
+        max(len(folder.parts) for folder in folders) > len(temp_dir.parts) + 2
+    )
+
+
+def test_bench_tree(qapp, temp_dir):
+    """Test timing all operations on a small tree."""
+    threads = set(threading.enumerate())
+    results = bench_tree(str(temp_dir), 50, "wide", 100, repeat=1)
+    assert not [
+        thread
+        for thread in set(threading.enumerate()) - threads
+        if thread.name == "flitz-transfers"
+    ]
+    operations = {result["operation"] for result in results}
+    assert operations == {
+        "scan",
+        "list_directory",
+        "load_directory",
+        "filter_items",
+        "sort",
+        "copy",
+        "move",
+        "delete",
+    }
+    assert all(result["seconds"] >= 0 for result in results)
+    copy = next(result for result in results if result["operation"] == "copy")
+    assert copy["entries"] == 50 and copy["files_per_second"] > 0
+    assert list(temp_dir.iterdir()) == []
+
+
+def test_bench_tree_view_counts_loaded_rows(qapp, temp_dir):
+    """Test that view rates of deep trees count the top folder's rows."""
+    results = bench_tree(str(temp_dir), 50, "deep", 0, repeat=1)
+    view = [result for result in results if "rows" in result]
+
+    assert {result["operation"] for result in view} == {
+        "load_directory",
+        "filter_items",
+        "sort",
+    }
+    for result in view:
+        assert result["rows"] == 10
+        assert result["rows_per_second"] == 10 / result["seconds"]
+
+
+def test_compare_results():
+    """Test matching results to the baseline by their case."""
+    baseline = [
+        {"benchmark": "query", "query": "ext:log", "seconds": 1.0},
+        {"benchmark": "query", "query": "size>1M", "seconds": 1.0},
+    ]
+    results = [
+        {"benchmark": "query", "query": "ext:log", "seconds": 1.1},
+        {"benchmark": "query", "query": "size>1M", "seconds": 2.0},
+        {"benchmark": "query", "query": "mtime<7d", "seconds": 5.0},
+    ]
+
+    regressions = compare_results(results, baseline, 0.25)
+
+    assert regressions == [results[1]]
+    assert results[0]["baseline_seconds"] == 1.0
+    assert abs(results[0]["change"] - 0.1) < 1e-9
+    assert "baseline_seconds" not in results[2]
+
+
+def test_main_baseline(capsys, temp_dir):
+    """Test that regressions against the baseline fail the run."""
+    output = temp_dir / "results.json"
+    argv = ["query", "--rows", "100", "--query", "ext:log", "--repeat", "1"]
+    assert main([*argv, "--output", str(output)]) == 0
+    results = json.loads(capsys.readouterr().out)
+    assert json.loads(output.read_text()) == results
+
+    results[0]["seconds"] = 1e-12
+    output.write_text(json.dumps(results))
+    assert main([*argv, "--baseline", str(output)]) == 1
+    assert "Regression" in capsys.readouterr().err
@@ -0,0 +1,66 @@
+"""Tests for the directory listing cache."""
+
+import os
+
+from flitz.cache import ListingCache
+from flitz.file_operations import FileOperations
+
+
+def _put(cache, path):
+    st = os.stat(path)
+    snapshot = FileOperations.scan_directory(path)
+    cache.put(path, False, snapshot, st)
+    return snapshot
+
+
+def test_cache_hit_and_miss(sample_files):
+    """Test that an unchanged directory is served from the cache."""
+    cache = ListingCache()
+    assert cache.get(sample_files) is None
+
+    snapshot = _put(cache, sample_files)
+    assert cache.get(sample_files) is snapshot
+    assert cache.get(sample_files, show_hidden=True) is None
+
+    stats = cache.stats()
+    assert stats.hits == 1
+    assert stats.misses == 2
+    assert stats.entries == 1
+    assert stats.bytes == snapshot.nbytes
+
+
+def test_cache_invalidated_by_mtime(sample_files):
+    """Test that changing the directory invalidates its listing."""
+    cache = ListingCache()
+    _put(cache, sample_files)
+
+    st = os.stat(sample_files)
+    os.utime(sample_files, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+
+    assert cache.get(sample_files) is None
+    assert len(cache) == 0
+
+
+def test_cache_lru_eviction(sample_files):
+    """Test that the least recently used listing is evicted first."""
+    cache = ListingCache(max_entries=2)
+    first = sample_files / "folder1"
+    second = sample_files / "folder2"
+    _put(cache, first)
+    _put(cache, second)
+    assert cache.get(first) is not None
+
+    _put(cache, sample_files)
+
+    assert cache.get(second) is None
+    assert cache.get(first) is not None
+    assert cache.stats().evictions == 1
+
+
+def test_cache_byte_limit(sample_files):
+    """Test that the cache stays below its byte limit."""
+    cache = ListingCache(max_bytes=1)
+    _put(cache, sample_files)
+
+    assert len(cache) == 0
+    assert cache.stats().bytes == 0
@@ -0,0 +1,90 @@
+"""Tests for the headless command line interface."""
+
+import json
+import subprocess
+import sys
+
+from flitz.cli import run
+
+
+def run_json(capsys, *argv):
+    status = run([*argv, "--json"])
+    return status, json.loads(capsys.readouterr().out)
+
+
+def test_ls(capsys, sample_files):
+    """Test listing a folder as JSON, folders first."""
+    status, entries = run_json(capsys, "ls", str(sample_files))
+
+    assert status == 0
+    assert [entry["name"] for entry in entries] == [
+        "folder1",
+        "folder2",
+        "file1.txt",
+        "file2.py",
+    ]
+    assert entries[0]["is_dir"] and entries[0]["size"] is None
+    assert entries[2]["size"] == len("Hello, world!")
+    assert entries[2]["type"] == "Text Document"
+
+    assert run(["ls", "-a", str(sample_files)]) == 0
+    assert ".hidden_file" in capsys.readouterr().out
+    assert run(["ls", str(sample_files / "file1.txt")]) == 1
+
+
+def test_du(capsys, sample_files):
+    """Test adding up the sizes of files and folders."""
+    folder = str(sample_files / "folder1")
+    text = str(sample_files / "file1.txt")
+    status, sizes = run_json(capsys, "du", folder, text)
+
+    assert status == 0
+    assert sizes == {folder: len("# Nested file"), text: 13}
+    assert run(["du", str(sample_files / "missing")]) == 1
+
+
+def test_cp_mv_rm(capsys, sample_files, temp_dir):
+    """Test copying, moving and deleting through the command line."""
+    target = temp_dir / "target"
+    target.mkdir()
+    status, result = run_json(
+        capsys, "cp", str(sample_files / "folder1"), str(target)
+    )
+    assert status == 0
+    assert result["errors"] == []
+    assert (target / "folder1" / "nested_file.md").exists()
+
+    status, result = run_json(
+        capsys, "mv", str(sample_files / "file1.txt"), str(target)
+    )
+    assert status == 0
+    assert not (sample_files / "file1.txt").exists()
+    assert (target / "file1.txt").read_text() == "Hello, world!"
+
+    destination = str(target / "file1.txt")
+    assert run(["cp", str(sample_files / "file2.py"), destination]) == 1
+    assert "not a folder" in capsys.readouterr().err
+
+    status, result = run_json(capsys, "rm", str(target))
+    assert status == 0
+    assert result["completed"] == [str(target)]
+    assert not target.exists()
+    assert run(["rm", str(target)]) == 1
+
+
+def test_headless_commands_do_not_load_qt(sample_files):
+    """Test that the subcommands only import the Qt-free core."""
+    script = (
+        "import sys\n"
+        "from flitz.cli import run\n"
+        f"run(['ls', {str(sample_files)!r}])\n"
+        f"run(['du', {str(sample_files)!r}])\n"
+        "print(any(name.startswith('PyQt6') for name in sys.modules))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert output.splitlines()[-1] == "False"
@@ -1,8 +1,11 @@
 """Tests for configuration management."""
 
+import os
+import stat
 import tempfile
 from pathlib import Path
 
+import pytest
 import yaml
 
 from flitz.config import Config
@@ -22,7 +25,7 @@ def test_load_config_nonexistent_file(monkeypatch):
         fake_home = Path(tmp_dir) / "fake_home"
         monkeypatch.setattr(Path, "home", lambda: fake_home)
 
-        config = Config.load()
+        config = Config.load(Path(tmp_dir) / "config.marshal")
         assert config.font_size == 14
         assert config.external_config is None
 
@@ -40,7 +43,7 @@ def test_load_config_existing_file(monkeypatch):
 
         monkeypatch.setattr(Path, "home", lambda: fake_home)
 
-        config = Config.load()
+        config = Config.load(Path(tmp_dir) / "config.marshal")
         assert config.font_size == 18
 
 
@@ -66,11 +69,22 @@ def test_load_config_with_external_config(monkeypatch):
 
         monkeypatch.setattr(Path, "home", lambda: fake_home)
 
-        config = Config.load()
+        config = Config.load(Path(tmp_dir) / "config.marshal")
         # External config should override main config
         assert config.font_size == 20
 
 
+def test_load_config_cached_per_home(monkeypatch, temp_dir):
+    """Test that a cache shared by several home folders is not mixed up."""
+    cache_path = temp_dir / "cache" / "config.marshal"
+    for font_size in (16, 18):
+        home = temp_dir / f"home{font_size}"
+        home.mkdir()
+        (home / ".flitz.yml").write_text(f"font_size: {font_size}\n")
+        monkeypatch.setattr(Path, "home", lambda: home)
+        assert Config.load(cache_path).font_size == font_size
+
+
 def test_config_validation():
     """Test configuration validation."""
     # Valid config
@@ -84,3 +98,101 @@ def test_config_validation():
     # Test with external_config as list
     config = Config(font_size=14, external_config=["path1", "path2"])
     assert config.external_config == ["path1", "path2"]
+
+
+def test_load_config_cached(monkeypatch, temp_dir):
+    """Test that the merged config is reused until a source changes."""
+    home = temp_dir / "home"
+    home.mkdir()
+    external = temp_dir / "external.yml"
+    external.write_text("folder_sizes: true\n")
+    (home / ".flitz.yml").write_text(
+        f"font_size: 16\nexternal_config: {external}\n"
+    )
+    cache_path = temp_dir / "cache" / "config.marshal"
+    monkeypatch.setattr(Path, "home", lambda: home)
+
+    config = Config.load(cache_path)
+    assert cache_path.exists()
+    assert config.font_size == 16 and config.folder_sizes
+
+    reads = []
+    read_files = Config.read_files
+    monkeypatch.setattr(
+        Config,
+        "read_files",
+        staticmethod(lambda: reads.append(1) or read_files()),
+    )
+    assert Config.load(cache_path) == config
+    assert reads == []
+
+    external.write_text("folder_sizes: false\nfont_size: 12\n")
+    config = Config.load(cache_path)
+    assert config.font_size == 12 and not config.folder_sizes
+    assert reads == [1]
+
+    cache_path.write_bytes(b"garbage")
+    assert Config.load(cache_path) == config
+
+
+def test_changed_fields():
+    """Test diffing two configurations."""
+    config = Config(font_size=14, index_roots=["/a"])
+    other = Config(font_size=16, index_roots=["/a"], folder_sizes=True)
+
+    assert config.changed_fields(other) == {
+        "font_size": 16,
+        "folder_sizes": True,
+    }
+    assert config.changed_fields(config) == {}
+
+
+def test_save_fields(monkeypatch, temp_dir):
+    """Test writing fields back while keeping the rest of the file."""
+    monkeypatch.setattr(Path, "home", lambda: temp_dir)
+    config_path = temp_dir / ".flitz.yml"
+    config_path.write_text(
+        "# Team settings\nfont_size: 14\nsearch_exclude:\n  - build\n"
+    )
+
+    Config.save_fields({"font_size": 18, "search_exclude": ["a", "b c"]})
+    Config.save_fields({"folder_sizes": True})
+
+    text = config_path.read_text()
+    assert text.startswith("# Team settings\nfont_size: 18\n")
+    assert yaml.safe_load(text) == {
+        "font_size": 18,
+        "search_exclude": ["a", "b c"],
+        "folder_sizes": True,
+    }
+
+
+def test_save_fields_keeps_symlink_and_mode(monkeypatch, temp_dir):
+    """Test that a symlinked config is written through the link."""
+    monkeypatch.setattr(Path, "home", lambda: temp_dir)
+    dotfiles = temp_dir / "dotfiles"
+    dotfiles.mkdir()
+    target = dotfiles / "flitz.yml"
+    target.write_text("font_size: 14\n")
+    target.chmod(0o600)
+    (temp_dir / ".flitz.yml").symlink_to(target)
+
+    Config.save_fields({"font_size": 16})
+
+    assert (temp_dir / ".flitz.yml").is_symlink()
+    assert yaml.safe_load(target.read_text()) == {"font_size": 16}
+    assert stat.S_IMODE(target.stat().st_mode) == 0o600
+    assert sorted(path.name for path in dotfiles.iterdir()) == ["flitz.yml"]
+
+
+def test_save_fields_removes_temporary_file(monkeypatch, temp_dir):
+    """Test that a failed write leaves no temporary file behind."""
+    monkeypatch.setattr(Path, "home", lambda: temp_dir)
+
+    def fail(source, destination):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        Config.save_fields({"font_size": 16})
+    assert list(temp_dir.iterdir()) == []
@@ -0,0 +1,122 @@
+"""Tests for reloading the configuration."""
+
+from pathlib import Path
+
+import pytest
+import yaml
+
+from flitz.config import Config
+from flitz.config_watcher import ConfigWatcher
+
+
+@pytest.fixture
+def home(monkeypatch, temp_dir):
+    """A home folder with a config referencing an external one."""
+    home = temp_dir / "home"
+    home.mkdir()
+    external = temp_dir / "team.yml"
+    external.write_text("folder_sizes: false\n")
+    (home / ".flitz.yml").write_text(
+        f"font_size: 14\nexternal_config: {external}\n"
+    )
+    monkeypatch.setattr(Path, "home", lambda: home)
+    return home
+
+
+@pytest.fixture
+def watcher(qtbot, home, temp_dir):
+    """A watcher of the configuration in ``home``."""
+    cache_path = temp_dir / "config.marshal"
+    watcher = ConfigWatcher(Config.load(cache_path), cache_path=cache_path)
+    # Wait until the files to watch are known
+    qtbot.waitUntil(lambda: bool(watcher.sources), timeout=5000)
+    yield watcher
+    watcher.close()
+
+
+def test_reload_changed_fields(qtbot, watcher, temp_dir):
+    """Test that changes to external configs are reported by field."""
+    with qtbot.waitSignal(watcher.config_changed, timeout=5000) as blocker:
+        (temp_dir / "team.yml").write_text(
+            "folder_sizes: true\nfont_size: 14\n"
+        )
+
+    config, changed = blocker.args
+    assert changed == {"folder_sizes": True}
+    assert config.folder_sizes and watcher.loaded is config
+
+
+def test_reload_keeps_last_good_config(qtbot, watcher, home):
+    """Test that invalid files are reported and ignored."""
+    with qtbot.waitSignal(watcher.reload_failed, timeout=5000):
+        (home / ".flitz.yml").write_text("font_size: huge\n")
+
+    assert watcher.loaded.font_size == 14
+
+
+def test_save_is_debounced(qtbot, watcher, home, monkeypatch):
+    """Test that quick runtime changes are written once."""
+    saves = []
+    save_fields = Config.save_fields
+    monkeypatch.setattr(
+        Config,
+        "save_fields",
+        staticmethod(
+            lambda values: saves.append(values) or save_fields(values)
+        ),
+    )
+    watcher.save({"font_size": 15})
+    watcher.save({"font_size": 16})
+    qtbot.waitUntil(lambda: bool(saves), timeout=5000)
+
+    assert saves == [{"font_size": 16}]
+    config = yaml.safe_load((home / ".flitz.yml").read_text())
+    assert config["font_size"] == 16
+    assert "external_config" in config
+
+
+def test_reload_by_polling(qtbot, home, temp_dir, monkeypatch):
+    """Test noticing changes by mtime where inotify is unavailable."""
+    monkeypatch.setattr("flitz.watcher.Inotify.available", lambda: False)
+    cache_path = temp_dir / "config.marshal"
+    watcher = ConfigWatcher(Config.load(cache_path), cache_path=cache_path)
+    qtbot.waitUntil(lambda: bool(watcher.sources), timeout=5000)
+    assert not watcher.uses_inotify
+
+    with qtbot.waitSignal(watcher.config_changed, timeout=5000) as blocker:
+        (home / ".flitz.yml").write_text("font_size: 20\n")
+    watcher.close()
+
+    assert blocker.args[1] == {"font_size": 20, "external_config": None}
+
+
+def test_saved_changes_are_not_reported(qtbot, watcher, home):
+    """Test that reading back saved runtime changes is no change."""
+    with qtbot.assertNotEmitted(watcher.config_changed, wait=1000):
+        watcher.save({"font_size": 16})
+        watcher.flush()
+        qtbot.waitUntil(
+            lambda: "font_size: 16" in (home / ".flitz.yml").read_text(),
+            timeout=5000,
+        )
+
+    assert watcher.loaded.font_size == 16
+
+
+def test_reload_symlinked_config(qtbot, home, temp_dir):
+    """Test that edits where a symlinked config points to are noticed."""
+    dotfiles = temp_dir / "dotfiles"
+    dotfiles.mkdir()
+    target = dotfiles / "flitz.yml"
+    target.write_text("font_size: 14\n")
+    (home / ".flitz.yml").unlink()
+    (home / ".flitz.yml").symlink_to(target)
+    cache_path = temp_dir / "config.marshal"
+    watcher = ConfigWatcher(Config.load(cache_path), cache_path=cache_path)
+    qtbot.waitUntil(lambda: bool(watcher.sources), timeout=5000)
+
+    with qtbot.waitSignal(watcher.config_changed, timeout=5000) as blocker:
+        target.write_text("font_size: 18\n")
+    watcher.close()
+
+    assert blocker.args[1] == {"font_size": 18}
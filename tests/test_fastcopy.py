@@ -0,0 +1,160 @@
+"""Tests for kernel-accelerated file copying."""
+
+import os
+
+import pytest
+
+from flitz import fastcopy
+from flitz.file_operations import FileOperations
+from flitz.transfers import TransferJob, TransferQueue
+
+
+@pytest.fixture
+def big_file(temp_dir):
+    """Create a file spanning several copy chunks."""
+    path = temp_dir / "big.bin"
+    path.write_bytes(os.urandom(fastcopy.CHUNK_SIZE * 2 + 123))
+    return path
+
+
+@pytest.mark.parametrize(
+    "strategy",
+    [fastcopy.COPY_FILE_RANGE, fastcopy.SENDFILE, fastcopy.USERSPACE],
+)
+def test_copy_with_strategy(big_file, temp_dir, strategy):
+    """Test that each strategy copies data and reports progress."""
+    if strategy != fastcopy.USERSPACE and not hasattr(os, strategy):
+        pytest.skip(f"{strategy} is not available")
+    target = temp_dir / "copy.bin"
+    progress = []
+
+    result = fastcopy.copy_file(
+        big_file, target, progress=progress.append, strategies=[strategy]
+    )
+
+    assert result.strategy == strategy
+    assert result.logical_bytes == big_file.stat().st_size
+    assert target.read_bytes() == big_file.read_bytes()
+    assert sum(progress) == big_file.stat().st_size
+    assert target.stat().st_mtime_ns == big_file.stat().st_mtime_ns
+
+
+def test_fallback(big_file, temp_dir):
+    """Test falling back when reflinks are not supported."""
+    target = temp_dir / "copy.bin"
+
+    result = fastcopy.copy_file(big_file, target)
+
+    assert result.strategy in fastcopy.STRATEGIES
+    assert target.read_bytes() == big_file.read_bytes()
+
+
+def test_sparse_copy(temp_dir):
+    """Test that holes are skipped and recreated."""
+    source = temp_dir / "sparse.img"
+    data = b"x" * 4096
+    with open(source, "wb") as f:
+        f.write(data)
+        f.seek(64 * 1024 * 1024)
+        f.write(data)
+        f.truncate(128 * 1024 * 1024)
+    if not fastcopy.is_sparse(source.stat()):
+        pytest.skip("File system does not support sparse files")
+    target = temp_dir / "copy.img"
+    progress = []
+
+    result = fastcopy.copy_file(
+        source,
+        target,
+        progress=progress.append,
+        strategies=[fastcopy.USERSPACE],
+    )
+
+    assert result.logical_bytes == sum(progress) == 128 * 1024 * 1024
+    assert result.physical_bytes < 1024 * 1024
+    assert target.stat().st_size == source.stat().st_size
+    assert fastcopy.is_sparse(target.stat())
+    with open(target, "rb") as f:
+        assert f.read(4096) == data
+        f.seek(64 * 1024 * 1024)
+        assert f.read(8192) == data + bytes(4096)
+
+
+def test_hardlinks_in_tree(temp_dir):
+    """Test that copying a tree keeps hard links together."""
+    source = temp_dir / "source"
+    (source / "sub").mkdir(parents=True)
+    (source / "a").write_text("linked")
+    os.link(source / "a", source / "sub" / "b")
+
+    FileOperations.copy_item(source, temp_dir / "copy")
+
+    copy_a = temp_dir / "copy" / "a"
+    copy_b = temp_dir / "copy" / "sub" / "b"
+    assert copy_b.read_text() == "linked"
+    assert copy_a.stat().st_ino == copy_b.stat().st_ino
+    assert copy_a.stat().st_ino != (source / "a").stat().st_ino
+
+
+def test_exclusive(sample_files):
+    """Test that exclusive copies do not overwrite files."""
+    with pytest.raises(FileExistsError):
+        fastcopy.copy_file(
+            sample_files / "file1.txt",
+            sample_files / "file2.py",
+            exclusive=True,
+        )
+    assert (sample_files / "file2.py").read_text() == "print('Hello')"
+
+
+def test_cancel(big_file, temp_dir):
+    """Test that a raising checkpoint aborts the copy."""
+
+    def checkpoint():
+        raise RuntimeError("cancelled")
+
+    with pytest.raises(RuntimeError):
+        fastcopy.copy_file(
+            big_file, temp_dir / "copy.bin", checkpoint=checkpoint
+        )
+
+
+def run_job(job):
+    """Run a transfer job to completion."""
+    queue = TransferQueue(workers=2)
+    try:
+        queue.submit(job)
+        assert queue.wait(timeout=10)
+    finally:
+        queue.shutdown()
+    return job
+
+
+def test_job_reports_strategies(sample_files, temp_dir):
+    """Test that transfer jobs count the strategies used."""
+    target = temp_dir / "target"
+    target.mkdir()
+    job = run_job(TransferJob("copy", [sample_files / "folder1"], target))
+
+    strategies = job.progress().strategies
+    assert sum(strategies.values()) == 1
+    assert set(strategies) <= set(fastcopy.STRATEGIES)
+
+
+def test_job_hardlinks(temp_dir):
+    """Test that transfer jobs link instead of copying linked files."""
+    source = temp_dir / "source"
+    source.mkdir()
+    (source / "a").write_text("linked")
+    os.link(source / "a", source / "b")
+    target = temp_dir / "target"
+    target.mkdir()
+
+    job = run_job(TransferJob("copy", [source], target))
+
+    assert not job.errors
+    progress = job.progress()
+    assert progress.done_files == progress.total_files == 2
+    assert progress.total_bytes == len("linked")
+    assert progress.strategies["hardlink"] == 1
+    assert (target / "source" / "a").stat().st_nlink == 2
@@ -0,0 +1,332 @@
+"""Tests for the directory listing model."""
+
+import math
+import os
+
+import pytest
+from PyQt6.QtCore import QPersistentModelIndex, Qt
+
+from flitz.adapters import TypeSniffer
+from flitz.file_model import FileListModel, PathRole
+from flitz.file_operations import FileOperations
+from flitz.filetypes import TypeCache
+from flitz.query import QueryError
+
+
+def test_model_rows_and_data(qtbot, sample_files):
+    """Test that the model exposes one row per listed item."""
+    model = FileListModel()
+    items = FileOperations.list_directory(sample_files)
+    model.set_snapshot(FileOperations.scan_directory(sample_files))
+
+    assert model.rowCount() == len(items)
+    assert model.columnCount() == 4
+    assert model.headerData(0, Qt.Orientation.Horizontal) == "Name"
+    index = model.index(0, 0)
+    assert model.data(index) == items[0].name
+    assert model.data(index, PathRole) == items[0].path
+
+
+def test_model_sort_directories_first(qtbot, sample_files):
+    """Test that sorting keeps directories before files."""
+    model = FileListModel()
+    model.append_snapshot(FileOperations.scan_directory(sample_files))
+
+    model.sort(0, Qt.SortOrder.AscendingOrder)
+    names = [model.item(row).name for row in range(model.rowCount())]
+    assert names == ["folder1", "folder2", "file1.txt", "file2.py"]
+
+    model.sort(0, Qt.SortOrder.DescendingOrder)
+    names = [model.item(row).name for row in range(model.rowCount())]
+    assert names == ["folder2", "folder1", "file2.py", "file1.txt"]
+
+
+def test_model_apply_changes(qtbot, sample_files):
+    """Test patching single rows in place."""
+    model = FileListModel()
+    model.set_snapshot(FileOperations.scan_directory(sample_files))
+    model.sort(0, Qt.SortOrder.AscendingOrder)
+
+    new_file = sample_files / "file0.txt"
+    new_file.write_text("new")
+    (sample_files / "file2.py").unlink()
+    model.apply_changes(
+        {
+            "file0.txt": FileOperations.stat_path(new_file),
+            "file2.py": None,
+        }
+    )
+
+    names = [model.item(row).name for row in range(model.rowCount())]
+    assert names == ["folder1", "folder2", "file0.txt", "file1.txt"]
+    assert len(model.snapshot) == 4
+
+    # Growing a file moves it when sorting by size
+    model.sort(1, Qt.SortOrder.AscendingOrder)
+    new_file.write_text("much longer content")
+    model.apply_changes({"file0.txt": FileOperations.stat_path(new_file)})
+    names = [model.item(row).name for row in range(model.rowCount())]
+    assert names[-1] == "file0.txt"
+    assert model.item(3).size == len("much longer content")
+
+
+def names_of(model):
+    """Names shown by ``model`` in display order."""
+    return [model.item(row).name for row in range(model.rowCount())]
+
+
+def test_model_filter(qtbot, sample_files):
+    """Test hiding and showing rows by name."""
+    model = FileListModel()
+    model.set_snapshot(FileOperations.scan_directory(sample_files))
+    model.sort(0, Qt.SortOrder.AscendingOrder)
+    removed = []
+    model.rowsRemoved.connect(lambda parent, first, last: removed.append(1))
+
+    model.set_filter("FILE")
+    assert names_of(model) == ["file1.txt", "file2.py"]
+    assert removed == [1]
+
+    model.set_filter("file1")
+    assert names_of(model) == ["file1.txt"]
+    assert model.position_of("file2.py") is None
+
+    model.set_filter("")
+    assert names_of(model) == ["folder1", "folder2", "file1.txt", "file2.py"]
+
+    # Changes to hidden entries do not show them
+    model.set_filter("folder")
+    (sample_files / "file1.txt").write_text("changed")
+    new_file = sample_files / "folder0"
+    new_file.mkdir()
+    model.apply_changes(
+        {
+            "file1.txt": FileOperations.stat_path(sample_files / "file1.txt"),
+            "folder0": FileOperations.stat_path(new_file),
+            "file2.py": None,
+        }
+    )
+    assert names_of(model) == ["folder0", "folder1", "folder2"]
+    model.set_filter("")
+    assert names_of(model) == ["folder0", "folder1", "folder2", "file1.txt"]
+
+
+def test_model_filter_many_runs(qtbot, temp_dir):
+    """Test filters changing more rows than are updated one run at a time."""
+    model = FileListModel()
+    for number in range(3000):
+        (temp_dir / f"{'odd' if number % 2 else 'even'}{number:04}").touch()
+    model.set_snapshot(FileOperations.scan_directory(temp_dir))
+    model.sort(0, Qt.SortOrder.AscendingOrder)
+    current = model.index(model.position_of("odd2999"), 0)
+    persistent = QPersistentModelIndex(current)
+
+    model.set_filter("odd")
+    assert model.rowCount() == 1500
+    assert persistent.row() == 1499
+
+    model.set_filter("")
+    assert model.rowCount() == 3000
+    assert names_of(model) == sorted(names_of(model))
+    assert model.item(persistent.row()).name == "odd2999"
+
+
+def test_model_fuzzy_filter(qtbot, sample_files):
+    """Test ranking rows by fuzzy match quality."""
+    model = FileListModel()
+    model.set_snapshot(FileOperations.scan_directory(sample_files))
+    model.sort(0, Qt.SortOrder.AscendingOrder)
+
+    model.set_filter("f2", fuzzy=True)
+    assert names_of(model) == ["file2.py", "folder2"]
+
+    # Sorting by a column replaces the ranking
+    model.sort(0, Qt.SortOrder.AscendingOrder)
+    assert names_of(model) == ["folder2", "file2.py"]
+
+    model.set_filter("f2", fuzzy=True)
+    model.set_filter("")
+    assert names_of(model) == ["folder1", "folder2", "file1.txt", "file2.py"]
+
+
+def test_model_fuzzy_filter_follows_changes(qtbot, sample_files):
+    """Test that changed entries keep the rows ranked by match quality."""
+    model = FileListModel()
+    model.set_snapshot(FileOperations.scan_directory(sample_files))
+    model.sort(0, Qt.SortOrder.AscendingOrder)
+    model.set_filter("f", fuzzy=True)
+    ranked = names_of(model)
+    assert len(ranked) == len(model.snapshot)
+
+    (sample_files / "f").write_text("new")
+    (sample_files / "file1.txt").write_text("changed")
+    model.apply_changes(
+        {
+            "f": FileOperations.stat_path(sample_files / "f"),
+            "file1.txt": FileOperations.stat_path(sample_files / "file1.txt"),
+        }
+    )
+    assert names_of(model) == ["f"] + ranked
+
+    # The ranking is not taken for the sort order
+    model.set_filter("")
+    assert names_of(model) == [
+        "folder1",
+        "folder2",
+        "f",
+        "file1.txt",
+        "file2.py",
+    ]
+
+
+def test_model_query_filter(qtbot, sample_files):
+    """Test filtering rows by an attribute query."""
+    model = FileListModel()
+    model.set_snapshot(FileOperations.scan_directory(sample_files))
+    model.sort(0, Qt.SortOrder.AscendingOrder)
+
+    model.set_filter("type:file -ext:txt")
+    assert names_of(model) == ["file2.py"]
+
+    # Malformed queries leave the rows as they are
+    with pytest.raises(QueryError):
+        model.set_filter("size>")
+    assert names_of(model) == ["file2.py"]
+
+    model.set_filter("type:dir")
+    assert names_of(model) == ["folder1", "folder2"]
+
+
+def test_model_query_filter_follows_changes(qtbot, temp_dir):
+    """Test rows starting and stopping to match a query as they change."""
+    (temp_dir / "a.txt").write_text("a")
+    (temp_dir / "b.txt").write_text("b" * 2048)
+    model = FileListModel()
+    model.set_snapshot(FileOperations.scan_directory(temp_dir))
+    model.sort(0, Qt.SortOrder.AscendingOrder)
+    model.set_filter("size>1K")
+    assert names_of(model) == ["b.txt"]
+
+    (temp_dir / "a.txt").write_text("a" * 2048)
+    model.apply_changes(
+        {"a.txt": FileOperations.stat_path(temp_dir / "a.txt")}
+    )
+    assert names_of(model) == ["a.txt", "b.txt"]
+
+    (temp_dir / "b.txt").write_text("b")
+    model.apply_changes(
+        {"b.txt": FileOperations.stat_path(temp_dir / "b.txt")}
+    )
+    assert names_of(model) == ["a.txt"]
+    assert model.position_of("b.txt") is None
+
+    (temp_dir / "a.txt").write_text("a")
+    (temp_dir / "b.txt").unlink()
+    model.apply_changes(
+        {
+            "a.txt": FileOperations.stat_path(temp_dir / "a.txt"),
+            "b.txt": None,
+        }
+    )
+    assert names_of(model) == []
+    model.set_filter("")
+    assert names_of(model) == ["a.txt"]
+
+
+def test_model_folder_sizes(qtbot, sample_files):
+    """Test showing and sorting by the sizes of folders."""
+    model = FileListModel()
+    model.set_snapshot(FileOperations.scan_directory(sample_files))
+    model.sort(1, Qt.SortOrder.DescendingOrder)
+    assert model.data(model.index(0, 1)) == ""
+
+    model.set_folder_sizes({"folder1": 13, "folder2": 5000})
+    assert names_of(model) == ["folder2", "folder1", "file2.py", "file1.txt"]
+    assert model.data(model.index(0, 1)) == "4.9 KB"
+    assert model.item(1).size == 13
+
+
+def test_model_typed_sort(qtbot, temp_dir):
+    """Test sorting by values rather than display strings."""
+    for name, size, mtime in [
+        ("file10.txt", 10 * 1024**2, 300),
+        ("file9.txt", 9 * 1024, 100),
+        ("File2.txt", 9 * 1024, 200),
+    ]:
+        (temp_dir / name).write_bytes(b"x" * size)
+        os.utime(temp_dir / name, (mtime, mtime))
+    (temp_dir / "folder").mkdir()
+    model = FileListModel()
+    model.set_snapshot(FileOperations.scan_directory(temp_dir))
+
+    model.sort(0, Qt.SortOrder.AscendingOrder)
+    assert names_of(model) == [
+        "folder",
+        "File2.txt",
+        "file9.txt",
+        "file10.txt",
+    ]
+    # Equal sizes keep the name order in both directions
+    model.sort(1, Qt.SortOrder.AscendingOrder)
+    assert names_of(model) == [
+        "folder",
+        "File2.txt",
+        "file9.txt",
+        "file10.txt",
+    ]
+    model.sort(1, Qt.SortOrder.DescendingOrder)
+    assert names_of(model) == [
+        "folder",
+        "file10.txt",
+        "File2.txt",
+        "file9.txt",
+    ]
+    model.sort(3, Qt.SortOrder.DescendingOrder)
+    assert names_of(model) == [
+        "folder",
+        "file10.txt",
+        "File2.txt",
+        "file9.txt",
+    ]
+
+    # Unknown times sort as oldest
+    model.snapshot.mtimes[model.snapshot.row_of("file10.txt")] = math.nan
+    model.sort_keys.reset()
+    model.sort(3, Qt.SortOrder.AscendingOrder)
+    assert names_of(model) == [
+        "folder",
+        "file10.txt",
+        "file9.txt",
+        "File2.txt",
+    ]
+
+
+def test_model_sniffs_types(qtbot, temp_dir):
+    """Test that types of files without extension are shown once sniffed."""
+    (temp_dir / "tool").write_bytes(b"#!/bin/sh\n")
+    (temp_dir / "notes.txt").write_text("words")
+    model = FileListModel()
+    model.sniffer = TypeSniffer(cache=TypeCache())
+    model.sniffer.types_found.connect(model.types_resolved)
+    model.set_snapshot(FileOperations.scan_directory(temp_dir))
+    tool = model.index(model.position_of("tool"), 2)
+    notes = model.index(model.position_of("notes.txt"), 2)
+
+    assert model.data(notes) == "Text Document"
+    with qtbot.waitSignal(model.dataChanged, timeout=5000):
+        assert model.data(tool) == "File"
+    assert model.data(tool) == "Script"
+    model.sniffer.shutdown()
+
+
+def test_model_does_not_sniff_special_files(temp_dir):
+    """Test that FIFOs and other special files are never read."""
+    os.mkfifo(temp_dir / "pipe")
+    model = FileListModel()
+    model.sniffer = TypeSniffer(cache=TypeCache())
+    model.set_snapshot(FileOperations.scan_directory(temp_dir))
+
+    index = model.index(model.position_of("pipe"), 2)
+    assert model.data(index) == "File"
+    assert not model.sniffer._pending
+    model.sniffer.shutdown()
@@ -1,6 +1,9 @@
 """Tests for file operations."""
 
-from flitz.file_operations import FileItem, FileOperations
+import os
+from pathlib import Path
+
+from flitz.file_operations import FileItem, FileOperations, natural_key
 
 
 def test_file_item_properties(sample_files):
@@ -126,6 +129,23 @@ def test_rename_item(sample_files):
     assert (sample_files / "renamed_file.txt").exists()
 
 
+def test_names_must_not_be_paths(sample_files):
+    """Test that typed names with separators or dot names are rejected."""
+    assert FileOperations.is_valid_name("notes.txt")
+    assert FileOperations.is_valid_name("..hidden")
+    for name in ("", ".", "..", "folder1/x", "../escape"):
+        assert not FileOperations.is_valid_name(name)
+
+    assert not FileOperations.create_folder(sample_files, "folder1/sub")
+    assert not FileOperations.create_file(sample_files, "folder2/new.txt")
+    assert not FileOperations.rename_item(
+        sample_files / "file2.py", "folder1/file2.py"
+    )
+    assert not (sample_files / "folder1" / "sub").exists()
+    assert not (sample_files / "folder2" / "new.txt").exists()
+    assert (sample_files / "file2.py").exists()
+
+
 def test_delete_item(sample_files):
     """Test item deletion."""
     file_path = sample_files / "file1.txt"
@@ -159,3 +179,100 @@ def test_move_item(sample_files, temp_dir):
     assert not src.exists()  # Original should be gone
     assert dst.exists()
     assert dst.read_text() == original_content
+
+
+def test_list_directory_syscall_count(sample_files, monkeypatch):
+    """Test that listing stats every visible entry exactly once."""
+    calls = {"entry_stat": 0, "path": 0}
+    real_scandir = os.scandir
+
+    class CountingEntry:
+        def __init__(self, entry):
+            self._entry = entry
+            self.name = entry.name
+            self.path = entry.path
+
+        def is_dir(self):
+            return self._entry.is_dir()
+
+        def stat(self):
+            calls["entry_stat"] += 1
+            return self._entry.stat()
+
+    class CountingScandir:
+        def __init__(self, path):
+            self._it = real_scandir(path)
+
+        def __enter__(self):
+            return (CountingEntry(entry) for entry in self._it)
+
+        def __exit__(self, *exc_info):
+            self._it.close()
+
+    def count_path_call(*args, **kwargs):
+        calls["path"] += 1
+        raise AssertionError("unexpected per-path syscall")
+
+    monkeypatch.setattr(os, "scandir", CountingScandir)
+    items = FileOperations.list_directory(sample_files, show_hidden=False)
+
+    monkeypatch.setattr(Path, "stat", count_path_call)
+    monkeypatch.setattr(Path, "is_dir", count_path_call)
+    monkeypatch.setattr(os, "stat", count_path_call)
+    for item in items:
+        assert item.name
+        assert item.size_str or item.is_directory
+        assert item.file_type
+        assert item.modified_str
+
+    assert len(items) == 4
+    assert calls["entry_stat"] == len(items)
+    assert calls["path"] == 0
+
+
+def test_scan_directory_snapshot(sample_files):
+    """Test the columnar directory snapshot."""
+    snapshot = FileOperations.scan_directory(sample_files, show_hidden=True)
+
+    assert len(snapshot) == 6
+    assert len(snapshot.sizes) == len(snapshot.mtimes) == len(snapshot)
+    row = snapshot.names.index("file1.txt")
+    assert snapshot.sizes[row] == len("Hello, world!")
+    assert not snapshot.is_dir(row)
+    assert snapshot.is_dir(snapshot.names.index("folder1"))
+
+    item = snapshot.item(row)
+    assert not hasattr(item, "__dict__")
+    assert item.path == sample_files / "file1.txt"
+    assert item.size == len("Hello, world!")
+    assert item.file_type == "Text Document"
+    assert item.mtime == (sample_files / "file1.txt").stat().st_mtime
+
+
+def test_snapshot_remove_rows(sample_files):
+    """Test removing rows keeps the remaining rows consistent."""
+    snapshot = FileOperations.scan_directory(sample_files, show_hidden=True)
+    names = set(snapshot.names)
+    removed = {snapshot.row_of("file1.txt"), snapshot.row_of("folder1")}
+
+    snapshot.remove(removed)
+
+    assert set(snapshot.names) == names - {"file1.txt", "folder1"}
+    assert len(snapshot.sizes) == len(snapshot) == 4
+    for row, name in enumerate(snapshot.names):
+        assert snapshot.row_of(name) == row
+        assert snapshot.item(row).size == FileItem(sample_files / name).size
+
+
+def test_natural_key():
+    """Test that numbers in names sort by value."""
+    names = ["file10.txt", "file2.txt", "file1.txt", "file", "file02b", "a"]
+    assert sorted(names, key=natural_key) == [
+        "a",
+        "file",
+        "file1.txt",
+        "file2.txt",
+        "file02b",
+        "file10.txt",
+    ]
+    assert natural_key("no digits") == "no digits"
@@ -0,0 +1,96 @@
+"""Tests for file types and their icons."""
+
+import os
+
+from flitz.adapters import TypeSniffer
+from flitz.filetypes import (
+    EXECUTABLE,
+    EXTENSIONS,
+    FILE,
+    SCRIPT,
+    TEXT,
+    TypeCache,
+    file_type_of,
+    needs_sniffing,
+    sniff_type,
+    type_of,
+)
+
+
+def test_file_type_of():
+    """Test type descriptions by extension."""
+    assert file_type_of("notes.TXT") == "Text Document"
+    assert file_type_of("archive.tar.gz") == "GZIP Archive"
+    assert file_type_of("data.parquet") == "PARQUET File"
+    assert file_type_of("Makefile") == "File"
+    assert file_type_of(".bashrc") == "File"
+    assert file_type_of("odd.") == "File"
+    assert type_of("photo.JPEG") is EXTENSIONS[".jpg"]
+
+
+def test_needs_sniffing():
+    """Test which names say too little about the content."""
+    assert needs_sniffing("README")
+    assert needs_sniffing("dump.bin")
+    assert needs_sniffing("odd.")
+    assert not needs_sniffing("notes.txt")
+    assert not needs_sniffing("data.parquet")
+
+
+def test_sniff_type(temp_dir):
+    """Test recognizing files by their leading bytes."""
+    samples = {
+        "image": b"\x89PNG\r\n\x1a\n" + b"\0" * 16,
+        "program": b"\x7fELF\x02\x01\x01" + b"\0" * 16,
+        "tool": b"#!/usr/bin/env python3\nprint()\n",
+        "run": b"#!/bin/sh\necho hi\n",
+        "notes": b"plain words\n",
+        "blob": b"\x01\x02\0\x03",
+        "empty": b"",
+    }
+    for name, content in samples.items():
+        (temp_dir / name).write_bytes(content)
+
+    assert sniff_type(temp_dir / "image") is EXTENSIONS[".png"]
+    assert sniff_type(temp_dir / "program") is EXECUTABLE
+    assert sniff_type(temp_dir / "tool") is EXTENSIONS[".py"]
+    assert sniff_type(temp_dir / "run") is SCRIPT
+    assert sniff_type(temp_dir / "notes") is TEXT
+    assert sniff_type(temp_dir / "blob") is None
+    assert sniff_type(temp_dir / "empty") is None
+    assert sniff_type(temp_dir / "missing") is None
+
+    # Would block reading without a writer
+    os.mkfifo(temp_dir / "pipe")
+    assert sniff_type(temp_dir / "pipe") is None
+
+
+def test_type_cache_evicts_oldest():
+    """Test the LRU limit of the type cache."""
+    cache = TypeCache(max_entries=2)
+    cache.put((1, 1, 0.0), TEXT)
+    cache.put((1, 2, 0.0), SCRIPT)
+    assert cache.get((1, 1, 0.0)) is TEXT
+    cache.put((1, 3, 0.0), FILE)
+
+    assert len(cache) == 2
+    assert cache.get((1, 2, 0.0)) is None
+    assert cache.get((1, 1, 1.0)) is None
+
+
+def test_type_sniffer(qtbot, temp_dir):
+    """Test sniffing queued files in the background."""
+    (temp_dir / "tool").write_bytes(b"#!/bin/sh\n")
+    (temp_dir / "blob.bin").write_bytes(b"\0\0")
+    cache = TypeCache()
+    sniffer = TypeSniffer(cache=cache)
+
+    with qtbot.waitSignal(sniffer.types_found, timeout=5000) as blocker:
+        assert sniffer.resolve(temp_dir, "tool", (1, 1, 0.0)) is None
+        assert sniffer.resolve(temp_dir, "blob.bin", (1, 2, 0.0)) is None
+
+    directory, types = blocker.args
+    assert directory == temp_dir
+    assert types == {"tool": SCRIPT, "blob.bin": type_of("blob.bin")}
+    assert sniffer.resolve(temp_dir, "tool", (1, 1, 0.0)) is SCRIPT
+    sniffer.shutdown()
@@ -0,0 +1,94 @@
+"""Tests for filtering listings by name."""
+
+import re
+from pathlib import Path
+
+from flitz.file_operations import DirectorySnapshot
+from flitz.filters import FuzzyFilter, NameFilter, fuzzy_pattern, fuzzy_score
+
+
+def make_snapshot(names):
+    """Snapshot with one metadata-less row per name."""
+    snapshot = DirectorySnapshot(Path("/listing"))
+    for name in names:
+        snapshot.append(name, None)
+    return snapshot
+
+
+def test_name_filter_matches_case_insensitively():
+    """Test substring matching on casefolded names."""
+    snapshot = make_snapshot(["Readme.MD", "main.py", "STRASSE.txt"])
+    name_filter = NameFilter()
+
+    assert name_filter.match(snapshot, "") is None
+    assert list(name_filter.match(snapshot, "md")) == [0]
+    assert list(name_filter.match(snapshot, "straße")) == [2]
+
+
+def test_name_filter_narrows_previous_matches():
+    """Test that longer queries only check earlier matches."""
+    snapshot = make_snapshot(["alpha", "alpine", "beta"])
+    name_filter = NameFilter()
+
+    assert list(name_filter.match(snapshot, "al")) == [0, 1]
+    # Rows outside the previous matches are not looked at again
+    snapshot.folded_names[2] = "alpx"
+    assert list(name_filter.match(snapshot, "alp")) == [0, 1]
+    # Deleting a character returns the earlier result
+    assert list(name_filter.match(snapshot, "al")) == [0, 1]
+
+    name_filter.reset()
+    assert list(name_filter.match(snapshot, "alp")) == [0, 1, 2]
+
+
+def test_folded_names_follow_snapshot_changes():
+    """Test that casefolded names stay aligned with the rows."""
+    snapshot = make_snapshot(["A", "B", "C"])
+    assert snapshot.folded_names == ["a", "b", "c"]
+
+    snapshot.append("D", None)
+    snapshot.remove([0])
+    assert snapshot.names == ["D", "B", "C"]
+    assert snapshot.folded_names == ["d", "b", "c"]
+
+
+def test_fuzzy_score_prefers_tight_and_word_start_matches():
+    """Test the relative order of fuzzy scores."""
+    assert fuzzy_score("readme.md", "xyz") is None
+    assert fuzzy_score("main.py", "mp") is not None
+    # Consecutive characters beat scattered ones
+    assert fuzzy_score("config", "con") > fuzzy_score("cxoxn", "con")
+    # Characters starting words beat ones inside words
+    assert fuzzy_score("my_file", "mf") > fuzzy_score("mxxfile", "mf")
+    # camelCase humps count as word starts
+    assert fuzzy_score("myfile", "mf", original="myFile") > fuzzy_score(
+        "myfile", "mf"
+    )
+
+
+def test_fuzzy_pattern_escapes_characters():
+    """Test that regular expression syntax is matched literally."""
+    pattern = re.compile(fuzzy_pattern("a]-b"))
+    assert pattern.search("a]x-yb")
+    assert not pattern.search("a]x-y\0b")
+    assert re.search(fuzzy_pattern("f2"), "file2.py")
+
+
+def test_fuzzy_filter_ranks_matches():
+    """Test ranking, narrowing and going back to earlier queries."""
+    snapshot = make_snapshot(
+        ["documents", "my_config.yml", "MainConfig.py", "recipe_cfg"]
+    )
+    fuzzy_filter = FuzzyFilter()
+
+    assert fuzzy_filter.match(snapshot, "") is None
+    ranked = fuzzy_filter.match(snapshot, "mc")
+    # Word boundaries count slightly more than camelCase humps
+    assert [snapshot.names[row] for row in ranked] == [
+        "my_config.yml",
+        "MainConfig.py",
+    ]
+    assert list(fuzzy_filter.match(snapshot, "mcp")) == [2]
+    assert list(fuzzy_filter.match(snapshot, "mc")) == [1, 2]
+    # The tightest match wins, even if the name has an earlier one
+    assert list(fuzzy_filter.match(snapshot, "cfg")) == [3, 1, 2]
@@ -0,0 +1,168 @@
+"""Tests for the persistent file-name index."""
+
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from flitz.index import FilenameIndex, _like_pattern
+from flitz.search import RecursiveSearch
+
+pytestmark = pytest.mark.skipif(
+    not FilenameIndex.available(), reason="SQLite lacks trigram support"
+)
+
+
+@pytest.fixture
+def index(sample_files, tmp_path):
+    """Create an index of the sample files."""
+    index = FilenameIndex(tmp_path / "index.sqlite3", [sample_files])
+    assert index.update()
+    yield index
+    index.close()
+
+
+def names(root, paths):
+    """Paths relative to ``root``, sorted."""
+    return sorted(path.relative_to(root).as_posix() for path in paths)
+
+
+def test_like_pattern():
+    """Test translating search text into LIKE patterns."""
+    assert _like_pattern("abc") == ("%abc%", 3)
+    assert _like_pattern("*.txt") == ("%.txt", 4)
+    assert _like_pattern("f?le[12].*") == ("f_le_.%", 2)
+
+
+def test_index_search(index, sample_files):
+    """Test substring and glob lookups."""
+    root = sample_files.resolve()
+    assert names(root, index.search(root, "file")) == [
+        "file1.txt",
+        "file2.py",
+        "folder1/nested_file.md",
+    ]
+    assert names(root, index.search(root, "*.PY")) == ["file2.py"]
+    assert names(root, index.search(root, "fi")) == [
+        "file1.txt",
+        "file2.py",
+        "folder1/nested_file.md",
+    ]
+    assert names(root, index.search(root / "folder1", "file")) == [
+        "folder1/nested_file.md"
+    ]
+    assert names(root, index.search(root, "hidden", show_hidden=True)) == [
+        ".hidden_file",
+        ".hidden_folder",
+    ]
+    assert names(root, index.search(root, "file", exclude=["folder*"])) == [
+        "file1.txt",
+        "file2.py",
+    ]
+
+
+def test_incremental_update(index, sample_files):
+    """Test that updates pick up added and removed entries."""
+    root = sample_files.resolve()
+    (sample_files / "folder2" / "new_file.txt").write_text("")
+    shutil.rmtree(sample_files / "folder1")
+
+    assert index.update()
+
+    assert names(root, index.search(root, "file")) == [
+        "file1.txt",
+        "file2.py",
+        "folder2/new_file.txt",
+    ]
+    stats = index.stats()
+    assert stats.directories == 3
+    assert stats.entries == 6
+    assert stats.bytes > 0
+    assert stats.update_seconds is not None
+
+
+def test_unchanged_directories_are_not_read(index, sample_files):
+    """Test that directories with an unchanged mtime are skipped."""
+    folder = sample_files / "folder1"
+    st = folder.stat()
+    (folder / "sneaky.txt").write_text("")
+    os.utime(folder, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    assert index.update()
+
+    assert index.search(sample_files.resolve(), "sneaky") == []
+
+
+def test_cancelled_update(sample_files, tmp_path):
+    """Test that a cancelled update reports it."""
+    index = FilenameIndex(tmp_path / "index.sqlite3", [sample_files])
+    assert not index.update(cancelled=lambda: True)
+    assert not index.ready
+    index.close()
+
+
+def test_search_folds_non_ascii_case(sample_files, tmp_path):
+    """Test that names match regardless of non-ASCII case."""
+    (sample_files / "Ärger_Straße.txt").write_text("")
+    index = FilenameIndex(tmp_path / "index.sqlite3", [sample_files])
+    assert index.update()
+    root = sample_files.resolve()
+
+    for text in ("ärger", "ÄRGER_STR", "ä*", "strasse"):
+        assert names(root, index.search(root, text)) == ["Ärger_Straße.txt"]
+    index.close()
+
+
+def test_search_pages_past_filtered_rows(sample_files, tmp_path):
+    """Test that the limit counts matches, not rows read from the index."""
+    for number in range(6):
+        (sample_files / f"match_x{number}").write_text("")
+    for number in range(3):
+        (sample_files / f"match{number}").write_text("")
+    index = FilenameIndex(tmp_path / "index.sqlite3", [sample_files])
+    assert index.update()
+    root = sample_files.resolve()
+
+    found = index.search(root, "match", exclude=["*x*"], limit=2)
+    assert len(found) == 2
+    assert names(root, index.search(root, "match", exclude=["*x*"])) == [
+        "match0",
+        "match1",
+        "match2",
+    ]
+    batches = index.search_batches(root, "match", cancelled=lambda: True)
+    assert list(batches) == []
+    index.close()
+
+
+def test_old_index_layout_is_rebuilt(sample_files, tmp_path):
+    """Test that an index of an older layout is dropped."""
+    path = tmp_path / "index.sqlite3"
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE entries (id INTEGER, name TEXT)")
+    index = FilenameIndex(path, [sample_files])
+
+    assert not index.ready
+    assert index.update()
+    root = sample_files.resolve()
+    assert names(root, index.search(root, "file2")) == ["file2.py"]
+    index.close()
+
+
+def test_recursive_search_uses_index(qtbot, index, sample_files):
+    """Test that index lookups run on the search thread."""
+    search = RecursiveSearch()
+    found = []
+    search.results_found.connect(lambda job, paths: found.extend(paths))
+    root = sample_files.resolve()
+    with qtbot.waitSignal(search.search_finished, timeout=5000):
+        job = search.start(root, "file", index=index)
+
+    assert job.indexed
+    assert job.matches == 3
+    assert names(root, found) == [
+        "file1.txt",
+        "file2.py",
+        "folder1/nested_file.md",
+    ]
@@ -0,0 +1,44 @@
+"""Tests for background directory loading."""
+
+from flitz.loader import DirectoryLoader
+
+
+def test_loader_streams_all_items(qtbot, sample_files):
+    """Test that a load delivers every entry and then finishes."""
+    loader = DirectoryLoader()
+    loaded = []
+    loader.batch_loaded.connect(lambda job, batch: loaded.extend(batch.names))
+
+    with qtbot.waitSignal(loader.load_finished, timeout=5000) as blocker:
+        job = loader.start(sample_files, show_hidden=True)
+
+    assert blocker.args == [job]
+    assert job.loaded == 6
+    assert sorted(loaded) == [
+        ".hidden_file",
+        ".hidden_folder",
+        "file1.txt",
+        "file2.py",
+        "folder1",
+        "folder2",
+    ]
+
+
+def test_loader_cancels_previous_job(qtbot, sample_files):
+    """Test that starting a new load cancels the running one."""
+    loader = DirectoryLoader()
+    jobs = []
+
+    with qtbot.waitSignal(
+        loader.load_finished,
+        timeout=5000,
+        check_params_cb=lambda job: job is jobs[-1],
+    ):
+        first = loader.start(sample_files)
+        jobs.append(first)
+        second = loader.start(sample_files / "folder1")
+        jobs.append(second)
+
+    assert first.cancelled
+    assert not loader.is_current(first)
+    assert loader.is_current(second)
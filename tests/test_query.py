@@ -0,0 +1,111 @@
+"""Tests for attribute queries."""
+
+import os
+import stat
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from flitz.file_operations import DirectorySnapshot
+from flitz.filters import QueryFilter
+from flitz.query import QueryError, compile_query, is_query
+
+NOW = datetime(2024, 6, 15, 12).timestamp()
+DAY = 86400
+
+
+def make_snapshot(entries):
+    """Snapshot of ``(name, mode, size, mtime)`` rows."""
+    snapshot = DirectorySnapshot(Path("/listing"))
+    for name, mode, size, mtime in entries:
+        st = os.stat_result((mode, 1, 1, 1, 0, 0, size, mtime, mtime, mtime))
+        snapshot.append(name, st)
+    return snapshot
+
+
+FILE = stat.S_IFREG | 0o644
+DIR = stat.S_IFDIR | 0o755
+SNAPSHOT_ENTRIES = [
+    ("server.log", FILE, 2 * 1024**3, NOW - DAY),
+    ("old.LOG", FILE, 3 * 1024**3, NOW - 30 * DAY),
+    ("notes.txt", FILE, 100, NOW - 3600),
+    ("big_folder", DIR, 8 * 1024**3, NOW - DAY),
+    ("photo.JPG", FILE, 5 * 1024**2, datetime(2024, 1, 31, 9).timestamp()),
+]
+
+
+def rows(text):
+    return compile_query(text, NOW).rows(make_snapshot(SNAPSHOT_ENTRIES))
+
+
+def test_is_query():
+    """Test telling attribute queries from plain text."""
+    assert is_query("size>1G")
+    assert is_query("report ext:pdf")
+    assert is_query("-TYPE:dir")
+    assert not is_query("report")
+    assert not is_query("notes:draft")
+    assert not is_query("")
+
+
+def test_size_terms():
+    """Test size comparisons with units, which never match folders."""
+    assert rows("size>1G") == [0, 1]
+    assert rows("size>=3g") == [1]
+    assert rows("size<1K") == [2]
+    assert rows("size=100") == [2]
+    assert rows("size<=5mb") == [2, 4]
+    assert rows("-size>1G") == [2, 4]
+
+
+def test_mtime_terms():
+    """Test ages and dates, where a smaller age is a later time."""
+    assert rows("mtime<2d") == [0, 2, 3]
+    assert rows("mtime>7d") == [1, 4]
+    assert rows("mtime<30min") == []
+    assert rows("mtime:2024-01-31") == [4]
+    assert rows("mtime<=2024-01-31") == [4]
+    assert rows("mtime>2024-01-31") == [0, 1, 2, 3]
+    assert rows("-mtime=2024-01-31") == [0, 1, 2, 3]
+
+
+def test_name_terms():
+    """Test extensions, types, names and combinations."""
+    assert rows("ext:log") == [0, 1]
+    assert rows("ext:jpg,.txt") == [2, 4]
+    assert rows("type:dir") == [3]
+    assert rows("type:file -ext:log") == [2, 4]
+    assert rows("name:*.log") == [0, 1]
+    assert rows("size>1G ext:log mtime<7d") == [0]
+    assert rows("size>1G server") == [0]
+    assert rows("ext:log -old") == [0]
+
+
+def test_invalid_queries():
+    """Test that malformed terms are reported."""
+    for text in ("size>", "size>1X", "mtime<soon", "mtime:7d", "ext<log"):
+        with pytest.raises(QueryError):
+            compile_query(text, NOW)
+
+
+def test_accepts_matches_rows():
+    """Test that checking single rows agrees with the whole snapshot."""
+    snapshot = make_snapshot(SNAPSHOT_ENTRIES)
+    query = compile_query("size>1M -ext:jpg", NOW)
+    assert [
+        row for row in range(len(snapshot)) if query.accepts(snapshot, row)
+    ] == query.rows(snapshot)
+
+
+def test_query_filter_caches_matches():
+    """Test that matches are kept until the text changes or a reset."""
+    snapshot = make_snapshot(SNAPSHOT_ENTRIES)
+    query_filter = QueryFilter()
+
+    assert query_filter.match(snapshot, "") is None
+    assert list(query_filter.match(snapshot, "type:dir")) == [3]
+    snapshot.modes[2] = DIR
+    assert list(query_filter.match(snapshot, "type:dir")) == [3]
+    query_filter.reset()
+    assert list(query_filter.match(snapshot, "type:dir")) == [2, 3]
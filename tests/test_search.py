@@ -0,0 +1,137 @@
+"""Tests for recursive file-name search."""
+
+from flitz.file_model import SearchResultsModel
+from flitz.file_operations import FileOperations
+from flitz.search import ContentSearch, RecursiveSearch, compile_pattern
+
+
+def run_search(qtbot, root, text, **kwargs):
+    """Run a search to completion and return its job and matches."""
+    search = RecursiveSearch()
+    found = []
+    search.results_found.connect(lambda job, paths: found.extend(paths))
+    with qtbot.waitSignal(search.search_finished, timeout=5000):
+        job = search.start(root, text, **kwargs)
+    return job, sorted(path.relative_to(root).as_posix() for path in found)
+
+
+def test_compile_pattern():
+    """Test substring and glob matching."""
+    assert compile_pattern("FILE")("my_file.txt")
+    assert not compile_pattern("file")("folder")
+    assert compile_pattern("*.TXT")("file1.txt")
+    assert not compile_pattern("*.txt")("file1.txt.bak")
+
+
+def test_search_recurses(qtbot, sample_files):
+    """Test that matches in subfolders are found."""
+    (sample_files / "folder2" / "deep").mkdir()
+    (sample_files / "folder2" / "deep" / "file3.txt").write_text("")
+
+    job, found = run_search(qtbot, sample_files, "file")
+
+    assert found == [
+        "file1.txt",
+        "file2.py",
+        "folder1/nested_file.md",
+        "folder2/deep/file3.txt",
+    ]
+    assert job.matches == 4
+    assert job.directories == 4
+    assert job.first_match is not None
+
+
+def test_search_hidden_and_exclude(qtbot, sample_files):
+    """Test that hidden and excluded entries are skipped."""
+    (sample_files / ".hidden_folder" / "file4").write_text("")
+
+    _, found = run_search(qtbot, sample_files, "*file*", exclude=["folder1"])
+    assert found == ["file1.txt", "file2.py"]
+
+    _, found = run_search(qtbot, sample_files, "*file*", show_hidden=True)
+    assert found == [
+        ".hidden_file",
+        ".hidden_folder/file4",
+        "file1.txt",
+        "file2.py",
+        "folder1/nested_file.md",
+    ]
+
+
+def test_new_search_cancels_previous(qtbot, sample_files):
+    """Test that starting a search cancels the running one."""
+    search = RecursiveSearch()
+    jobs = []
+
+    with qtbot.waitSignal(
+        search.search_finished,
+        timeout=5000,
+        check_params_cb=lambda job: job is jobs[-1],
+    ):
+        jobs.append(search.start(sample_files, "file"))
+        jobs.append(search.start(sample_files, "folder"))
+
+    assert jobs[0].cancelled
+    assert search.is_current(jobs[1])
+
+
+def test_results_model(sample_files):
+    """Test that the results model shows names and relative folders."""
+    model = SearchResultsModel()
+    model.clear(sample_files)
+    model.append_paths(
+        [sample_files / "file1.txt", sample_files / "folder1" / "a.md"]
+    )
+
+    assert model.rowCount() == 2
+    assert model.data(model.index(0, 0)) == "file1.txt"
+    assert model.data(model.index(0, 1)) == ""
+    assert model.data(model.index(1, 1)) == "folder1"
+    assert model.path(model.index(1, 0)) == sample_files / "folder1" / "a.md"
+
+
+def test_search_content(temp_dir):
+    """Test finding matching lines with their offsets."""
+    path = temp_dir / "notes.txt"
+    path.write_bytes(b"first line\nTODO: one\nnothing\nx todo todo\n")
+    hits = FileOperations.search_content(path, b"todo")
+
+    assert [(hit.line, hit.offset, hit.text) for hit in hits] == [
+        (2, 11, "TODO: one"),
+        (4, 31, "x todo todo"),
+    ]
+    assert FileOperations.search_content(path, b"todo", max_size=10) == []
+    assert FileOperations.search_content(path, b"x todo", max_hits=1) == [
+        (path, 4, 29, "x todo todo")
+    ]
+    case_sensitive = FileOperations.search_content(
+        path, b"TODO", ignore_case=False
+    )
+    assert [hit.line for hit in case_sensitive] == [2]
+
+
+def test_search_content_skips_binary(temp_dir):
+    """Test that files with NUL bytes are not searched."""
+    path = temp_dir / "data.bin"
+    path.write_bytes(b"\0\1todo")
+    assert FileOperations.search_content(path, b"todo") == []
+
+
+def test_content_search(qtbot, sample_files):
+    """Test streaming content hits from worker processes."""
+    (sample_files / "folder2" / "script.py").write_text("x = 1\nprint(x)\n")
+    search = ContentSearch(workers=2)
+    hits = []
+    search.results_found.connect(lambda job, batch: hits.extend(batch))
+    try:
+        with qtbot.waitSignal(search.search_finished, timeout=30000):
+            job = search.start(sample_files, "PRINT")
+    finally:
+        search.shutdown()
+
+    found = sorted(
+        (hit.path.relative_to(sample_files).as_posix(), hit.line)
+        for hit in hits
+    )
+    assert found == [("file2.py", 1), ("folder2/script.py", 2)]
+    assert job.matches == 2
@@ -0,0 +1,76 @@
+"""Tests for recursive folder sizes."""
+
+import os
+
+from flitz.adapters import FolderSizer
+from flitz.sizes import SizeCache, SizeJob, compute_sizes
+
+
+def make_tree(root):
+    """Two folders with nested files, one of them linked twice."""
+    (root / "a" / "b" / "c").mkdir(parents=True)
+    (root / "a" / "one").write_bytes(b"x" * 100)
+    (root / "a" / "b" / "two").write_bytes(b"x" * 20)
+    (root / "a" / "b" / "c" / "three").write_bytes(b"x" * 3)
+    os.link(root / "a" / "one", root / "a" / "b" / "c" / "one-again")
+    (root / "empty").mkdir()
+    (root / "file").write_bytes(b"x" * 7)
+
+
+def sizes_of(root, names, cache):
+    reports = []
+    sizes = compute_sizes(SizeJob(root, names), reports.append, cache)
+    return sizes, reports
+
+
+def test_compute_sizes(temp_dir):
+    """Test adding up trees, counting hard-linked files once."""
+    make_tree(temp_dir)
+    sizes, reports = sizes_of(temp_dir, ["a", "empty", "missing"], SizeCache())
+
+    assert sizes == {"a": 123, "empty": 0}
+    merged = {}
+    for report in reports:
+        merged.update(report)
+    assert merged == sizes
+
+
+def test_compute_sizes_uses_cache(temp_dir):
+    """Test that known sizes are reported first and changes picked up."""
+    make_tree(temp_dir)
+    cache = SizeCache()
+    sizes_of(temp_dir, ["a"], cache)
+    assert len(cache) == 3
+
+    # Adding a file changes the mtime of its directory only
+    (temp_dir / "a" / "b" / "c" / "four").write_bytes(b"x" * 4)
+    sizes, reports = sizes_of(temp_dir, ["a"], cache)
+
+    assert reports == [{"a": 123}, {"a": 127}]
+    assert sizes == {"a": 127}
+
+
+def test_size_cache_checks_mtime(temp_dir):
+    """Test that entries are dropped once their directory changes."""
+    cache = SizeCache(max_entries=1)
+    make_tree(temp_dir)
+    sizes_of(temp_dir, ["empty"], cache)
+    st = os.stat(temp_dir / "empty")
+    assert cache.get(st) is not None
+
+    (temp_dir / "empty" / "new").write_bytes(b"")
+    assert cache.get(os.stat(temp_dir / "empty")) is None
+    assert len(cache) == 0
+
+
+def test_folder_sizer(qtbot, temp_dir):
+    """Test that sizes are emitted from the background thread."""
+    make_tree(temp_dir)
+    sizer = FolderSizer()
+    found = {}
+    sizer.sizes_found.connect(lambda job, sizes: found.update(sizes))
+    with qtbot.waitSignal(sizer.sizes_finished, timeout=5000):
+        job = sizer.start(temp_dir, ["a", "empty"])
+
+    assert found == {"a": 123, "empty": 0}
+    assert job.directories == 4
@@ -0,0 +1,40 @@
+"""Tests for the startup pipeline."""
+
+from flitz.cache import listing_cache
+from flitz.startup import ListingPrefetch, StartupProfile
+
+
+def test_listing_prefetch(sample_files):
+    """Test that the start folder's listing ends up in the cache."""
+    prefetch = ListingPrefetch(sample_files)
+
+    assert prefetch.wait(5)
+    assert prefetch.seconds is not None
+    snapshot = listing_cache.get(sample_files)
+    assert snapshot is not None
+    assert sorted(snapshot.names) == [
+        "file1.txt",
+        "file2.py",
+        "folder1",
+        "folder2",
+    ]
+
+    missing = ListingPrefetch(sample_files / "missing")
+    assert missing.wait(5)
+    assert missing.seconds is None
+
+
+def test_startup_profile():
+    """Test the table of startup phases."""
+    profile = StartupProfile()
+    profile.mark("first")
+    profile.mark("second")
+
+    lines = profile.report([("scan", 0.5)]).splitlines()
+    assert [line.split()[0] for line in lines] == [
+        "first",
+        "second",
+        "total",
+        "scan",
+    ]
+    assert lines[-1].endswith("500.0 ms")
@@ -0,0 +1,104 @@
+"""Tests for tracing spans and navigation profiles."""
+
+import json
+import pstats
+import threading
+
+import pytest
+
+from flitz.main import FileListWidget
+from flitz.tracing import PROFILE_ENV, TRACE_ENV, Tracer, tracer
+
+
+def test_disabled_tracer_records_nothing():
+    """Test that spans do nothing while tracing is off."""
+    disabled = Tracer()
+    with disabled.span("scan", path="/") as span:
+        assert span is None
+    disabled.complete("batch", 0.0)
+    assert disabled.begin("navigate") == 0
+    disabled.end(0)
+    assert disabled.events() == []
+
+
+def test_spans_are_exported_as_trace_events(temp_dir):
+    """Test recording spans from several threads and saving them."""
+    active = Tracer()
+    active.enable()
+    with active.span("outer", path=temp_dir):
+        with active.span("inner", count=3):
+            pass
+    worker = threading.Thread(
+        target=lambda: active.complete("batch", 0.0), name="worker"
+    )
+    worker.start()
+    worker.join()
+    span_id = active.begin("navigate")
+    active.end(span_id, entries=2)
+    with pytest.raises(ValueError):
+        with active.span("failing"):
+            raise ValueError()
+
+    path = temp_dir / "trace.json"
+    active.save(path)
+    events = json.loads(path.read_text())["traceEvents"]
+
+    names = {event["args"]["name"] for event in events if event["ph"] == "M"}
+    assert {"MainThread", "worker"} <= names
+    spans = {event["name"]: event for event in events if event["ph"] == "X"}
+    outer, inner = spans["outer"], spans["inner"]
+    assert outer["args"] == {"path": str(temp_dir)}
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert spans["batch"]["tid"] != outer["tid"]
+    assert spans["failing"]["args"] == {"error": "ValueError"}
+    begin, end = [event for event in events if event["name"] == "navigate"]
+    assert (begin["ph"], end["ph"]) == ("b", "e")
+    assert begin["id"] == end["id"] and end["args"] == {"entries": 2}
+
+
+def test_configure_prefers_the_environment(monkeypatch, temp_dir):
+    """Test that the environment variables override the settings."""
+    configured = Tracer()
+    monkeypatch.delenv(TRACE_ENV, raising=False)
+    configured.configure(str(temp_dir / "settings.json"), None)
+    assert configured.enabled and configured.path == temp_dir / "settings.json"
+    configured.configure(None, None)
+    assert not configured.enabled
+    assert (temp_dir / "settings.json").exists()
+
+    monkeypatch.setenv(TRACE_ENV, str(temp_dir / "env.json"))
+    monkeypatch.setenv(PROFILE_ENV, str(temp_dir / "env.prof"))
+    configured.enable_from_environment()
+    configured.configure(None, str(temp_dir / "settings.prof"))
+    assert configured.path == temp_dir / "env.json"
+    configured.start_profile()
+    configured.stop_profile()
+    assert (temp_dir / "env.prof").exists()
+    assert not (temp_dir / "settings.prof").exists()
+    configured.enabled = False
+
+
+def test_navigation_is_traced_and_profiled(qtbot, sample_files, temp_dir):
+    """Test the spans and profile of loading a folder."""
+    widget = FileListWidget()
+    qtbot.addWidget(widget)
+    profile = temp_dir / "navigation.prof"
+    tracer.clear()
+    tracer.enable()
+    tracer.profile_next(profile)
+    try:
+        with qtbot.waitSignal(widget.load_finished):
+            widget.load_directory(sample_files)
+        widget.file_model.sort(1)
+        events = tracer.events()
+    finally:
+        tracer.disable()
+        tracer.clear()
+
+    names = [event["name"] for event in events]
+    assert {"navigate", "list directory", "read batch", "sort"} <= set(names)
+    end = [event for event in events if event["ph"] == "e"][0]
+    assert end["args"] == {"entries": 4, "cached": False}
+    stats = pstats.Stats(str(profile))
+    assert any("on_load_finished" in key[2] for key in stats.stats)
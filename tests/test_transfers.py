@@ -0,0 +1,267 @@
+"""Tests for background transfer jobs."""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from flitz import transfers
+from flitz.transfers import (
+    STAGING_PREFIX,
+    DeleteJob,
+    TransferJob,
+    TransferQueue,
+    leftover_staging,
+)
+
+
+@pytest.fixture
+def queue():
+    """Create a transfer queue and shut it down afterwards."""
+    queue = TransferQueue(workers=2)
+    yield queue
+    queue.shutdown()
+
+
+def test_copy_job(sample_files, temp_dir, queue):
+    """Test copying files and trees into a directory."""
+    target = temp_dir / "target"
+    target.mkdir()
+    job = queue.submit(
+        TransferJob(
+            "copy",
+            [sample_files / "file1.txt", sample_files / "folder1"],
+            target,
+        )
+    )
+    assert queue.wait(timeout=10)
+
+    assert job.state == TransferJob.FINISHED
+    assert not job.errors
+    assert (target / "file1.txt").read_text() == "Hello, world!"
+    assert (target / "folder1" / "nested_file.md").read_text() == (
+        "# Nested file"
+    )
+    assert (sample_files / "folder1").exists()
+
+    progress = job.progress()
+    assert progress.done_files == progress.total_files == 2
+    assert progress.done_bytes == progress.total_bytes
+    assert progress.scanned
+
+
+def test_move_job(sample_files, temp_dir, queue):
+    """Test moving a tree."""
+    target = temp_dir / "target"
+    target.mkdir()
+    job = queue.submit(TransferJob("move", [sample_files / "folder1"], target))
+    assert queue.wait(timeout=10)
+
+    assert job.completed == [sample_files / "folder1"]
+    assert not (sample_files / "folder1").exists()
+    assert (target / "folder1" / "nested_file.md").exists()
+
+
+def test_existing_destination_is_an_error(sample_files, queue):
+    """Test that existing destinations are not overwritten."""
+    job = queue.submit(
+        TransferJob("copy", [sample_files / "file1.txt"], sample_files)
+    )
+    assert queue.wait(timeout=10)
+
+    assert job.completed == []
+    assert len(job.errors) == 1
+    assert (sample_files / "file1.txt").read_text() == "Hello, world!"
+
+
+@pytest.mark.parametrize("operation", ["copy", "move"])
+def test_folder_into_itself_is_an_error(sample_files, queue, operation):
+    """Test that folders are not copied or moved into themselves."""
+    folder = sample_files / "folder1"
+    subfolder = folder / "sub"
+    subfolder.mkdir()
+    job = queue.submit(TransferJob(operation, [folder], subfolder))
+    assert queue.wait(timeout=10)
+
+    assert job.completed == []
+    assert "into itself" in job.errors[0][1]
+    assert sorted(path.name for path in folder.iterdir()) == [
+        "nested_file.md",
+        "sub",
+    ]
+    assert list(subfolder.iterdir()) == []
+
+
+def test_paused_job_can_be_cancelled(sample_files, temp_dir, queue):
+    """Test pausing, then cancelling a queued job."""
+    target = temp_dir / "target"
+    target.mkdir()
+    blocker = TransferJob("copy", [sample_files / "file1.txt"], target)
+    blocker.pause()
+    queue.submit(blocker)
+    job = queue.submit(
+        TransferJob("copy", [sample_files / "file2.py"], target)
+    )
+
+    assert not queue.wait(timeout=0.2)
+    assert [j.state for j in queue.jobs()] == [
+        TransferJob.PAUSED,
+        TransferJob.PENDING,
+    ]
+
+    job.cancel()
+    blocker.resume()
+    assert queue.wait(timeout=10)
+    assert (target / "file1.txt").exists()
+    assert not (target / "file2.py").exists()
+    assert job.state == TransferJob.CANCELLED
+
+
+def test_invalid_operation(sample_files):
+    """Test that unknown operations are rejected."""
+    with pytest.raises(ValueError):
+        TransferJob("link", [sample_files / "file1.txt"], sample_files)
+
+
+def make_tree(root, width=3, depth=3):
+    """Create a tree of directories and files."""
+    root.mkdir()
+    if depth:
+        for i in range(width):
+            make_tree(root / f"dir{i}", width, depth - 1)
+    for i in range(width):
+        (root / f"file{i}").write_text("data")
+    (root / "link").symlink_to(root.parent)
+
+
+def test_delete_job(sample_files, queue):
+    """Test that staged paths vanish at once and are purged later."""
+    make_tree(sample_files / "tree")
+    sources = [sample_files / "tree", sample_files / "file1.txt"]
+
+    job = DeleteJob.stage(sources)
+
+    assert not any(source.exists() for source in sources)
+    assert set(job.staged) == set(sources)
+    staging = {path.parent for path in job.staged.values()}
+    assert len(staging) == 1
+    assert staging.pop().parent == sample_files
+
+    queue.submit(job)
+    assert queue.wait(timeout=10)
+    assert job.state == TransferJob.FINISHED
+    assert job.completed == sources
+    assert not job.errors
+    progress = job.progress()
+    assert progress.done_files == progress.total_files > 40
+    assert sorted(path.name for path in sample_files.iterdir()) == [
+        ".hidden_file",
+        ".hidden_folder",
+        "file2.py",
+        "folder1",
+        "folder2",
+    ]
+
+
+def test_delete_in_place(sample_files, queue):
+    """Test deleting paths that were not staged."""
+    make_tree(sample_files / "tree")
+    job = queue.submit(DeleteJob([sample_files / "tree"]))
+    assert queue.wait(timeout=10)
+
+    assert job.completed == [sample_files / "tree"]
+    assert not (sample_files / "tree").exists()
+
+
+def test_cancelled_delete_restores(sample_files, queue):
+    """Test that cancelling a delete moves staged paths back."""
+    job = DeleteJob.stage([sample_files / "folder1"])
+    assert not (sample_files / "folder1").exists()
+    job.cancel()
+    queue.submit(job)
+    assert queue.wait(timeout=10)
+
+    assert job.state == TransferJob.CANCELLED
+    assert (sample_files / "folder1" / "nested_file.md").exists()
+    assert not any(
+        path.name.startswith(STAGING_PREFIX) for path in sample_files.iterdir()
+    )
+
+
+def test_delete_sweeps_leftover_staging(sample_files, queue):
+    """Test that staging folders of crashed deletes are removed."""
+    old = sample_files / f"{STAGING_PREFIX}abc123"
+    old.mkdir()
+    make_tree(old / "tree")
+    ours = sample_files / f"{STAGING_PREFIX}{os.getpid()}-xyz"
+    ours.mkdir()
+    running = sample_files / f"{STAGING_PREFIX}{os.getppid()}-xyz"
+    running.mkdir()
+    (sample_files / f"{STAGING_PREFIX}file").write_text("not a folder")
+
+    job = DeleteJob.stage([sample_files / "file1.txt"])
+    assert set(job.leftovers) == {old, ours}
+    queue.submit(job)
+    assert queue.wait(timeout=10)
+
+    assert job.state == TransferJob.FINISHED
+    assert job.completed == [sample_files / "file1.txt"]
+    assert sorted(
+        path.name
+        for path in sample_files.iterdir()
+        if path.name.startswith(STAGING_PREFIX)
+    ) == [running.name, f"{STAGING_PREFIX}file"]
+
+
+def test_delete_without_dir_fd_is_cancellable(sample_files, monkeypatch):
+    """Test deleting by path checks for cancellation between entries."""
+    monkeypatch.setattr(transfers, "_FD_WALK", False)
+    make_tree(sample_files / "tree")
+    job = DeleteJob([sample_files / "tree"])
+    removed = job._removed
+
+    def cancel_after_first() -> None:
+        removed()
+        job.cancel()
+
+    monkeypatch.setattr(job, "_removed", cancel_after_first)
+    with ThreadPoolExecutor(2) as pool:
+        job.run(pool)
+
+    assert job.state == TransferJob.CANCELLED
+    assert job.progress().done_files == 1
+    assert (sample_files / "tree").exists()
+
+
+def test_delete_without_dir_fd(sample_files, monkeypatch):
+    """Test deleting a tree by path."""
+    monkeypatch.setattr(transfers, "_FD_WALK", False)
+    make_tree(sample_files / "tree")
+    job = DeleteJob([sample_files / "tree"])
+    with ThreadPoolExecutor(2) as pool:
+        job.run(pool)
+
+    assert job.state == TransferJob.FINISHED
+    assert not (sample_files / "tree").exists()
+    assert (sample_files / "file1.txt").exists()
+    progress = job.progress()
+    assert progress.done_files == progress.total_files > 40
+
+
+def test_shutdown_does_not_restore_deletes(sample_files):
+    """Test that quitting leaves deleted paths staged for the next sweep."""
+    queue = TransferQueue(workers=2)
+    blocker = TransferJob("copy", [sample_files / "file2.py"], sample_files)
+    blocker.pause()
+    queue.submit(blocker)
+    job = queue.submit(DeleteJob.stage([sample_files / "folder1"]))
+    queue.shutdown()
+
+    assert job.state == TransferJob.CANCELLED
+    assert not (sample_files / "folder1").exists()
+    (staging,) = [
+        path
+        for path in sample_files.iterdir()
+        if path.name.startswith(STAGING_PREFIX)
+    ]
+    assert leftover_staging(sample_files) == [staging]
@@ -0,0 +1,49 @@
+"""Tests for the directory watcher."""
+
+import pytest
+
+from flitz.watcher import IN_CREATE, DirectoryWatcher, Inotify
+
+
+@pytest.mark.skipif(not Inotify.available(), reason="requires inotify")
+def test_inotify_reports_created_entries(temp_dir):
+    """Test reading raw inotify events."""
+    inotify = Inotify()
+    try:
+        wd = inotify.add_watch(temp_dir)
+        (temp_dir / "new.txt").write_text("data")
+        events = inotify.read_events()
+    finally:
+        inotify.close()
+
+    assert (wd, IN_CREATE, "new.txt") in events
+
+
+def test_watcher_coalesces_changes(qtbot, temp_dir):
+    """Test that a burst of changes is reported as one set of names."""
+    watcher = DirectoryWatcher()
+    watcher.watch(temp_dir)
+
+    with qtbot.waitSignal(watcher.entries_changed, timeout=5000) as blocker:
+        for i in range(10):
+            (temp_dir / f"file{i}.txt").write_text("data")
+
+    path, names, st = blocker.args
+    assert path == temp_dir
+    assert names == {f"file{i}.txt" for i in range(10)}
+    assert st is not None
+    watcher.close()
+
+
+def test_watcher_polling_fallback(qtbot, temp_dir, monkeypatch):
+    """Test the mtime polling fallback without inotify."""
+    monkeypatch.setattr(Inotify, "available", staticmethod(lambda: False))
+    watcher = DirectoryWatcher()
+    watcher.watch(temp_dir)
+    assert not watcher.uses_inotify
+
+    with qtbot.waitSignal(watcher.entries_changed, timeout=5000) as blocker:
+        (temp_dir / "new.txt").write_text("data")
+
+    assert blocker.args[1] == {"new.txt"}
+    watcher.close()